@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import SessionLocal
+from app.models import SyncState, User
+
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_MAX_ENTRIES = settings.auth_cache_max_entries
+AUTH_CACHE_TTL_SECONDS = settings.auth_cache_ttl_seconds
+SYNC_STATE_ROW_ID = 1
+
+
+async def bump_principal_revision(db: AsyncSession) -> int:
+    """Increment the shared principal revision in the current transaction
+
+    Called by every write to a user (profile, password, role, deletion,
+    rehash) before its commit; pass the result to
+    :meth:`PrincipalCache.invalidate` once committed.
+    """
+    table = SyncState.__table__
+    stmt = insert(table).values(id=SYNC_STATE_ROW_ID, tombstone_horizon=0, principal_revision=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={"principal_revision": table.c.principal_revision + 1},
+    ).returning(table.c.principal_revision)
+    return (await db.execute(stmt)).scalar_one()
+
+
+def read_principal_revision() -> int:
+    """Shared principal revision as committed (one primary key lookup)"""
+    with SessionLocal() as db:
+        revision = db.query(SyncState.principal_revision).filter(SyncState.id == SYNC_STATE_ROW_ID).scalar()
+        return revision or 0
+
+
+def snapshot_user(user: User) -> User:
+    """Detached copy of a user holding only its column values
+
+    The cached object is shared by concurrent requests and never attached to
+    a session: handlers that modify the current user must load it again.
+    """
+    return User(**{column.name: getattr(user, column.name) for column in User.__table__.columns})
+
+
+class PrincipalCache:
+    """Bounded TTL/LRU cache of authenticated users
+
+    Entries are keyed by (token subject, per-user version). Invalidating a
+    user bumps its version, so an entry cached before a profile or password
+    change can never be served again by this process.
+
+    Other workers learn about the change through the principal revision
+    shared in ``sync_state``: every user write increments it, each entry
+    records the revision known when it was loaded, and a hit on an entry
+    older than the known revision is a miss. :meth:`watch` re-reads the
+    revision every REVISION_POLL_INTERVAL_MS, which bounds how long a
+    revoked or demoted user stays authorized on another worker; without
+    polling (interval 0) the bound is the TTL.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (subject, version) -> (expires_at, revision, user)
+        self._versions = {}  # subject -> version
+        self.revision = 0  # shared principal revision known in process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, subject: str) -> int:
+        """Current version of a user, to capture before loading it from the database"""
+        return self._versions.get(subject, 0)
+
+    def _key(self, subject: str):
+        return subject, self.version(subject)
+
+    def get(self, subject: str) -> Optional[User]:
+        """Return the cached user for a subject, or None on miss/expiry"""
+        key = self._key(subject)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic() or entry[1] < self.revision:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, subject: str, user: User, version: int, revision: int):
+        """Cache a snapshot of a freshly loaded user
+
+        ``version`` and ``revision`` are the values of :meth:`version` and
+        :attr:`revision` captured before the load: if the user was
+        invalidated in between, the loaded row may predate the change and
+        is not cached.
+        """
+        if self.max_entries <= 0 or self.ttl <= 0 or version != self.version(subject) or revision < self.revision:
+            return
+        key = (subject, version)
+        self._entries[key] = (time.monotonic() + self.ttl, revision, snapshot_user(user))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *subjects: str, revision: int = 0):
+        """Drop the entries of the given users and bump their version
+
+        ``revision`` is the principal revision committed by the write (see
+        :func:`bump_principal_revision`).
+        """
+        for subject in subjects:
+            self._entries.pop(self._key(subject), None)
+            self._versions[subject] = self._versions.get(subject, 0) + 1
+            self.invalidations += 1
+        self.advance(revision)
+
+    def advance(self, revision: int):
+        """Record a newer shared revision: entries loaded before it become misses"""
+        self.revision = max(self.revision, revision)
+
+    async def watch(self, interval: float):
+        """Re-read the shared principal revision every ``interval`` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.advance(await asyncio.to_thread(read_principal_revision))
+            except Exception:
+                logger.exception("Could not read the principal revision")
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl,
+            "revision": self.revision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache()
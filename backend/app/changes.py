@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import String, func, type_coerce
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import AuditTombstone, SyncState
+
+SYNC_STATE_ROW_ID = 1
+
+
+def record_tombstone(db: Session, control_id: str, revision: int):
+    """Enregistre la suppression d'un contrôle à la révision donnée"""
+    table = AuditTombstone.__table__
+    stmt = insert(table).values(control_id=control_id, change_seq=revision)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.control_id],
+        set_={"change_seq": stmt.excluded.change_seq, "deleted_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def tombstone_horizon(db: Session) -> int:
+    """Révision en deçà de laquelle les suppressions ne sont plus connues"""
+    horizon = db.query(SyncState.tombstone_horizon).filter(SyncState.id == SYNC_STATE_ROW_ID).scalar()
+    return horizon or 0
+
+
+def compact_tombstones(db: Session, older_than_days: int) -> int:
+    """Purge les tombstones plus anciens que ``older_than_days`` et avance l'horizon"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+    stale = db.query(AuditTombstone).filter(type_coerce(AuditTombstone.deleted_at, String) < cutoff)
+    horizon = stale.with_entities(func.max(AuditTombstone.change_seq)).scalar()
+    if horizon is None:
+        return 0
+
+    purged = stale.delete(synchronize_session=False)
+    table = SyncState.__table__
+    stmt = insert(table).values(id=SYNC_STATE_ROW_ID, tombstone_horizon=horizon)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={"tombstone_horizon": func.max(table.c.tombstone_horizon, stmt.excluded.tombstone_horizon)},
+    )
+    db.execute(stmt)
+    return purged
+
+
+def run_tombstone_compaction() -> int:
+    """Compacte les tombstones selon TOMBSTONE_RETENTION_DAYS (tâche de fond)"""
+    with SessionLocal() as db:
+        purged = compact_tombstones(db, settings.tombstone_retention_days)
+        db.commit()
+        return purged
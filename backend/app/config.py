@@ -0,0 +1,104 @@
+import os
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(os.path.dirname(__file__), '..', 'data', 'audit.db')}"
+
+
+class Settings(BaseSettings):
+    """Application settings, read from the environment (or a .env file)"""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database
+    database_url: str = DEFAULT_DATABASE_URL
+    # Optional separate URL for the read-only engine (defaults to database_url)
+    read_database_url: Optional[str] = None
+
+    # SQLite engine profile (applied to every new connection)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
+    # Connection pools: SQLite accepts a single writer at a time, readers
+    # run concurrently in WAL mode
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_read_pool_size: int = 10
+    db_read_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 3600
+
+    # History retention: entries older than this many days move to the
+    # archive table, and status changes that changed nothing are dropped for
+    # good. Opt-in (0 disables it, the default).
+    history_retention_days: int = 0
+    history_retention_interval_seconds: float = 3600.0
+    history_retention_batch_size: int = 5000
+    # Pause between batches so writers are never held up for long
+    history_retention_pause_seconds: float = 0.05
+
+    # Deletion tombstones older than this are compacted (same background
+    # job, which runs for either setting); clients syncing from before the
+    # compaction horizon must do a full resync
+    tombstone_retention_days: int = 30
+
+    # Audit snapshots: a new one is taken once the last is older than the
+    # interval or this many history entries behind (0 disables the job)
+    snapshot_interval_seconds: float = 86400.0
+    snapshot_max_delta: int = 10000
+    snapshot_check_seconds: float = 300.0
+    # Number of snapshots kept (0 keeps them all)
+    snapshot_keep: int = 90
+
+    # Change feed (Server-Sent Events): bounded pending changes per
+    # subscriber, burst coalescing window and keep-alive interval
+    events_max_pending: int = 1000
+    events_coalesce_ms: int = 100
+    events_heartbeat_seconds: float = 15.0
+    events_max_subscribers: int = 1000
+    # Each worker re-reads the data revision this often to notice writes
+    # from other workers and scripts; in between, unconditional reads and
+    # cached responses use the revision known in process and may lag by up
+    # to this interval (If-None-Match requests always re-read it; 0 reads
+    # it on every request)
+    revision_poll_interval_ms: int = 500
+
+    # Encoded response cache for large reads (/audit-results, /statistics):
+    # memory cap over all stored variants, and minimum body size before
+    # gzip/brotli variants are precomputed
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_min_compress_bytes: int = 1024
+    response_cache_gzip_level: int = 6
+    response_cache_brotli_quality: int = 5
+
+    # Metrics: statements slower than this are logged and counted
+    # (0 disables the slow-query log)
+    slow_query_threshold_ms: float = 200.0
+    slow_query_log_max_chars: int = 1000
+
+    # Debug mode (development and test runs): per-request query budgets
+    # declared with @query_budget, N+1 detection (same statement shape
+    # repeated this many times, 0 disables it) and EXPLAIN QUERY PLAN of
+    # new statements. Violations are logged, or fail the request with
+    # query_budget_action = "raise".
+    debug: bool = False
+    query_budget_action: str = "log"
+    query_repeat_threshold: int = 10
+    query_plan_check: bool = True
+
+    # Authenticated-principal cache. User writes in another worker reach
+    # this one within revision_poll_interval_ms; with polling off, within
+    # the TTL.
+    auth_cache_max_entries: int = 1024
+    auth_cache_ttl_seconds: float = 60.0
+
+    # Password hashing (0 workers = thread pool instead of processes)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = min(4, os.cpu_count() or 1)
+    password_hash_concurrency: Optional[int] = None
+
+
+settings = Settings()
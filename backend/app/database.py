@@ -1,23 +1,134 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from app.config import settings
+from app.metrics import instrument_engine, observe_pool_checkout
+from app.query_budget import track_engine_queries
 
 # Database configuration - support environment variable or default path
-DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(os.path.dirname(__file__), '..', 'data', 'audit.db')}")
+DATABASE_URL = settings.database_url
+READ_DATABASE_URL = settings.read_database_url or DATABASE_URL
 
+
+def is_file_database(url: str) -> bool:
+    """True for a file-backed SQLite database (pooled, WAL-capable)"""
+    database = make_url(url).database
+    return bool(database) and database != ":memory:" and not database.startswith("file::memory:")
+
+
+def engine_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    """Pool sizing for file databases; in-memory databases keep SQLAlchemy's defaults"""
+    if not is_file_database(url):
+        return {}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """Production profile applied to every new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+        if not read_only:
+            # Persistent database setting: only the writer needs to set it
+            cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kib)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(engine, read_only: bool = False):
+    """Register the pragma profile on an engine's new connections"""
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+
+# Writer engine: all INSERT/UPDATE/DELETE go through it
 engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+    **engine_options(DATABASE_URL, settings.db_pool_size, settings.db_max_overflow),
 )
+configure_sqlite(engine)
+instrument_engine(engine, "write")
+if settings.debug:
+    track_engine_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only engine: in WAL mode, readers never wait for the writer. In-memory
+# databases cannot be shared between engines and reuse the writer.
+if is_file_database(READ_DATABASE_URL):
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        **engine_options(READ_DATABASE_URL, settings.db_read_pool_size, settings.db_read_max_overflow),
+    )
+    configure_sqlite(read_engine, read_only=True)
+    instrument_engine(read_engine, "read")
+    if settings.debug:
+        track_engine_queries(read_engine)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engine (aiosqlite) for handlers running on the event loop: queries
+# execute in aiosqlite's worker threads instead of blocking the loop.
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(DATABASE_URL, settings.db_pool_size, settings.db_max_overflow),
+)
+configure_sqlite(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
+if settings.debug:
+    track_engine_queries(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+def checkout(db, engine_label: str):
+    """Acquire the session's connection now, timing the wait on the pool"""
+    started = time.perf_counter()
+    db.connection()
+    observe_pool_checkout(engine_label, time.perf_counter() - started)
+
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
+        checkout(db, "write")
         yield db
     finally:
         db.close()
+
+
+# Read-only dependency for GET endpoints
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        checkout(db, "read" if read_engine is not engine else "write")
+        yield db
+    finally:
+        db.close()
+
+
+# Async dependency (use from ``async def`` handlers). The connection stays
+# lazy: get_current_user often answers from its cache without touching it.
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
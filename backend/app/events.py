@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Iterable, Optional
+from app.config import settings
+from app.database import ReadSessionLocal
+from app.models import AuditResult, AuditTombstone
+from app.revision import current_revision, process_revision
+
+logger = logging.getLogger(__name__)
+
+
+def change_key(change: dict) -> tuple:
+    """Clé de regroupement d'un changement : un contrôle ou un risque"""
+    if "riskId" in change:
+        return "risk", change["riskId"]
+    return "control", change["controlId"]
+
+
+class Subscriber:
+    """File d'attente bornée d'un abonné au flux de changements
+
+    Les changements en attente sont indexés par contrôle (ou risque) : une
+    rafale sur un même élément n'en garde que le dernier état. Au-delà de
+    ``max_pending`` éléments distincts, le détail est abandonné au profit
+    d'un unique événement ``resync`` (le client recharge alors la liste).
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.revision = 0
+        self.overflowed = False
+        self.wakeup = asyncio.Event()
+
+    def push(self, changes: list, revision: int):
+        """Ajoute des changements (appelé dans la boucle d'événements)"""
+        self.revision = max(self.revision, revision)
+        if not self.overflowed:
+            for change in changes:
+                key = change_key(change)
+                self.pending.pop(key, None)
+                self.pending[key] = change
+            if len(self.pending) > self.max_pending:
+                self.pending.clear()
+                self.overflowed = True
+        self.wakeup.set()
+
+    def drain(self) -> tuple:
+        """Retourne (événement, données) et vide la file"""
+        if self.overflowed:
+            event, data = "resync", {"revision": self.revision}
+        else:
+            event, data = "change", {"revision": self.revision, "changes": list(self.pending.values())}
+        self.pending.clear()
+        self.overflowed = False
+        self.wakeup.clear()
+        return event, data
+
+
+def format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Sérialise un événement au format text/event-stream"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def read_changes_since(revision: int, limit: int) -> tuple:
+    """(révision courante, changements de résultats d'audit postérieurs à ``revision``)
+
+    Lecture dans une seule transaction ; au plus ``limit`` lignes par table,
+    au-delà l'abonné bascule de toute façon en ``resync``.
+    """
+    with ReadSessionLocal() as db:
+        current = current_revision(db)
+        if current <= revision:
+            return current, []
+        upserts = db.query(AuditResult.change_seq, AuditResult.control_id, AuditResult.status).filter(
+            AuditResult.change_seq > revision
+        ).order_by(AuditResult.change_seq).limit(limit)
+        deleted = db.query(AuditTombstone.change_seq, AuditTombstone.control_id).filter(
+            AuditTombstone.change_seq > revision
+        ).order_by(AuditTombstone.change_seq).limit(limit)
+        changes = [(seq, {"controlId": control_id, "action": "updated", "status": status}) for seq, control_id, status in upserts]
+        changes += [(seq, {"controlId": control_id, "action": "deleted", "status": None}) for seq, control_id in deleted]
+        return current, [change for _, change in sorted(changes, key=lambda item: item[0])]
+
+
+class ChangeFeed:
+    """Diffusion des changements d'audit aux abonnés SSE d'un worker
+
+    ``publish`` peut être appelé depuis n'importe quel thread (handlers
+    synchrones) : la distribution est replanifiée dans la boucle d'événements.
+    Les écritures des autres processus sont relayées par ``watch_revision``.
+    Un abonné inactif ne coûte qu'une attente sur un ``asyncio.Event``.
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers = set()
+        self.revision = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Associe le flux à la boucle d'événements de l'application"""
+        self.loop = loop
+
+    def detach(self):
+        self.loop = None
+
+    def publish(self, changes: Iterable[dict], revision: int):
+        """Diffuse des changements validés (à appeler après le commit)"""
+        changes = list(changes)
+        if self.loop is None or self.loop.is_closed() or not changes:
+            return
+        self.loop.call_soon_threadsafe(self._dispatch, changes, revision)
+
+    def _dispatch(self, changes: list, revision: int):
+        self.revision = max(self.revision, revision)
+        for subscriber in self.subscribers:
+            subscriber.push(changes, revision)
+
+    async def watch_revision(self, interval: float):
+        """Relit data_revision toutes les ``interval`` secondes et relaie les écritures externes
+
+        Les écritures des autres workers et des scripts ne passent pas par
+        ce processus : leurs changements de résultats d'audit (change_seq et
+        tombstones postérieurs à la révision connue) sont diffusés aux
+        abonnés locaux, avec l'action ``updated`` ou ``deleted``. Les autres
+        écritures externes (statut d'un risque, rétention) ne font qu'avancer
+        la révision.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            known = process_revision.value
+            if known is None:
+                continue
+            try:
+                revision, changes = await asyncio.to_thread(read_changes_since, known, settings.events_max_pending + 1)
+            except Exception:
+                logger.exception("Lecture des changements externes impossible")
+                continue
+            if revision > known:
+                process_revision.advance(revision)
+                # Une écriture locale commitée pendant la lecture peut être relayée deux fois : sans effet
+                if changes:
+                    self._dispatch(changes, revision)
+
+    def full(self) -> bool:
+        return len(self.subscribers) >= settings.events_max_subscribers
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """Générateur SSE d'un abonné, jusqu'à sa déconnexion"""
+        subscriber = Subscriber(settings.events_max_pending)
+        self.subscribers.add(subscriber)
+        try:
+            yield "retry: 3000\n\n"
+            # Reconnexion après des changements manqués : le client doit recharger
+            if last_event_id is not None and last_event_id < self.revision:
+                yield format_sse("resync", {"revision": self.revision}, self.revision)
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                # Laisse la rafale se terminer pour l'envoyer en un seul événement
+                await asyncio.sleep(settings.events_coalesce_ms / 1000)
+                event, data = subscriber.drain()
+                yield format_sse(event, data, data["revision"])
+        finally:
+            self.subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self.subscribers), "revision": self.revision}
+
+
+change_feed = ChangeFeed()
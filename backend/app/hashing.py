@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import hmac
+import re
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import bcrypt
+from app.config import settings
+
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+# 0 runs the KDF in the event loop's default thread pool instead of processes
+PASSWORD_HASH_WORKERS = settings.password_hash_workers
+# Maximum number of hash/verify jobs submitted at once; further logins wait
+PASSWORD_HASH_CONCURRENCY = settings.password_hash_concurrency or max(1, PASSWORD_HASH_WORKERS) * 2
+
+# bcrypt only uses the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+_LEGACY_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _encode(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def _bcrypt_hash(password: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _bcrypt_check(password: bytes, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password, hashed.encode("ascii"))
+    except ValueError:
+        return False
+
+
+def is_legacy_hash(hashed: str) -> bool:
+    """Unsalted SHA-256 hex digest used before bcrypt"""
+    return bool(_LEGACY_SHA256_RE.match(hashed or ""))
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True for legacy hashes and bcrypt hashes weaker than BCRYPT_ROUNDS"""
+    if is_legacy_hash(hashed):
+        return True
+    try:
+        return int(hashed.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _verify_legacy(password: str, hashed: str) -> bool:
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+
+
+class HashingStats:
+    """Latency counters of the hashing service"""
+
+    def __init__(self):
+        self.operations = {}
+
+    def record(self, operation: str, queued: float, elapsed: float):
+        stats = self.operations.setdefault(operation, {
+            "count": 0, "totalSeconds": 0.0, "maxSeconds": 0.0, "queueWaitSeconds": 0.0,
+        })
+        stats["count"] += 1
+        stats["totalSeconds"] += elapsed
+        stats["maxSeconds"] = max(stats["maxSeconds"], elapsed)
+        stats["queueWaitSeconds"] += queued
+
+    def snapshot(self) -> dict:
+        return {
+            operation: {
+                **stats,
+                "avgSeconds": stats["totalSeconds"] / stats["count"] if stats["count"] else 0.0,
+            }
+            for operation, stats in self.operations.items()
+        }
+
+
+class PasswordHasher:
+    """bcrypt hashing off the event loop, in a process pool with a concurrency cap
+
+    A login burst queues on the semaphore instead of saturating the pool, so
+    the async workers keep serving other requests.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, concurrency: int = PASSWORD_HASH_CONCURRENCY,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.rounds = rounds
+        self.stats = HashingStats()
+        self.in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._dummy_hash: Optional[str] = None
+
+    def _get_executor(self):
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        submitted = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+            finally:
+                self.in_flight -= 1
+                self.stats.record(operation, started - submitted, time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with bcrypt"""
+        return await self._run("hash", _bcrypt_hash, _encode(password), self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, bool]:
+        """Verify a password; returns (valid, needs_rehash)"""
+        if is_legacy_hash(hashed):
+            return _verify_legacy(password, hashed), True
+        valid = await self._run("verify", _bcrypt_check, _encode(password), hashed)
+        return valid, valid and needs_rehash(hashed)
+
+    async def verify_unknown_user(self, password: str) -> Tuple[bool, bool]:
+        """Spend the same bcrypt work as a real check when the user does not exist
+
+        Without it, a login for an unknown user answers much faster and
+        reveals which usernames exist. The dummy hash (random password, same
+        rounds) is computed on first use.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+        await self._run("verify", _bcrypt_check, _encode(password), self._dummy_hash)
+        return False, False
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "rounds": self.rounds,
+            "inFlight": self.in_flight,
+            "operations": self.stats.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password_sync(password: str) -> str:
+    """Blocking bcrypt hash, for scripts and synchronous code"""
+    return _bcrypt_hash(_encode(password), BCRYPT_ROUNDS)
+
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    """Blocking verification (bcrypt or legacy SHA-256), for scripts"""
+    if is_legacy_hash(hashed):
+        return _verify_legacy(password, hashed)
+    return _bcrypt_check(_encode(password), hashed)
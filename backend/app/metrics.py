@@ -0,0 +1,277 @@
+import logging
+from bisect import bisect_left
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event
+from app.config import settings
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Labelled metric family; every child is keyed by its label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._children[labels] = self._children.get(labels, 0.0) + amount
+
+    def render(self) -> list:
+        lines = self.header()
+        with self._lock:
+            for labels, value in sorted(self._children.items()):
+                lines.append(f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                # Non-cumulative bucket counts, then sum and count
+                child = self._children[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                child[0][index] += 1
+            child[1] += value
+            child[2] += 1
+
+    def render(self) -> list:
+        lines = self.header()
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._children.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = format_labels(self.label_names, labels, f'le="{format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                inf_labels = format_labels(self.label_names, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {count}")
+                lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {format_value(total)}")
+                lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is sent", ("method", "route"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",),
+))
+http_request_db_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request", ("method", "route"),
+    buckets=STATEMENT_COUNT_BUCKETS,
+))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per HTTP request", ("method", "route"),
+))
+db_statement_duration_seconds = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement duration by engine and statement type", ("engine", "operation"),
+    buckets=QUERY_BUCKETS,
+))
+db_slow_statements_total = registry.register(Counter(
+    "db_slow_statements_total", "SQL statements slower than the slow-query threshold", ("engine", "operation"),
+))
+db_pool_checkout_seconds = registry.register(Histogram(
+    "db_pool_checkout_seconds", "Time waiting for a pooled connection (including connect)", ("engine",),
+    buckets=QUERY_BUCKETS,
+))
+
+
+class RequestDatabaseStats:
+    """SQL statements executed on behalf of the current request"""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by MetricsMiddleware; sync handlers and dependencies run in worker
+# threads with a copy of the context, so they update the same object
+current_request_db: ContextVar[Optional[RequestDatabaseStats]] = ContextVar("current_request_db", default=None)
+
+
+def statement_operation(statement: str) -> str:
+    """First SQL keyword (SELECT, INSERT, PRAGMA...), used as a low-cardinality label"""
+    keyword = statement.lstrip().split(None, 1)[0] if statement.strip() else ""
+    return keyword.upper() if keyword.isalpha() else "OTHER"
+
+
+# Engine label of every instrumented engine
+engine_labels: Dict[object, str] = {}
+
+
+def record_statement(name: str, statement: str, elapsed: float):
+    """Account one executed statement: histogram, current request and slow-query log"""
+    operation = statement_operation(statement)
+    db_statement_duration_seconds.observe(elapsed, name, operation)
+    stats = current_request_db.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+    threshold = settings.slow_query_threshold_ms / 1000
+    if threshold > 0 and elapsed >= threshold:
+        db_slow_statements_total.inc(name, operation)
+        slow_query_logger.warning(
+            "Requête SQL lente (%.1f ms, moteur %s) : %s",
+            elapsed * 1000, name, " ".join(statement.split())[:settings.slow_query_log_max_chars],
+        )
+
+
+def instrument_engine(engine, name: str):
+    """Time every statement of a (sync) engine through its cursor events"""
+    engine_labels[engine] = name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_statement(name, statement, time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Keep the start-time stack balanced when a statement fails
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+def observe_pool_checkout(name: str, seconds: float):
+    db_pool_checkout_seconds.observe(seconds, name)
+
+
+def resolve_route(scope) -> str:
+    """Path template of the route that served the request (bounded label cardinality)
+
+    Read from ``scope["route"]`` once the request is handled. Depending on the
+    FastAPI version, routes of an included router carry their path with or
+    without the include prefix: the missing leading segments are taken from
+    the request path, which always starts with the static prefix.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    segments = scope["path"].split("/")
+    prefix_length = len(segments) - template.count("/")
+    if prefix_length <= 1:
+        return template
+    return "/".join(segments[:prefix_length]) + template
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency, in-flight requests and SQL work per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        stats = RequestDatabaseStats()
+        token = current_request_db.set(stats)
+        status = "500"
+        started = time.perf_counter()
+        # The route is only known once routing is done
+        http_requests_in_flight.inc(method)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_db.reset(token)
+            http_requests_in_flight.dec(method)
+            route = resolve_route(scope)
+            http_requests_total.inc(method, route, status)
+            http_request_duration_seconds.observe(elapsed, method, route)
+            http_request_db_statements.observe(stats.statements, method, route)
+            http_request_db_seconds.observe(stats.seconds, method, route)
@@ -0,0 +1,316 @@
+import logging
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from app.risk_exposure import ensure_risk_exposure
+from app.rollups import backfill_compliance_rollups
+from app.statistics import ensure_category_stats
+
+logger = logging.getLogger(__name__)
+
+# Le DDL de chaque migration est figé tel qu'il était à sa version : il ne
+# dépend pas des modèles actuels, qui ne décrivent que le dernier schéma.
+# Une base de la version N reçoit ainsi exactement les migrations N+1...,
+# et une base neuve les reçoit toutes depuis la version 0.
+
+# Version 1 : schéma complet. Les bases antérieures aux migrations ont déjà
+# users, audit_results (sans change_seq) et audit_history.
+SCHEMA_V1_TABLES = (
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER NOT NULL, username VARCHAR NOT NULL, email VARCHAR NOT NULL,
+        hashed_password VARCHAR NOT NULL, role VARCHAR NOT NULL, is_active INTEGER,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS audit_results (
+        id INTEGER NOT NULL, control_id VARCHAR NOT NULL, control_name VARCHAR NOT NULL,
+        category VARCHAR NOT NULL, status VARCHAR NOT NULL, evaluation_date VARCHAR, evaluated_by VARCHAR,
+        evidence TEXT, notes TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME,
+        change_seq INTEGER DEFAULT '0' NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS audit_history (
+        id INTEGER NOT NULL, control_id VARCHAR NOT NULL, action VARCHAR NOT NULL,
+        old_status VARCHAR, new_status VARCHAR, user VARCHAR NOT NULL, notes TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS audit_history_archive (
+        id INTEGER NOT NULL, control_id VARCHAR NOT NULL, action VARCHAR NOT NULL,
+        old_status VARCHAR, new_status VARCHAR, user VARCHAR NOT NULL, notes TEXT,
+        timestamp DATETIME, archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS ades_risks (
+        id INTEGER NOT NULL, risk_id VARCHAR NOT NULL, title VARCHAR NOT NULL, description TEXT,
+        severity VARCHAR NOT NULL, status VARCHAR NOT NULL, source VARCHAR,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS control_risk_links (
+        control_id VARCHAR NOT NULL, risk_id VARCHAR NOT NULL,
+        PRIMARY KEY (control_id, risk_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS risk_exposure (
+        risk_id VARCHAR NOT NULL, severity VARCHAR NOT NULL, linked_controls INTEGER NOT NULL,
+        compliant INTEGER NOT NULL, partial INTEGER NOT NULL, non_compliant INTEGER NOT NULL,
+        not_evaluated INTEGER NOT NULL, score FLOAT NOT NULL, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (risk_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS category_statistics (
+        category VARCHAR NOT NULL, total INTEGER NOT NULL, compliant INTEGER NOT NULL,
+        partial INTEGER NOT NULL, non_compliant INTEGER NOT NULL, not_evaluated INTEGER NOT NULL,
+        PRIMARY KEY (category)
+    )""",
+    """CREATE TABLE IF NOT EXISTS compliance_rollups (
+        granularity VARCHAR NOT NULL, bucket VARCHAR NOT NULL, category VARCHAR NOT NULL,
+        total INTEGER NOT NULL, compliant INTEGER NOT NULL, partial INTEGER NOT NULL,
+        non_compliant INTEGER NOT NULL, not_evaluated INTEGER NOT NULL,
+        PRIMARY KEY (granularity, bucket, category)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS audit_snapshots (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, taken_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        history_id INTEGER NOT NULL, revision INTEGER NOT NULL, row_count INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS audit_snapshot_rows (
+        snapshot_id INTEGER NOT NULL, control_id VARCHAR NOT NULL, control_name VARCHAR,
+        category VARCHAR, status VARCHAR, evaluation_date VARCHAR, evaluated_by VARCHAR,
+        PRIMARY KEY (snapshot_id, control_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS audit_tombstones (
+        control_id VARCHAR NOT NULL, change_seq INTEGER NOT NULL, deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (control_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS data_revision (
+        id INTEGER NOT NULL, revision INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+)
+SCHEMA_V1_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_audit_results_control_id ON audit_results (control_id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_id ON audit_results (id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_listing ON audit_results (control_id, category, status)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_category_control ON audit_results (category, control_id, status)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_status_control ON audit_results (status, control_id, category)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_evaluated_by_control ON audit_results (evaluated_by, control_id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_evaluation_date ON audit_results (evaluation_date, control_id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_results_change_seq ON audit_results (change_seq, control_id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_id ON audit_history (id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_control_timestamp ON audit_history (control_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_timestamp_id ON audit_history (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_user_timestamp ON audit_history (user, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_archive_control_timestamp ON audit_history_archive (control_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_archive_timestamp_id ON audit_history_archive (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_history_archive_user_timestamp ON audit_history_archive (user, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_ades_risks_id ON ades_risks (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_ades_risks_risk_id ON ades_risks (risk_id)",
+    "CREATE INDEX IF NOT EXISTS ix_control_risk_links_risk_control ON control_risk_links (risk_id, control_id)",
+    "CREATE INDEX IF NOT EXISTS ix_risk_exposure_score ON risk_exposure (score)",
+    "CREATE INDEX IF NOT EXISTS ix_compliance_rollups_category_bucket ON compliance_rollups (granularity, category, bucket)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_snapshots_taken_at ON audit_snapshots (taken_at)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_tombstones_change_seq ON audit_tombstones (change_seq)",
+    # Remplacé par les index composites de la pagination de l'historique
+    "DROP INDEX IF EXISTS ix_audit_history_control_id",
+)
+
+# Version 2 : liste "RISK-001,RISK-002" de l'ancienne colonne découpée en
+# liens (valeurs rognées, vides et doublons ignorés)
+SPLIT_LINKED_RISKS = """WITH RECURSIVE split(control_id, risk_id, rest) AS (
+        SELECT control_id, '', linked_risks || ',' FROM audit_results
+        WHERE linked_risks IS NOT NULL AND linked_risks != ''
+        UNION ALL
+        SELECT control_id, trim(substr(rest, 1, instr(rest, ',') - 1)), substr(rest, instr(rest, ',') + 1)
+        FROM split WHERE rest != ''
+    )
+    INSERT OR IGNORE INTO control_risk_links (control_id, risk_id)
+    SELECT control_id, risk_id FROM split WHERE risk_id != ''"""
+BUMP_REVISION = """INSERT INTO data_revision (id, revision) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE SET revision = revision + 1"""
+
+# Version 3 : index FTS5 à contenu externe et triggers de synchronisation
+SEARCH_SCHEMA_V3 = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS audit_results_fts USING fts5(
+        evidence, notes, content = 'audit_results', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS audit_results_fts_insert AFTER INSERT ON audit_results BEGIN
+        INSERT INTO audit_results_fts(rowid, evidence, notes) VALUES (new.id, new.evidence, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_results_fts_delete AFTER DELETE ON audit_results BEGIN
+        INSERT INTO audit_results_fts(audit_results_fts, rowid, evidence, notes)
+        VALUES ('delete', old.id, old.evidence, old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_results_fts_update AFTER UPDATE OF evidence, notes ON audit_results BEGIN
+        INSERT INTO audit_results_fts(audit_results_fts, rowid, evidence, notes)
+        VALUES ('delete', old.id, old.evidence, old.notes);
+        INSERT INTO audit_results_fts(rowid, evidence, notes) VALUES (new.id, new.evidence, new.notes);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS audit_history_fts USING fts5(
+        notes, content = 'audit_history', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS audit_history_fts_insert AFTER INSERT ON audit_history BEGIN
+        INSERT INTO audit_history_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_history_fts_delete AFTER DELETE ON audit_history BEGIN
+        INSERT INTO audit_history_fts(audit_history_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_history_fts_update AFTER UPDATE OF notes ON audit_history BEGIN
+        INSERT INTO audit_history_fts(audit_history_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+        INSERT INTO audit_history_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+    # Index remplis depuis les tables d'origine
+    "INSERT INTO audit_results_fts(audit_results_fts) VALUES ('rebuild')",
+    "INSERT INTO audit_history_fts(audit_history_fts) VALUES ('rebuild')",
+)
+
+# Version 5 : un contrôle (re)créé n'est plus supprimé. Le trigger retire son
+# tombstone dans l'INSERT même, sans requête supplémentaire pour les
+# écritures ; un upsert qui met à jour une ligne existante ne le déclenche
+# pas (elle n'a pas de tombstone).
+TOMBSTONE_TRIGGER_V5 = """CREATE TRIGGER IF NOT EXISTS audit_results_clear_tombstone AFTER INSERT ON audit_results BEGIN
+    DELETE FROM audit_tombstones WHERE control_id = new.control_id;
+END"""
+
+# Version 6 : l'horizon des tombstones quitte data_revision (ancienne ligne
+# id = 2) pour sa propre table
+SYNC_STATE_V6 = (
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER NOT NULL, tombstone_horizon INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """INSERT OR IGNORE INTO sync_state (id, tombstone_horizon)
+    SELECT 1, revision FROM data_revision WHERE id = 2""",
+    "DELETE FROM data_revision WHERE id = 2",
+)
+
+# Version 7 : révision partagée des utilisateurs, relue par chaque worker pour
+# invalider son cache des utilisateurs authentifiés
+PRINCIPAL_REVISION_V7 = "ALTER TABLE sync_state ADD COLUMN principal_revision INTEGER NOT NULL DEFAULT '0'"
+
+
+class SchemaVersionError(RuntimeError):
+    """La base a été migrée par une version plus récente de l'application"""
+
+
+def table_columns(conn: Connection, table: str) -> set:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def execute_all(conn: Connection, statements):
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
+def create_base_schema(conn: Connection):
+    """Tables et index du schéma complet (colonne change_seq ajoutée aux anciennes bases)"""
+    execute_all(conn, SCHEMA_V1_TABLES)
+    if "change_seq" not in table_columns(conn, "audit_results"):
+        conn.exec_driver_sql("ALTER TABLE audit_results ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+    execute_all(conn, SCHEMA_V1_INDEXES)
+
+
+def migrate_linked_risks_column(conn: Connection):
+    """Copie l'ancienne colonne audit_results.linked_risks dans control_risk_links
+
+    Uniquement si la table d'association est vide : une fois les liens
+    modifiés par l'API, l'ancienne colonne n'est plus à jour.
+    """
+    if "linked_risks" not in table_columns(conn, "audit_results"):
+        return
+    if conn.exec_driver_sql("SELECT 1 FROM control_risk_links LIMIT 1").first() is not None:
+        return
+    migrated = conn.exec_driver_sql(SPLIT_LINKED_RISKS).rowcount
+    if migrated:
+        conn.exec_driver_sql(BUMP_REVISION)
+    logger.info("%s liens contrôle/risque migrés", migrated)
+
+
+def create_search_index(conn: Connection):
+    """Index plein texte FTS5 et triggers de synchronisation"""
+    execute_all(conn, SEARCH_SCHEMA_V3)
+
+
+def initialize_materialized_data(conn: Connection):
+    """Compteurs par catégorie, exposition aux risques et rollups des anciennes bases
+
+    Migration de données seulement : elle passe par le code de l'application,
+    qui ne lit et n'écrit que des tables créées par la version 1.
+    """
+    db = Session(bind=conn)
+    ensure_category_stats(db)
+    ensure_risk_exposure(db)
+    has_rollups = conn.exec_driver_sql("SELECT 1 FROM compliance_rollups LIMIT 1").first()
+    has_history = conn.exec_driver_sql("SELECT 1 FROM audit_history LIMIT 1").first()
+    if has_history and not has_rollups:
+        backfill_compliance_rollups(db)
+    db.flush()
+
+
+def create_tombstone_trigger(conn: Connection):
+    """Trigger d'effacement des tombstones à la recréation d'un contrôle"""
+    conn.exec_driver_sql(TOMBSTONE_TRIGGER_V5)
+
+
+def create_sync_state(conn: Connection):
+    """Table sync_state portant l'horizon de compaction des tombstones"""
+    execute_all(conn, SYNC_STATE_V6)
+
+
+def add_principal_revision(conn: Connection):
+    """Révision partagée des utilisateurs dans sync_state"""
+    conn.exec_driver_sql(PRINCIPAL_REVISION_V7)
+
+
+# Migrations appliquées aux bases existantes, dans l'ordre : (version,
+# migration), une version par migration, jamais renumérotée ni modifiée une
+# fois publiée. Une base neuve les reçoit toutes. Pour changer le schéma :
+# modifier les modèles, puis ajouter ici une migration au DDL figé.
+MIGRATIONS = [
+    (1, create_base_schema),
+    (2, migrate_linked_risks_column),
+    (3, create_search_index),
+    (4, initialize_materialized_data),
+    (5, create_tombstone_trigger),
+    (6, create_sync_state),
+    (7, add_principal_revision),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: Connection) -> int:
+    """Version stockée dans l'en-tête de la base (0 : base antérieure aux migrations)"""
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def ensure_schema(engine: Engine) -> int:
+    """Met la base au niveau de SCHEMA_VERSION et retourne la version
+
+    La version est stockée dans l'en-tête de la base (``PRAGMA user_version``,
+    0 pour les bases antérieures aux migrations) : le cas courant, base à
+    jour, coûte une seule lecture. Sinon, les migrations s'exécutent dans une
+    transaction BEGIN IMMEDIATE : si plusieurs workers démarrent ensemble, un
+    seul migre et les autres constatent la nouvelle version une fois le
+    verrou obtenu.
+    """
+    with engine.connect() as conn:
+        version = schema_version(conn)
+        if version == SCHEMA_VERSION:
+            return version
+        if version > SCHEMA_VERSION:
+            raise SchemaVersionError(
+                f"Schéma de la base en version {version}, cette application ne connaît que la version {SCHEMA_VERSION}"
+            )
+        conn.rollback()
+
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        version = schema_version(conn)
+        if version < SCHEMA_VERSION:
+            for target, migration in MIGRATIONS:
+                if target > version:
+                    migration(conn)
+                    logger.info("Migration %s appliquée : %s", target, migration.__doc__.splitlines()[0])
+            # PRAGMA n'accepte pas de paramètre lié
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(SCHEMA_VERSION)}")
+        conn.commit()
+        return SCHEMA_VERSION
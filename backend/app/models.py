@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index, Float
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -36,19 +36,212 @@ class AuditResult(Base):
     evaluated_by = Column(String)
     evidence = Column(Text)
     notes = Column(Text)
-    linked_risks = Column(String)  # Comma-separated list
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Révision de la dernière écriture : sert à la synchronisation différentielle
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Index couvrants pour la pagination par curseur (control_id) et les filtres
+    # de GET /api/audit-results : les projections courtes restent index-only.
+    __table_args__ = (
+        Index("ix_audit_results_listing", "control_id", "category", "status"),
+        Index("ix_audit_results_category_control", "category", "control_id", "status"),
+        Index("ix_audit_results_status_control", "status", "control_id", "category"),
+        Index("ix_audit_results_evaluated_by_control", "evaluated_by", "control_id"),
+        Index("ix_audit_results_evaluation_date", "evaluation_date", "control_id"),
+        Index("ix_audit_results_change_seq", "change_seq", "control_id"),
+    )
+
+
+class AuditTombstone(Base):
+    """Trace de suppression d'un résultat, pour GET /api/audit-results/changes"""
+    __tablename__ = "audit_tombstones"
+
+    control_id = Column(String, primary_key=True)
+    change_seq = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ControlRiskLink(Base):
+    """Association contrôle <-> risque, indexée dans les deux sens"""
+    __tablename__ = "control_risk_links"
+
+    # La clé primaire (control_id, risk_id) sert de recherche directe,
+    # l'index (risk_id, control_id) de recherche inverse.
+    control_id = Column(String, primary_key=True)
+    risk_id = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_control_risk_links_risk_control", "risk_id", "control_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class ADESRisk(Base):
+    __tablename__ = "ades_risks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    risk_id = Column(String, unique=True, index=True, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    severity = Column(String, nullable=False, default="MEDIUM")  # LOW, MEDIUM, HIGH, CRITICAL
+    status = Column(String, nullable=False, default="open")  # open, in-progress, mitigated, accepted, closed
+    source = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class RiskExposure(Base):
+    """Exposition précalculée d'un risque, mise à jour à chaque changement de
+    statut ou de lien de ses contrôles"""
+    __tablename__ = "risk_exposure"
+
+    risk_id = Column(String, primary_key=True)
+    severity = Column(String, nullable=False)
+    linked_controls = Column(Integer, nullable=False, default=0)
+    compliant = Column(Integer, nullable=False, default=0)
+    partial = Column(Integer, nullable=False, default=0)
+    non_compliant = Column(Integer, nullable=False, default=0)
+    not_evaluated = Column(Integer, nullable=False, default=0)
+    score = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_risk_exposure_score", "score"),
+    )
 
 
 class AuditHistory(Base):
     __tablename__ = "audit_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    control_id = Column(String, index=True, nullable=False)
+    control_id = Column(String, nullable=False)
     action = Column(String, nullable=False)  # created, updated, deleted, status_changed
     old_status = Column(String)
     new_status = Column(String)
     user = Column(String, nullable=False)
     notes = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Index de la pagination par clé (timestamp, id), globale ou filtrée
+    __table_args__ = (
+        Index("ix_audit_history_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_history_control_timestamp", "control_id", "timestamp", "id"),
+        Index("ix_audit_history_user_timestamp", "user", "timestamp", "id"),
+    )
+
+
+class AuditHistoryArchive(Base):
+    """Tier froid de l'historique : entrées déplacées par la politique de rétention
+
+    Les identifiants d'origine sont conservés, (timestamp, id) reste donc
+    unique sur l'ensemble des deux tiers.
+    """
+    __tablename__ = "audit_history_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    control_id = Column(String, nullable=False)
+    action = Column(String, nullable=False)
+    old_status = Column(String)
+    new_status = Column(String)
+    user = Column(String, nullable=False)
+    notes = Column(Text)
+    timestamp = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_audit_history_archive_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_history_archive_control_timestamp", "control_id", "timestamp", "id"),
+        Index("ix_audit_history_archive_user_timestamp", "user", "timestamp", "id"),
+    )
+
+
+class AuditSnapshot(Base):
+    """Point de reprise de l'état des résultats d'audit
+
+    ``history_id`` est le dernier identifiant d'historique inclus : l'état à
+    une date ultérieure s'obtient en rejouant uniquement les entrées suivantes.
+    """
+    __tablename__ = "audit_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    history_id = Column(Integer, nullable=False, default=0)
+    revision = Column(Integer, nullable=False, default=0)
+    row_count = Column(Integer, nullable=False, default=0)
+
+    # AUTOINCREMENT : un identifiant n'est jamais réutilisé après une purge
+    __table_args__ = (
+        {"sqlite_autoincrement": True},
+    )
+
+
+class AuditSnapshotRow(Base):
+    """Copie d'un résultat d'audit (sans preuves ni notes) au sein d'un snapshot"""
+    __tablename__ = "audit_snapshot_rows"
+
+    snapshot_id = Column(Integer, primary_key=True)
+    control_id = Column(String, primary_key=True)
+    control_name = Column(String)
+    category = Column(String)
+    status = Column(String)
+    evaluation_date = Column(String)
+    evaluated_by = Column(String)
+
+    __table_args__ = (
+        {"sqlite_with_rowid": False},
+    )
+
+
+class CategoryStatistics(Base):
+    """Compteurs matérialisés par catégorie, maintenus par les écritures d'audit"""
+    __tablename__ = "category_statistics"
+
+    category = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    compliant = Column(Integer, nullable=False, default=0)
+    partial = Column(Integer, nullable=False, default=0)
+    non_compliant = Column(Integer, nullable=False, default=0)
+    not_evaluated = Column(Integer, nullable=False, default=0)
+
+
+class ComplianceRollup(Base):
+    """Compteurs par catégorie en fin de période (jour ou semaine), pour les séries temporelles
+
+    La catégorie ``*`` porte le total toutes catégories confondues. Une
+    période sans écriture n'a pas de ligne : la valeur précédente s'applique.
+    """
+    __tablename__ = "compliance_rollups"
+
+    granularity = Column(String, primary_key=True)  # day, week
+    bucket = Column(String, primary_key=True)  # YYYY-MM-DD (lundi pour week)
+    category = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    compliant = Column(Integer, nullable=False, default=0)
+    partial = Column(Integer, nullable=False, default=0)
+    non_compliant = Column(Integer, nullable=False, default=0)
+    not_evaluated = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_compliance_rollups_category_bucket", "granularity", "category", "bucket"),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class DataRevision(Base):
+    """Révision monotone des données d'audit, incrémentée à chaque écriture"""
+    __tablename__ = "data_revision"
+
+    id = Column(Integer, primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+
+
+class SyncState(Base):
+    """État de la synchronisation différentielle (ligne unique, id = 1)"""
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    # Aucune suppression antérieure à cette révision n'est plus connue
+    tombstone_horizon = Column(Integer, nullable=False, default=0)
+    # Incrémentée à chaque écriture d'un utilisateur (voir app/auth_cache.py)
+    principal_revision = Column(Integer, nullable=False, default=0, server_default="0")
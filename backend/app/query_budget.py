@@ -0,0 +1,263 @@
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from app.config import settings
+
+logger = logging.getLogger("app.query_budget")
+
+# Statements whose query plan is worth checking for full table scans
+EXPLAINED_OPERATIONS = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+IN_LIST = re.compile(r"\((\s*\?\s*,)+\s*\?\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised at the statement that breaks the budget (QUERY_BUDGET_ACTION=raise)"""
+
+
+class QueryBudget:
+    """Declared SQL budget of an endpoint (see ``query_budget``)"""
+
+    __slots__ = ("statements", "repeats")
+
+    def __init__(self, statements: Optional[int], repeats: Optional[int]):
+        self.statements = statements
+        self.repeats = repeats
+
+
+def query_budget(statements: Optional[int] = None, repeats: Optional[int] = None):
+    """Declare the maximum number of SQL statements of an endpoint
+
+    ``statements`` covers the handler and its own session work. Shared
+    dependencies such as the principal lookup run inside
+    ``dependency_queries()`` and are metered apart, so a budget does not
+    depend on whether the principal cache hit. ``repeats`` overrides
+    QUERY_REPEAT_THRESHOLD for endpoints that legitimately repeat a
+    statement, e.g. chunked IN lookups. Checked by QueryBudgetMiddleware,
+    only in debug mode. Goes below the route decorator::
+
+        @router.post("/audit-results")
+        @query_budget(8)
+        def create_audit_result(...):
+    """
+    def decorator(endpoint):
+        endpoint.query_budget = QueryBudget(statements, repeats)
+        return endpoint
+    return decorator
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text without layout and with IN lists collapsed
+
+    Parameters are already bound by placeholder: two statements with the
+    same shape only differ by their values.
+    """
+    return IN_LIST.sub("(?)", WHITESPACE.sub(" ", statement).strip())
+
+
+def scanned_table(step: str) -> Optional[str]:
+    """Table read in full by a plan step ("SCAN TABLE x" before SQLite 3.36)
+
+    Virtual tables (FTS5) are not reported; subqueries and constant rows
+    are weeded out by the caller, which knows the real table names.
+    """
+    if not step.startswith("SCAN ") or "VIRTUAL TABLE" in step:
+        return None
+    words = step.split()
+    name = words[2] if words[1] == "TABLE" and len(words) > 2 else words[1]
+    return None if name.startswith("sqlite_") else name
+
+
+class RequestQueries:
+    """Statements executed on behalf of the current request, by shape"""
+
+    __slots__ = ("scope", "statements", "dependency_statements", "dependency_depth", "shapes")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.statements = 0
+        self.dependency_statements = 0
+        self.dependency_depth = 0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str) -> str:
+        if self.dependency_depth:
+            self.dependency_statements += 1
+        else:
+            self.statements += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        return shape
+
+    def budget(self) -> Optional[QueryBudget]:
+        """Budget of the endpoint serving the request (known once routing is done)"""
+        endpoint = getattr((self.scope or {}).get("route"), "endpoint", None)
+        return getattr(endpoint, "query_budget", None)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+# Sync handlers and dependencies run in worker threads with a copy of the
+# context: they update the same RequestQueries object
+current_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_request_queries", default=None)
+
+
+@contextmanager
+def track_queries(scope: Optional[dict] = None):
+    """Count the statements executed in this context (and the threads it starts)"""
+    queries = RequestQueries(scope)
+    token = current_request_queries.set(queries)
+    try:
+        yield queries
+    finally:
+        current_request_queries.reset(token)
+
+
+@contextmanager
+def dependency_queries():
+    """Meter the statements run inside apart from the endpoint budget"""
+    queries = current_request_queries.get()
+    if queries is None:
+        yield
+        return
+    queries.dependency_depth += 1
+    try:
+        yield
+    finally:
+        queries.dependency_depth -= 1
+
+
+def repeat_threshold(budget: Optional[QueryBudget]) -> int:
+    if budget is not None and budget.repeats is not None:
+        return budget.repeats
+    return settings.query_repeat_threshold
+
+
+def budget_violations(queries: RequestQueries, budget: Optional[QueryBudget]) -> List[str]:
+    """Exceeded budget and repeated statements (probable N+1) of a request"""
+    violations = []
+    if budget is not None and budget.statements is not None and queries.statements > budget.statements:
+        violations.append(f"{queries.statements} requêtes SQL pour un budget de {budget.statements}")
+    threshold = repeat_threshold(budget)
+    if threshold > 0:
+        for shape, count in queries.repeated(threshold).items():
+            violations.append(f"requête répétée {count} fois (N+1 ?) : {shape[:settings.slow_query_log_max_chars]}")
+    return violations
+
+
+class QueryPlanChecker:
+    """EXPLAIN QUERY PLAN of every new statement shape, logging full table scans
+
+    Each shape is explained once per process, on the connection that ran it
+    and with the same parameters.
+    """
+
+    def __init__(self):
+        self.explained = set()
+        self.full_scans: Dict[str, List[str]] = {}
+        self.tables = set()
+        self._lock = threading.Lock()
+
+    def check(self, dbapi_connection, statement: str, parameters):
+        keyword = statement.lstrip()[:6].upper()
+        if not keyword.startswith(EXPLAINED_OPERATIONS):
+            return
+        shape = statement_shape(statement)
+        with self._lock:
+            if shape in self.explained:
+                return
+            self.explained.add(shape)
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            plan = [(step, scanned_table(step)) for (*_, step) in cursor.fetchall()]
+            if any(name is not None and name not in self.tables for _, name in plan):
+                # Tables created since the last check (a subquery alias forces a reload too)
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                self.tables = {row[0] for row in cursor.fetchall()}
+        except Exception as exc:  # The plan is diagnostic only: never fail the request
+            logger.debug("EXPLAIN QUERY PLAN impossible (%s) : %s", exc, shape)
+            return
+        finally:
+            cursor.close()
+        scans = [step for step, name in plan if name in self.tables]
+        if scans:
+            self.full_scans[shape] = scans
+            logger.warning("Parcours complet de table (%s) : %s", ", ".join(scans), shape[:settings.slow_query_log_max_chars])
+
+
+query_plans = QueryPlanChecker()
+
+
+def check_statement(queries: RequestQueries, shape: str):
+    """Raise as soon as a statement breaks the budget, before the handler commits"""
+    budget = queries.budget()
+    violation = None
+    if budget is not None and budget.statements is not None and queries.statements > budget.statements \
+            and not queries.dependency_depth:
+        violation = f"{queries.statements} requêtes SQL pour un budget de {budget.statements}"
+    threshold = repeat_threshold(budget)
+    if violation is None and threshold > 0 and queries.shapes[shape] == threshold:
+        violation = f"requête répétée {threshold} fois (N+1 ?) : {shape[:settings.slow_query_log_max_chars]}"
+    if violation is not None:
+        scope = queries.scope or {}
+        logger.warning("Budget de requêtes dépassé, %s %s : %s", scope.get("method"), scope.get("path"), violation)
+        raise QueryBudgetExceeded(violation)
+
+
+def observe_statement(dbapi_connection, statement: str, parameters, executemany: bool = False):
+    """Account one statement for the current request and check its plan"""
+    queries = current_request_queries.get()
+    if queries is not None:
+        shape = queries.record(statement)
+        if settings.query_budget_action == "raise":
+            check_statement(queries, shape)
+    if settings.query_plan_check and not executemany:
+        query_plans.check(dbapi_connection, statement, parameters)
+
+
+def track_engine_queries(engine):
+    """Feed the statements of a (sync) engine to the query budget (debug only)"""
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        observe_statement(conn.connection.dbapi_connection, statement, parameters, executemany)
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware (debug mode): checks each request against its endpoint's budget
+
+    With QUERY_BUDGET_ACTION=log, violations are logged once the response
+    starts (statements run while a streaming body is produced are not
+    covered). With QUERY_BUDGET_ACTION=raise, the statement that breaks the
+    budget raises QueryBudgetExceeded: the handler fails before it commits,
+    and a test suite run in debug mode sees the error.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with track_queries(scope) as queries:
+            checked = False
+
+            async def send_checked(message):
+                nonlocal checked
+                if message["type"] == "http.response.start" and not checked:
+                    checked = True
+                    if settings.query_budget_action != "raise":
+                        target = f"{scope['method']} {scope['path']}"
+                        for violation in budget_violations(queries, queries.budget()):
+                            logger.warning("Budget de requêtes dépassé, %s : %s", target, violation)
+                await send(message)
+
+            await self.app(scope, receive, send_checked)
@@ -0,0 +1,163 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request, Response
+from app.config import settings
+from app.serialization import wants_msgpack
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional: without it only gzip variants are stored
+    brotli = None
+
+# Response headers stored with the entry and replayed on every hit
+STORED_HEADERS = ("etag", "cache-control", "vary")
+
+
+def accepted_encodings(request: Request) -> set:
+    """Content codings accepted by the client (Accept-Encoding, q=0 excluded)"""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def add_vary(headers: dict, value: str):
+    vary = headers.get("vary")
+    headers["vary"] = f"{vary}, {value}" if vary else value
+
+
+class CachedResponse:
+    """Encoded body of a response, with its compressed variants"""
+
+    __slots__ = ("media_type", "headers", "variants", "size")
+
+    def __init__(self, response: Response, min_compress_bytes: int, gzip_level: int, brotli_quality: int):
+        body = bytes(response.body)
+        self.media_type = response.media_type
+        self.headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        self.variants = {"identity": body}
+        if len(body) >= min_compress_bytes:
+            # mtime=0: identical bytes for identical bodies
+            self.variants["gzip"] = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=brotli_quality)
+            add_vary(self.headers, "Accept-Encoding")
+        self.size = sum(len(variant) for variant in self.variants.values())
+
+    def respond(self, request: Request) -> Response:
+        """Smallest stored variant the client accepts"""
+        accepted = accepted_encodings(request)
+        coding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in self.variants and candidate in accepted:
+                coding = candidate
+                break
+        response = Response(content=self.variants[coding], media_type=self.media_type, headers=self.headers)
+        if coding != "identity":
+            response.headers["content-encoding"] = coding
+        return response
+
+
+class ResponseCache:
+    """Bounded LRU cache of encoded (and pre-compressed) GET responses
+
+    Entries are keyed by (path, query string, representation, ETag). The ETag
+    is derived from the data revision, so any write - from this process, a
+    script or another worker - makes older entries unreachable; writes in
+    this process also :meth:`invalidate` them right away to free the memory.
+    The memory cap counts the bytes of every stored variant.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = settings.response_cache_max_bytes,
+        min_compress_bytes: int = settings.response_cache_min_compress_bytes,
+        gzip_level: int = settings.response_cache_gzip_level,
+        brotli_quality: int = settings.response_cache_brotli_quality,
+    ):
+        self.max_bytes = max_bytes
+        self.min_compress_bytes = min_compress_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._entries = OrderedDict()  # key -> CachedResponse
+        # Sync handlers run in the thread pool: guard the LRU bookkeeping
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, request: Request, response: Response) -> Optional[tuple]:
+        """Cache key of a GET request, once check_not_modified has set the ETag
+
+        The representation (JSON or MessagePack, from the Accept header) is
+        part of the key. Returns None when the response carries no ETag.
+        """
+        etag = response.headers.get("etag")
+        if etag is None or self.max_bytes <= 0:
+            return None
+        query = "&".join(sorted(request.url.query.split("&")))
+        return request.url.path, query, wants_msgpack(request), etag
+
+    def get(self, request: Request, key: Optional[tuple]) -> Optional[Response]:
+        """Cached response for the key, encoded for this client, or None on miss"""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry.respond(request)
+
+    def put(self, request: Request, key: Optional[tuple], response: Response) -> Response:
+        """Store an encoded response and return it as served to this client
+
+        Responses larger than the whole cache are compressed but not kept.
+        """
+        if key is None:
+            return response
+        entry = CachedResponse(response, self.min_compress_bytes, self.gzip_level, self.brotli_quality)
+        if entry.size <= self.max_bytes:
+            with self._lock:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.size -= previous.size
+                self._entries[key] = entry
+                self.size += entry.size
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= evicted.size
+                    self.evictions += 1
+        return entry.respond(request)
+
+    def invalidate(self):
+        """Drop every entry (called after a write commits)"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "brotli": brotli is not None,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import AuditHistory, AuditHistoryArchive
+from app.revision import bump_revision
+from app.changes import run_tombstone_compaction
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ("id", "control_id", "action", "old_status", "new_status", "user", "notes", "timestamp")
+# Taille des lots pour les requêtes IN (limite de variables SQLite)
+DELETE_CHUNK = 500
+
+
+def retention_cutoff(days: int, now: Optional[datetime] = None) -> str:
+    """Borne textuelle UTC : les entrées strictement antérieures sont archivées"""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now.astimezone(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def collapse_noop_status_changes(rows: List[dict], last_status: Dict[str, Optional[str]]) -> List[dict]:
+    """Retire les changements de statut sans effet (statut identique au précédent)
+
+    ``rows`` est trié par (timestamp, id) ; ``last_status`` conserve le
+    dernier statut connu de chaque contrôle d'un lot à l'autre.
+    """
+    kept = []
+    for row in rows:
+        control_id = row["control_id"]
+        if row["action"] == "status_changed":
+            previous = last_status.get(control_id, row["old_status"])
+            if row["new_status"] == previous:
+                continue
+        if row["action"] == "deleted":
+            last_status.pop(control_id, None)
+        elif row["new_status"] is not None:
+            last_status[control_id] = row["new_status"]
+        kept.append(row)
+    return kept
+
+
+def archive_history_batch(db: Session, cutoff: str, batch_size: int, last_status: Dict[str, Optional[str]]) -> tuple:
+    """Déplace un lot d'entrées antérieures à ``cutoff`` vers l'archive
+
+    Une seule transaction courte par lot. Retourne (déplacées, fusionnées).
+    """
+    table = AuditHistory.__table__
+    timestamp_text = type_coerce(table.c.timestamp, String)
+    rows = [
+        dict(row._mapping)
+        for row in db.execute(
+            select(*[table.c[name] for name in HISTORY_COLUMNS])
+            .where(timestamp_text < cutoff)
+            .order_by(timestamp_text, table.c.id)
+            .limit(batch_size)
+        )
+    ]
+    if not rows:
+        return 0, 0
+
+    kept = collapse_noop_status_changes(rows, last_status)
+    if kept:
+        db.execute(AuditHistoryArchive.__table__.insert(), kept)
+    ids = [row["id"] for row in rows]
+    for start in range(0, len(ids), DELETE_CHUNK):
+        db.execute(table.delete().where(table.c.id.in_(ids[start:start + DELETE_CHUNK])))
+    bump_revision(db)
+    db.commit()
+    return len(rows), len(rows) - len(kept)
+
+
+def run_history_retention(
+    days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> dict:
+    """Archive toutes les entrées plus anciennes que ``days`` jours, lot par lot"""
+    days = settings.history_retention_days if days is None else days
+    batch_size = batch_size or settings.history_retention_batch_size
+    pause = settings.history_retention_pause_seconds if pause is None else pause
+
+    cutoff = retention_cutoff(days)
+    last_status: Dict[str, Optional[str]] = {}
+    report = {"cutoff": cutoff, "archived": 0, "collapsed": 0, "batches": 0}
+    while True:
+        with SessionLocal() as db:
+            moved, collapsed = archive_history_batch(db, cutoff, batch_size, last_status)
+        if not moved:
+            return report
+        report["archived"] += moved - collapsed
+        report["collapsed"] += collapsed
+        report["batches"] += 1
+        if pause:
+            # Laisse passer les écritures en attente entre deux lots
+            time.sleep(pause)
+
+
+async def history_retention_loop():
+    """Tâche de fond : rétention de l'historique (si activée) et compaction des tombstones"""
+    while True:
+        try:
+            # Exécutée dans un thread : la boucle d'événements n'est jamais bloquée
+            if settings.history_retention_days > 0:
+                report = await asyncio.to_thread(run_history_retention)
+                if report["batches"]:
+                    logger.info("Historique archivé: %s", report)
+            if settings.tombstone_retention_days > 0:
+                purged = await asyncio.to_thread(run_tombstone_compaction)
+                if purged:
+                    logger.info("%s tombstones compactés", purged)
+        except Exception:
+            logger.exception("Échec de la rétention de l'historique")
+        await asyncio.sleep(settings.history_retention_interval_seconds)
@@ -0,0 +1,126 @@
+import threading
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.models import DataRevision
+
+REVISION_ROW_ID = 1
+# Révision incrémentée par la transaction en cours d'une session (Session.info)
+PENDING_REVISION_KEY = "bumped_revision"
+
+
+def bump_revision(db: Session) -> int:
+    """Incrémente la révision dans la transaction courante et retourne la nouvelle valeur"""
+    table = DataRevision.__table__
+    stmt = insert(table).values(id=REVISION_ROW_ID, revision=1).on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={"revision": table.c.revision + 1},
+    ).returning(table.c.revision)
+    revision = db.execute(stmt).scalar_one()
+    # Publiée dans process_revision au commit seulement (voir plus bas)
+    db.info[PENDING_REVISION_KEY] = revision
+    return revision
+
+
+def current_revision(db: Session) -> int:
+    """Lit la révision courante (lecture d'une seule ligne par clé primaire)"""
+    revision = db.query(DataRevision.revision).filter(DataRevision.id == REVISION_ROW_ID).scalar()
+    return revision or 0
+
+
+class ProcessRevision:
+    """Révision connue du processus : les lectures s'en servent sans requête SQL
+
+    Avancée après le commit de chaque transaction qui a appelé
+    bump_revision dans ce processus, et par le flux de changements qui relit
+    data_revision toutes les REVISION_POLL_INTERVAL_MS pour les écritures
+    des autres workers et des scripts (voir ChangeFeed.watch_revision).
+    Tant que le suivi n'est pas démarré (scripts, intervalle à 0), chaque
+    lecture interroge data_revision.
+    """
+
+    def __init__(self):
+        self.value: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def start(self, revision: int):
+        self.value = revision
+
+    def stop(self):
+        self.value = None
+
+    def advance(self, revision: int):
+        with self._lock:
+            if self.value is not None and revision > self.value:
+                self.value = revision
+
+    def current(self, db: Session) -> int:
+        value = self.value
+        return current_revision(db) if value is None else value
+
+    def refresh(self, db: Session) -> int:
+        """Relit data_revision (clé primaire) et avance la révision connue"""
+        revision = current_revision(db)
+        self.advance(revision)
+        return revision
+
+
+process_revision = ProcessRevision()
+
+
+@event.listens_for(Session, "after_commit")
+def _advance_process_revision(session: Session):
+    revision = session.info.pop(PENDING_REVISION_KEY, None)
+    if revision is not None:
+        process_revision.advance(revision)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_revision(session: Session):
+    session.info.pop(PENDING_REVISION_KEY, None)
+
+
+def revision_etag(revision: int, variant: Optional[str] = None) -> str:
+    """ETag faible dérivé de la révision (nginx peut recompresser la réponse)
+
+    ``variant`` distingue les réponses qui dépendent aussi d'autre chose
+    que la révision (snapshots par exemple).
+    """
+    if variant:
+        return f'W/"r{revision}-{variant}"'
+    return f'W/"r{revision}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Vérifie si l'en-tête If-None-Match de la requête correspond à l'ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    # La comparaison faible ignore le préfixe W/
+    return "*" in candidates or etag.removeprefix("W/") in [c.removeprefix("W/") for c in candidates]
+
+
+def check_not_modified(request: Request, response: Response, db: Session, variant: Optional[str] = None) -> Optional[Response]:
+    """Retourne une réponse 304 si le client possède déjà la révision courante
+
+    Sinon, ajoute l'ETag à la réponse et retourne None : le handler continue
+    normalement. Une requête conditionnelle (If-None-Match) relit
+    data_revision : un client qui vient d'écrire via un autre worker ne
+    reçoit jamais de 304 sur sa version périmée. Sans validateur, la
+    révision vient de process_revision et la réponse, sans requête SQL si
+    elle est en cache, peut retarder d'au plus REVISION_POLL_INTERVAL_MS sur
+    les écritures des autres workers.
+    """
+    if request.headers.get("if-none-match"):
+        revision = process_revision.refresh(db)
+    else:
+        revision = process_revision.current(db)
+    etag = revision_etag(revision, variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
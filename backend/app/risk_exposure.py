@@ -0,0 +1,112 @@
+from typing import Iterable
+from sqlalchemy import case, func, select, true
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.models import ADESRisk, AuditResult, ControlRiskLink, RiskExposure
+from app.risk_links import LOOKUP_CHUNK
+from app.statistics import compliance_tenths
+
+# Poids de gravité : exposition maximale d'un risque dont aucun contrôle n'est conforme
+SEVERITY_WEIGHTS = {
+    "LOW": 25,
+    "MEDIUM": 50,
+    "HIGH": 75,
+    "CRITICAL": 100,
+}
+DEFAULT_SEVERITY_WEIGHT = SEVERITY_WEIGHTS["MEDIUM"]
+
+
+def exposure_score(severity: str, linked: int, compliant: int, partial: int) -> float:
+    """Exposition = poids de gravité x (1 - couverture des contrôles liés)
+
+    La couverture reprend la formule du score de conformité (conformes +
+    partiels/2) ; un risque sans contrôle lié est entièrement exposé. Calcul
+    en dixièmes entiers, arrondis au plus proche (voir compliance_tenths).
+    """
+    weight = SEVERITY_WEIGHTS.get((severity or "").upper(), DEFAULT_SEVERITY_WEIGHT)
+    coverage = compliance_tenths(compliant, partial, linked)
+    return (weight * (1000 - coverage) + 50) // 100 / 10
+
+
+def _count_status(status: str):
+    return func.coalesce(func.sum(case((AuditResult.status == status, 1), else_=0)), 0)
+
+
+def exposure_score_column(severity, linked, compliant, partial):
+    """exposure_score calculé en SQL, avec la même arithmétique entière"""
+    weight = case(
+        *[(func.upper(severity) == name, value) for name, value in SEVERITY_WEIGHTS.items()],
+        else_=DEFAULT_SEVERITY_WEIGHT,
+    )
+    coverage = case((linked > 0, ((2 * compliant + partial) * 1000 + linked) // (2 * linked)), else_=0)
+    return (weight * (1000 - coverage) + 50) // 100 / 10.0
+
+
+def refresh_risk_exposure(db: Session, risk_ids: Iterable[str]):
+    """Recalcule l'exposition des risques donnés dans la transaction courante
+
+    Seuls les risques touchés par une écriture sont recalculés, chacun via
+    l'index (risk_id, control_id) : le coût dépend du nombre de liens de ces
+    risques, pas de la taille de audit_results. Agrégat et écriture forment
+    un seul INSERT ... SELECT par lot de risques.
+    """
+    risk_ids = list(set(risk_ids))
+    if not risk_ids:
+        return
+    # Les écritures ORM en attente doivent être visibles par l'agrégat
+    db.flush()
+
+    table = RiskExposure.__table__
+    for start in range(0, len(risk_ids), LOOKUP_CHUNK):
+        chunk = risk_ids[start:start + LOOKUP_CHUNK]
+        aggregates = (
+            select(
+                ADESRisk.risk_id.label("risk_id"),
+                ADESRisk.severity.label("severity"),
+                func.count(ControlRiskLink.control_id).label("linked"),
+                _count_status("compliant").label("compliant"),
+                _count_status("partial").label("partial"),
+                _count_status("non-compliant").label("non_compliant"),
+            )
+            .outerjoin(ControlRiskLink, ControlRiskLink.risk_id == ADESRisk.risk_id)
+            .outerjoin(AuditResult, AuditResult.control_id == ControlRiskLink.control_id)
+            .where(ADESRisk.risk_id.in_(chunk))
+            .group_by(ADESRisk.risk_id, ADESRisk.severity)
+            .subquery()
+        )
+        c = aggregates.c
+        rows = select(
+            c.risk_id, c.severity, c.linked, c.compliant, c.partial, c.non_compliant,
+            # Contrôles liés sans résultat d'audit ou avec un autre statut
+            c.linked - c.compliant - c.partial - c.non_compliant,
+            exposure_score_column(c.severity, c.linked, c.compliant, c.partial),
+        ).where(true())  # WHERE explicite : lève l'ambiguïté de SQLite avec ON CONFLICT
+        stmt = insert(table).from_select(
+            ["risk_id", "severity", "linked_controls", "compliant", "partial", "non_compliant", "not_evaluated", "score"],
+            rows,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.risk_id],
+            set_={
+                **{
+                    name: stmt.excluded[name]
+                    for name in ("severity", "linked_controls", "compliant", "partial", "non_compliant", "not_evaluated", "score")
+                },
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+
+
+def rebuild_risk_exposure(db: Session):
+    """Recalcule l'exposition de tous les risques"""
+    db.query(RiskExposure).delete()
+    refresh_risk_exposure(db, db.scalars(select(ADESRisk.risk_id)))
+
+
+def ensure_risk_exposure(db: Session):
+    """Initialise la table d'exposition si elle est vide alors que des risques existent"""
+    if db.query(RiskExposure.risk_id).first() is None and \
+            db.query(ADESRisk.id).first() is not None:
+        rebuild_risk_exposure(db)
+        db.commit()
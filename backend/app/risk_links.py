@@ -0,0 +1,101 @@
+from typing import Dict, Iterable, List
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models import AuditResult, ControlRiskLink
+
+# Taille des lots pour les requêtes IN (limite de variables SQLite)
+LOOKUP_CHUNK = 500
+
+# Sous-requête corrélée (recherche par clé primaire) qui reconstruit la liste
+# "RISK-001,RISK-002" d'un contrôle : utilisable comme colonne de projection.
+linked_risks_column = (
+    select(func.group_concat(ControlRiskLink.risk_id, ","))
+    .where(ControlRiskLink.control_id == AuditResult.control_id)
+    .correlate(AuditResult)
+    .scalar_subquery()
+)
+
+# Même liste sous forme de tableau JSON ("[]" sans lien), pour l'encodage
+# des lignes directement en SQL (voir app/serialization.py).
+linked_risks_json_column = func.json(func.coalesce(
+    select(func.json_group_array(ControlRiskLink.risk_id))
+    .where(ControlRiskLink.control_id == AuditResult.control_id)
+    .correlate(AuditResult)
+    .scalar_subquery(),
+    "[]",
+))
+
+
+def normalize_risk_ids(risk_ids: Iterable[str]) -> List[str]:
+    """Supprime les doublons et les valeurs vides en conservant l'ordre"""
+    return list(dict.fromkeys(r.strip() for r in risk_ids or [] if r and r.strip()))
+
+
+def risks_for_control(db: Session, control_id: str) -> List[str]:
+    """Risques liés à un contrôle (recherche par clé primaire)"""
+    return list(db.scalars(
+        select(ControlRiskLink.risk_id)
+        .where(ControlRiskLink.control_id == control_id)
+        .order_by(ControlRiskLink.risk_id)
+    ))
+
+
+def set_control_risks_bulk(db: Session, links: Dict[str, Iterable[str]]) -> set:
+    """Remplace les risques liés de plusieurs contrôles (DELETE puis executemany)
+
+    Retourne les risques liés avant remplacement (DELETE ... RETURNING) :
+    ils doivent être recalculés au même titre que les nouveaux.
+    """
+    table = ControlRiskLink.__table__
+    control_ids = list(links)
+    previous = set()
+    for start in range(0, len(control_ids), LOOKUP_CHUNK):
+        chunk = control_ids[start:start + LOOKUP_CHUNK]
+        previous.update(db.scalars(delete(table).where(table.c.control_id.in_(chunk)).returning(table.c.risk_id)))
+
+    rows = [
+        {"control_id": control_id, "risk_id": risk_id}
+        for control_id, risk_ids in links.items()
+        for risk_id in normalize_risk_ids(risk_ids)
+    ]
+    if rows:
+        db.execute(insert(ControlRiskLink), rows)
+    return previous
+
+
+def set_control_risks(db: Session, control_id: str, risk_ids: Iterable[str]) -> set:
+    """Remplace les risques liés d'un contrôle et retourne les anciens"""
+    return set_control_risks_bulk(db, {control_id: risk_ids})
+
+
+def controls_for_risk(db: Session, risk_id: str) -> List[dict]:
+    """Contrôles liés à un risque : parcours de l'index (risk_id, control_id)
+    puis jointure par clé unique sur audit_results"""
+    rows = db.execute(
+        select(ControlRiskLink.control_id, AuditResult.control_name, AuditResult.category, AuditResult.status)
+        .outerjoin(AuditResult, AuditResult.control_id == ControlRiskLink.control_id)
+        .where(ControlRiskLink.risk_id == risk_id)
+        .order_by(ControlRiskLink.control_id)
+    )
+    return [
+        {
+            "controlId": control_id,
+            "controlName": control_name,
+            "category": category,
+            # Un contrôle lié sans résultat d'audit n'a pas encore été évalué
+            "status": status or "not-evaluated",
+        }
+        for control_id, control_name, category, status in rows
+    ]
+
+
+def linked_risk_ids(db: Session, control_ids: Iterable[str]) -> set:
+    """Ensemble des risques liés à une liste de contrôles"""
+    control_ids = list(control_ids)
+    risk_ids = set()
+    for start in range(0, len(control_ids), LOOKUP_CHUNK):
+        chunk = control_ids[start:start + LOOKUP_CHUNK]
+        risk_ids.update(db.scalars(
+            select(ControlRiskLink.risk_id).where(ControlRiskLink.control_id.in_(chunk))
+        ))
+    return risk_ids
@@ -0,0 +1,185 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import String, func, or_, select, tuple_, type_coerce, union_all
+from sqlalchemy.orm import Session
+from app.models import (
+    AuditHistory, AuditHistoryArchive, AuditResult, AuditSnapshotRow, CategoryStatistics, ComplianceRollup,
+)
+from app.statistics import (
+    COUNTER_COLUMNS, GLOBAL_CATEGORY, ROLLUP_GRANULARITIES,
+    bucket_start, compliance_score, refresh_compliance_rollups, status_counter, upsert_compliance_rollups,
+)
+
+# Nombre maximal de périodes retournées par /statistics/timeseries
+MAX_BUCKETS = 1000
+BACKFILL_FLUSH_ROWS = 5000
+
+
+def bucket_range(date_from: date, date_to: date, granularity: str) -> list:
+    """Liste des périodes couvrant [date_from, date_to]"""
+    step = timedelta(weeks=1) if granularity == "week" else timedelta(days=1)
+    buckets = []
+    current = bucket_start(date_from, granularity)
+    while current <= date_to:
+        buckets.append(current.isoformat())
+        current += step
+    return buckets
+
+
+def read_compliance_timeseries(
+    db: Session,
+    granularity: str,
+    date_from: date,
+    date_to: date,
+    categories: Optional[Iterable[str]] = None,
+) -> Dict[str, list]:
+    """Séries denses {catégorie: [point]} lues dans les rollups, en O(périodes)
+
+    Chaque série démarre de la dernière valeur connue avant ``date_from``
+    et la reporte sur les périodes sans écriture. Une seule requête pour
+    toutes les catégories : les lignes de l'intervalle, plus la dernière
+    ligne antérieure de chaque catégorie (MAX(bucket) groupé par catégorie).
+    """
+    buckets = bucket_range(date_from, date_to, granularity)
+    if categories is None:
+        categories = [category for (category,) in db.query(CategoryStatistics.category)]
+    categories = [GLOBAL_CATEGORY, *sorted(set(categories) - {GLOBAL_CATEGORY})]
+
+    table = ComplianceRollup.__table__
+    scope = (table.c.granularity == granularity) & table.c.category.in_(categories)
+    # Valeur de départ : dernière période avant l'intervalle, par catégorie (parcours de l'index)
+    previous_buckets = (
+        select(table.c.category, func.max(table.c.bucket))
+        .where(scope, table.c.bucket < buckets[0])
+        .group_by(table.c.category)
+    )
+    rows = db.execute(
+        select(table)
+        .where(scope, or_(
+            table.c.bucket.between(buckets[0], buckets[-1]),
+            tuple_(table.c.category, table.c.bucket).in_(previous_buckets),
+        ))
+        .order_by(table.c.category, table.c.bucket)
+    ).all()
+
+    previous, in_range = {}, {}
+    for row in rows:
+        if row.bucket < buckets[0]:
+            previous[row.category] = row
+        else:
+            in_range.setdefault(row.category, {})[row.bucket] = row
+
+    series = {}
+    for category in categories:
+        rows = in_range.get(category, {})
+        current = previous.get(category)
+        points = []
+        for bucket in buckets:
+            current = rows.get(bucket, current)
+            counters = {name: getattr(current, name) if current else 0 for name in COUNTER_COLUMNS}
+            points.append({
+                "bucket": bucket,
+                "total": counters["total"],
+                "compliant": counters["compliant"],
+                "partial": counters["partial"],
+                "nonCompliant": counters["non_compliant"],
+                "notEvaluated": counters["not_evaluated"],
+                "complianceScore": compliance_score(counters["compliant"], counters["partial"], counters["total"]),
+            })
+        series[category] = points
+    return series
+
+
+def known_categories(db: Session) -> Dict[str, str]:
+    """Catégorie de chaque contrôle connu (résultats courants, puis snapshots pour les supprimés)"""
+    categories = {
+        control_id: category
+        for control_id, category in db.query(AuditSnapshotRow.control_id, AuditSnapshotRow.category).order_by(
+            AuditSnapshotRow.snapshot_id
+        )
+    }
+    categories.update(db.query(AuditResult.control_id, AuditResult.category))
+    return categories
+
+
+def backfill_compliance_rollups(db: Session) -> int:
+    """Reconstruit tous les rollups en rejouant l'historique (hot + archive) dans l'ordre
+
+    Passe unique en streaming ; la période courante est ensuite recalée sur
+    les compteurs réels. Retourne le nombre de lignes écrites.
+    """
+    categories = known_categories(db)
+    branches = []
+    for table in (AuditHistory.__table__, AuditHistoryArchive.__table__):
+        timestamp_text = type_coerce(table.c.timestamp, String)
+        branches.append(select(
+            table.c.id, table.c.control_id, table.c.action, table.c.old_status, table.c.new_status,
+            timestamp_text.label("timestamp_text"),
+        ).where(timestamp_text.is_not(None)))
+    entries = union_all(*branches).subquery()
+    stream = db.execute(
+        select(entries).order_by(entries.c.timestamp_text, entries.c.id).execution_options(yield_per=BACKFILL_FLUSH_ROWS)
+    )
+
+    db.query(ComplianceRollup).delete()
+    counts = {GLOBAL_CATEGORY: dict.fromkeys(COUNTER_COLUMNS, 0)}
+    status = {}
+    open_buckets = dict.fromkeys(ROLLUP_GRANULARITIES)
+    dirty = {granularity: set() for granularity in ROLLUP_GRANULARITIES}
+    pending = []
+    written = 0
+
+    def close_bucket(granularity):
+        for category in dirty[granularity] | {GLOBAL_CATEGORY}:
+            pending.append({
+                "granularity": granularity, "bucket": open_buckets[granularity].isoformat(),
+                "category": category, **counts[category],
+            })
+        dirty[granularity].clear()
+
+    def move(category, old, new):
+        for key in (category, GLOBAL_CATEGORY):
+            row = counts.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))
+            if old is not None:
+                row["total"] -= 1
+                row[status_counter(old)] -= 1
+            if new is not None:
+                row["total"] += 1
+                row[status_counter(new)] += 1
+        for granularity in ROLLUP_GRANULARITIES:
+            dirty[granularity].add(category)
+
+    for entry in stream:
+        day = date.fromisoformat(entry.timestamp_text[:10])
+        for granularity in ROLLUP_GRANULARITIES:
+            bucket = bucket_start(day, granularity)
+            if open_buckets[granularity] != bucket:
+                if open_buckets[granularity] is not None:
+                    close_bucket(granularity)
+                open_buckets[granularity] = bucket
+
+        category = categories.get(entry.control_id)
+        if category is None:
+            continue
+        old = status.get(entry.control_id)
+        if entry.action == "deleted":
+            if entry.control_id in status:
+                move(category, status.pop(entry.control_id), None)
+        elif entry.new_status is not None:
+            status[entry.control_id] = entry.new_status
+            move(category, old, entry.new_status)
+
+        if len(pending) >= BACKFILL_FLUSH_ROWS:
+            upsert_compliance_rollups(db, pending)
+            written += len(pending)
+            pending.clear()
+
+    for granularity in ROLLUP_GRANULARITIES:
+        if open_buckets[granularity] is not None:
+            close_bucket(granularity)
+    upsert_compliance_rollups(db, pending)
+    written += len(pending)
+
+    # L'historique peut être incomplet (imports) : la période courante suit les compteurs réels
+    refresh_compliance_rollups(db)
+    return written
@@ -1,39 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.models import AuditResult, AuditHistory, User
-from app.schemas import AuditResultCreate, AuditResultUpdate, AuditResultResponse, StatisticsResponse
+from typing import List, Optional
+from app.database import get_db, get_read_db
+from app.models import AuditResult, AuditHistory, AuditTombstone, User
+from app.schemas import (
+    AuditResultCreate, AuditResultUpdate, AuditResultResponse, StatisticsResponse, BulkUpsertResponse,
+)
 from app.routers.auth import get_current_admin
+from app.statistics import (
+    adjust_category_stats, move_category_stats, apply_category_deltas, aggregate_category_stats,
+    read_category_stats, format_statistics, GLOBAL_CATEGORY,
+)
+from app.revision import bump_revision, check_not_modified, current_revision
+from app.risk_links import (
+    linked_risks_column, linked_risks_json_column, linked_risk_ids, normalize_risk_ids, risks_for_control,
+    set_control_risks, set_control_risks_bulk,
+)
+from app.risk_exposure import refresh_risk_exposure
+from app.rollups import MAX_BUCKETS, read_compliance_timeseries
+from app.events import change_feed
+from app.changes import record_tombstone, tombstone_horizon
+from app.serialization import encoded_list_response, encoded_response, fetch_raw, json_row, wants_msgpack
+from app.response_cache import response_cache
+from app.query_budget import query_budget
 
 router = APIRouter()
 
 
+# Correspondance champ API -> colonne, utilisée pour la projection ``fields=``
+AUDIT_RESULT_FIELDS = {
+    "controlId": AuditResult.control_id,
+    "controlName": AuditResult.control_name,
+    "category": AuditResult.category,
+    "status": AuditResult.status,
+    "evaluationDate": AuditResult.evaluation_date,
+    "evaluatedBy": AuditResult.evaluated_by,
+    "evidence": AuditResult.evidence,
+    "notes": AuditResult.notes,
+    "linkedRisks": linked_risks_column,
+}
+# Mêmes champs pour l'encodage JSON en SQL (liste de risques en tableau JSON)
+AUDIT_RESULT_JSON_FIELDS = {**AUDIT_RESULT_FIELDS, "linkedRisks": linked_risks_json_column}
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Valide la liste ``fields=`` (séparée par des virgules) et la retourne"""
+    if not fields:
+        return list(AUDIT_RESULT_FIELDS)
+
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in AUDIT_RESULT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Champs inconnus: {', '.join(unknown)}")
+    # controlId est toujours retourné : il sert de curseur
+    if "controlId" not in selected:
+        selected.insert(0, "controlId")
+    return selected
+
+
+def format_result_row(row, fields: List[str]) -> dict:
+    """Convertit une ligne projetée en dictionnaire API"""
+    item = dict(zip(fields, row))
+    if "linkedRisks" in item:
+        item["linkedRisks"] = item["linkedRisks"].split(",") if item["linkedRisks"] else []
+    return item
+
+
+def projected_query(db: Session, fields: List[str], as_msgpack: bool):
+    """Requête de projection ; control_id est toujours la dernière colonne (curseur)
+
+    En JSON, chaque ligne est encodée directement par SQLite (``json_object``).
+    """
+    if as_msgpack:
+        columns = [AUDIT_RESULT_FIELDS[f] for f in fields]
+    else:
+        columns = [json_row({f: AUDIT_RESULT_JSON_FIELDS[f] for f in fields})]
+    return db.query(*columns, AuditResult.control_id)
+
+
+def projected_response(request: Request, response: Response, key: str, rows, fields: List[str], as_msgpack: bool, **extra):
+    """Encode les lignes de ``projected_query`` (JSON ou MessagePack)"""
+    if as_msgpack:
+        return encoded_list_response(request, response, key, items=(format_result_row(row, fields) for row in rows), **extra)
+    return encoded_list_response(request, response, key, json_rows=(row[0] for row in rows), **extra)
+
+
 @router.get("/audit-results", response_model=dict)
-def get_audit_results(db: Session = Depends(get_db)):
-    """Récupère tous les résultats d'audit"""
-    results = db.query(AuditResult).order_by(AuditResult.control_id).all()
-    
-    formatted_results = []
-    for result in results:
-        formatted_results.append({
-            "controlId": result.control_id,
-            "controlName": result.control_name,
-            "category": result.category,
-            "status": result.status,
-            "evaluationDate": result.evaluation_date,
-            "evaluatedBy": result.evaluated_by,
-            "evidence": result.evidence,
-            "notes": result.notes,
-            "linkedRisks": result.linked_risks.split(",") if result.linked_risks else []
-        })
-    
-    return {"results": formatted_results}
+@query_budget(3)
+def get_audit_results(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    evaluated_by: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Récupère les résultats d'audit (pagination par curseur, filtres et projection)
+
+    Sans ``limit`` tous les résultats correspondants sont retournés. Avec
+    ``limit``, ``nextCursor`` contient le dernier ``controlId`` de la page à
+    repasser en ``cursor`` pour obtenir la suivante. Les réponses encodées
+    (et compressées) sont mises en cache jusqu'à la prochaine écriture.
+    """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+    cache_key = response_cache.key(request, response)
+    cached = response_cache.get(request, cache_key)
+    if cached:
+        return cached
+
+    selected = parse_fields(fields)
+    as_msgpack = wants_msgpack(request)
+    query = projected_query(db, selected, as_msgpack)
+
+    if category:
+        query = query.filter(AuditResult.category == category)
+    if status:
+        query = query.filter(AuditResult.status == status)
+    if evaluated_by:
+        query = query.filter(AuditResult.evaluated_by == evaluated_by)
+    if date_from:
+        query = query.filter(AuditResult.evaluation_date >= date_from)
+    if date_to:
+        query = query.filter(AuditResult.evaluation_date <= date_to)
+    if cursor:
+        query = query.filter(AuditResult.control_id > cursor)
+
+    query = query.order_by(AuditResult.control_id)
+    if limit:
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        query = query.limit(limit + 1)
+
+    rows = fetch_raw(db, query)
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][-1]
+
+    encoded = projected_response(request, response, "results", rows, selected, as_msgpack, nextCursor=next_cursor)
+    return response_cache.put(request, cache_key, encoded)
+
+
+@router.get("/audit-results/changes", response_model=dict)
+def get_audit_result_changes(
+    request: Request,
+    response: Response,
+    since: int = Query(..., ge=0),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Synchronisation différentielle : résultats modifiés et supprimés depuis une révision
+
+    ``revision`` est à repasser en ``since`` à la synchronisation suivante.
+    ``resync=true`` signale que des suppressions antérieures ont été
+    compactées : le client doit alors tout recharger (``since=0``).
+    """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    selected = parse_fields(fields)
+    as_msgpack = wants_msgpack(request)
+    revision = current_revision(db)
+    if since and since < tombstone_horizon(db):
+        return projected_response(
+            request, response, "upserts", [], selected, as_msgpack,
+            revision=revision, resync=True, deleted=[],
+        )
+
+    query = projected_query(db, selected, as_msgpack)
+    deleted = []
+    if since:
+        # Parcours de l'index (change_seq, control_id) limité aux lignes récentes
+        query = query.filter(AuditResult.change_seq > since)
+        deleted = [
+            control_id for (control_id,) in
+            db.query(AuditTombstone.control_id).filter(AuditTombstone.change_seq > since).order_by(AuditTombstone.change_seq)
+        ]
+    rows = fetch_raw(db, query.order_by(AuditResult.change_seq, AuditResult.control_id))
+
+    return projected_response(
+        request, response, "upserts", rows, selected, as_msgpack,
+        revision=revision, resync=False, deleted=deleted,
+    )
 
 
 @router.get("/audit-results/{control_id}", response_model=AuditResultResponse)
-def get_audit_result(control_id: str, db: Session = Depends(get_db)):
+@query_budget(4)
+def get_audit_result(control_id: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """Récupère un résultat d'audit spécifique"""
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
     result = db.query(AuditResult).filter(AuditResult.control_id == control_id).first()
     if not result:
         raise HTTPException(status_code=404, detail="Résultat non trouvé")
@@ -47,18 +216,26 @@ def get_audit_result(control_id: str, db: Session = Depends(get_db)):
         "evaluatedBy": result.evaluated_by,
         "evidence": result.evidence,
         "notes": result.notes,
-        "linkedRisks": result.linked_risks.split(",") if result.linked_risks else []
+        "linkedRisks": risks_for_control(db, control_id)
     }
 
 
+@router.get("/audit-results/{control_id}/risks", response_model=dict)
+def get_control_risks(control_id: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Récupère les risques liés à un contrôle"""
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    return {"controlId": control_id, "risks": risks_for_control(db, control_id)}
+
+
 @router.post("/audit-results", response_model=AuditResultResponse, status_code=201)
+@query_budget(8)
 def create_audit_result(audit: AuditResultCreate, current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
     """Crée un nouveau résultat d'audit"""
-    # Check if already exists
-    existing = db.query(AuditResult).filter(AuditResult.control_id == audit.controlId).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Ce contrôle a déjà été évalué")
-    
+    # Révision prise en premier : change_seq fait partie de l'INSERT
+    revision = bump_revision(db)
     db_audit = AuditResult(
         control_id=audit.controlId,
         control_name=audit.controlName,
@@ -68,9 +245,8 @@ def create_audit_result(audit: AuditResultCreate, current_user: User = Depends(g
         evaluated_by=audit.evaluatedBy,
         evidence=audit.evidence,
         notes=audit.notes,
-        linked_risks=",".join(audit.linkedRisks) if audit.linkedRisks else None
+        change_seq=revision,
     )
-    
     db.add(db_audit)
     
     # Add to history
@@ -82,14 +258,157 @@ def create_audit_result(audit: AuditResultCreate, current_user: User = Depends(g
         notes="Évaluation initiale"
     )
     db.add(history_entry)
+
+    # L'index unique sur control_id détecte les doublons : pas de SELECT préalable
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Ce contrôle a déjà été évalué")
+    
+    # Les liens existants (déclarés côté risque) sont conservés si linkedRisks est omis
+    if "linkedRisks" in audit.model_fields_set:
+        affected_risks = set_control_risks(db, audit.controlId, audit.linkedRisks)
+        affected_risks.update(normalize_risk_ids(audit.linkedRisks))
+    else:
+        affected_risks = linked_risk_ids(db, [audit.controlId])
+    
+    # Le tombstone d'un contrôle recréé est effacé par trigger (app/changes.py)
+    adjust_category_stats(db, audit.category, audit.status, 1)
+    refresh_risk_exposure(db, affected_risks)
     
     db.commit()
-    db.refresh(db_audit)
+    response_cache.invalidate()
+    change_feed.publish([{"controlId": audit.controlId, "action": "created", "status": audit.status}], revision)
     
     return audit
 
 
+# Taille des lots pour les requêtes IN (limite de variables SQLite)
+BULK_LOOKUP_CHUNK = 500
+# Budget SQL de l'upsert en masse, pour un lot d'au plus BULK_BUDGET_CHUNKS
+# tranches : 7 requêtes fixes, plus 2 par tranche (état actuel des contrôles,
+# puis DELETE de leurs liens ou lecture de leurs risques liés). Ces requêtes
+# découpées se répètent une fois par tranche.
+BULK_BUDGET_CHUNKS = 2
+
+
+@router.post("/audit-results/bulk", response_model=BulkUpsertResponse)
+@query_budget(7 + 2 * BULK_BUDGET_CHUNKS, repeats=BULK_BUDGET_CHUNKS + 1)
+def bulk_upsert_audit_results(audits: List[AuditResultCreate], current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
+    """Crée ou met à jour plusieurs résultats d'audit en une seule transaction
+
+    Les résultats sont appliqués avec un INSERT ... ON CONFLICT DO UPDATE
+    ensembliste et l'historique avec un seul executemany. Si un contrôle
+    apparaît plusieurs fois, la dernière occurrence l'emporte.
+    """
+    items = {}
+    for audit in audits:
+        items.pop(audit.controlId, None)
+        items[audit.controlId] = audit
+    if not items:
+        raise HTTPException(status_code=400, detail="Aucun résultat fourni")
+
+    # Un seul SELECT (par lot) pour connaître l'état actuel des contrôles
+    control_ids = list(items)
+    existing = {}
+    for start in range(0, len(control_ids), BULK_LOOKUP_CHUNK):
+        chunk = control_ids[start:start + BULK_LOOKUP_CHUNK]
+        for control_id, category, status in db.query(
+            AuditResult.control_id, AuditResult.category, AuditResult.status
+        ).filter(AuditResult.control_id.in_(chunk)):
+            existing[control_id] = (category, status)
+
+    rows = []
+    history_rows = []
+    deltas = {}
+    outcomes = []
+    for control_id, audit in items.items():
+        rows.append({
+            "control_id": control_id,
+            "control_name": audit.controlName,
+            "category": audit.category,
+            "status": audit.status,
+            "evaluation_date": audit.evaluationDate,
+            "evaluated_by": audit.evaluatedBy,
+            "evidence": audit.evidence,
+            "notes": audit.notes,
+        })
+        deltas[(audit.category, audit.status)] = deltas.get((audit.category, audit.status), 0) + 1
+
+        if control_id not in existing:
+            outcomes.append({"controlId": control_id, "outcome": "created", "statusChanged": True})
+            history_rows.append({
+                "control_id": control_id,
+                "action": "created",
+                "old_status": None,
+                "new_status": audit.status,
+                "user": audit.evaluatedBy or "Unknown",
+                "notes": "Évaluation initiale",
+            })
+            continue
+
+        old_category, old_status = existing[control_id]
+        deltas[(old_category, old_status)] = deltas.get((old_category, old_status), 0) - 1
+        status_changed = old_status != audit.status
+        outcomes.append({"controlId": control_id, "outcome": "updated", "statusChanged": status_changed})
+        if status_changed:
+            history_rows.append({
+                "control_id": control_id,
+                "action": "status_changed",
+                "old_status": old_status,
+                "new_status": audit.status,
+                "user": audit.evaluatedBy or "Unknown",
+                "notes": audit.notes,
+            })
+
+    revision = bump_revision(db)
+    for row in rows:
+        row["change_seq"] = revision
+
+    table = AuditResult.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.control_id],
+        set_={
+            **{name: stmt.excluded[name] for name in rows[0] if name != "control_id"},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, rows)
+    if history_rows:
+        db.execute(insert(AuditHistory.__table__), history_rows)
+    links = {
+        control_id: audit.linkedRisks
+        for control_id, audit in items.items()
+        if "linkedRisks" in audit.model_fields_set
+    }
+    # Anciens liens retournés par le DELETE ; lecture seulement pour les contrôles sans linkedRisks
+    affected_risks = set_control_risks_bulk(db, links)
+    affected_risks.update(linked_risk_ids(db, [control_id for control_id in control_ids if control_id not in links]))
+    for risk_ids in links.values():
+        affected_risks.update(normalize_risk_ids(risk_ids))
+    refresh_risk_exposure(db, affected_risks)
+    apply_category_deltas(db, deltas)
+
+    db.commit()
+    response_cache.invalidate()
+    change_feed.publish((
+        {"controlId": control_id, "action": outcome["outcome"], "status": items[control_id].status}
+        for control_id, outcome in zip(items, outcomes)
+    ), revision)
+
+    created = sum(1 for outcome in outcomes if outcome["outcome"] == "created")
+    return {
+        "revision": revision,
+        "created": created,
+        "updated": len(outcomes) - created,
+        "results": outcomes,
+    }
+
+
 @router.put("/audit-results/{control_id}", response_model=AuditResultResponse)
+@query_budget(9)
 def update_audit_result(control_id: str, audit: AuditResultUpdate, current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
     """Met à jour un résultat d'audit"""
     db_audit = db.query(AuditResult).filter(AuditResult.control_id == control_id).first()
@@ -97,6 +416,9 @@ def update_audit_result(control_id: str, audit: AuditResultUpdate, current_user:
         raise HTTPException(status_code=404, detail="Résultat non trouvé")
     
     old_status = db_audit.status
+    old_category = db_audit.category
+    # Révision prise avant la modification : change_seq fait partie de l'UPDATE
+    revision = bump_revision(db)
     
     # Update fields
     db_audit.control_name = audit.controlName
@@ -106,7 +428,15 @@ def update_audit_result(control_id: str, audit: AuditResultUpdate, current_user:
     db_audit.evaluated_by = audit.evaluatedBy
     db_audit.evidence = audit.evidence
     db_audit.notes = audit.notes
-    db_audit.linked_risks = ",".join(audit.linkedRisks) if audit.linkedRisks else None
+    db_audit.change_seq = revision
+    
+    # L'exposition ne dépend que des liens et du statut des contrôles liés
+    affected_risks = set()
+    if "linkedRisks" in audit.model_fields_set:
+        affected_risks = set_control_risks(db, control_id, audit.linkedRisks)
+        affected_risks.update(normalize_risk_ids(audit.linkedRisks))
+    elif old_status != audit.status:
+        affected_risks = linked_risk_ids(db, [control_id])
     
     # Add to history if status changed
     if old_status != audit.status:
@@ -120,92 +450,119 @@ def update_audit_result(control_id: str, audit: AuditResultUpdate, current_user:
         )
         db.add(history_entry)
     
+    move_category_stats(db, old_category, old_status, audit.category, audit.status)
+    refresh_risk_exposure(db, affected_risks)
+    
     db.commit()
-    db.refresh(db_audit)
+    response_cache.invalidate()
+    change_feed.publish([{"controlId": control_id, "action": "updated", "status": audit.status}], revision)
     
     return audit
 
 
 @router.delete("/audit-results/{control_id}")
+@query_budget(8)
 def delete_audit_result(control_id: str, current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
     """Supprime un résultat d'audit"""
-    db_audit = db.query(AuditResult).filter(AuditResult.control_id == control_id).first()
-    if not db_audit:
+    # DELETE ... RETURNING : l'état supprimé sans SELECT préalable
+    table = AuditResult.__table__
+    deleted = db.execute(
+        delete(table).where(table.c.control_id == control_id).returning(table.c.category, table.c.status)
+    ).first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Résultat non trouvé")
+    category, status = deleted
     
     # Add to history
     history_entry = AuditHistory(
         control_id=control_id,
         action="deleted",
-        old_status=db_audit.status,
+        old_status=status,
         user="System",
         notes="Résultat supprimé"
     )
     db.add(history_entry)
+    adjust_category_stats(db, category, status, -1)
+    
+    # Les liens contrôle/risque sont conservés : le contrôle redevient non évalué
+    refresh_risk_exposure(db, linked_risk_ids(db, [control_id]))
+    revision = bump_revision(db)
+    record_tombstone(db, control_id, revision)
     
-    db.delete(db_audit)
     db.commit()
+    response_cache.invalidate()
+    change_feed.publish([{"controlId": control_id, "action": "deleted", "status": None}], revision)
     
     return {"message": "Résultat supprimé avec succès"}
 
 
 @router.get("/statistics", response_model=StatisticsResponse)
-def get_statistics(db: Session = Depends(get_db)):
-    """Récupère les statistiques globales des contrôles"""
-    results = db.query(AuditResult).all()
-    
-    total = len(results)
-    compliant = len([r for r in results if r.status == "compliant"])
-    partial = len([r for r in results if r.status == "partial"])
-    non_compliant = len([r for r in results if r.status == "non-compliant"])
-    not_evaluated = len([r for r in results if r.status == "not-evaluated" or not r.status])
-    
-    # Calculate compliance score (compliant + partial/2) / total * 100
-    compliance_score = 0.0
-    if total > 0:
-        score = compliant + (partial * 0.5)
-        compliance_score = round((score / total) * 100, 1)
-    
-    # Group by category
-    categories = {}
-    for result in results:
-        cat = result.category
-        if cat not in categories:
-            categories[cat] = {"total": 0, "compliant": 0, "partial": 0, "nonCompliant": 0, "notEvaluated": 0}
-        categories[cat]["total"] += 1
-        
-        if result.status == "compliant":
-            categories[cat]["compliant"] += 1
-        elif result.status == "partial":
-            categories[cat]["partial"] += 1
-        elif result.status == "non-compliant":
-            categories[cat]["nonCompliant"] += 1
-        else:
-            categories[cat]["notEvaluated"] += 1
-    
-    by_category = []
-    for cat_name, cat_stats in categories.items():
-        cat_total = cat_stats["total"]
-        cat_score = 0.0
-        if cat_total > 0:
-            cat_score = round((cat_stats["compliant"] + cat_stats["partial"] * 0.5) / cat_total * 100, 1)
-        
-        by_category.append({
-            "category": cat_name,
-            "total": cat_total,
-            "compliant": cat_stats["compliant"],
-            "partial": cat_stats["partial"],
-            "nonCompliant": cat_stats["nonCompliant"],
-            "notEvaluated": cat_stats["notEvaluated"],
-            "complianceScore": cat_score
-        })
-    
+@query_budget(3)
+def get_statistics(request: Request, response: Response, live: bool = False, db: Session = Depends(get_read_db)):
+    """Récupère les statistiques globales des contrôles
+
+    Lit les compteurs matérialisés par catégorie (O(catégories)) ; ``live=true``
+    recalcule à la place avec un GROUP BY sur audit_results. La réponse
+    encodée est mise en cache jusqu'à la prochaine écriture.
+    """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+    cache_key = response_cache.key(request, response)
+    cached = response_cache.get(request, cache_key)
+    if cached:
+        return cached
+
+    categories = aggregate_category_stats(db) if live else read_category_stats(db)
+    statistics = StatisticsResponse(**format_statistics(categories)).model_dump()
+    return response_cache.put(request, cache_key, encoded_response(response, statistics))
+
+
+@router.get("/response-cache/stats")
+def get_response_cache_stats(current_user: User = Depends(get_current_admin)):
+    """Compteurs du cache de réponses encodées (administrateurs uniquement)"""
+    return response_cache.stats()
+
+
+@router.get("/statistics/timeseries", response_model=dict)
+def get_statistics_timeseries(
+    request: Request,
+    response: Response,
+    granularity: str = "day",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    category: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Évolution du score de conformité (global et par catégorie), par jour ou par semaine
+
+    Lue dans les rollups précalculés en O(périodes). Par défaut : les 30
+    derniers jours, ou les 26 dernières semaines.
+    """
+    if granularity not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="Granularité invalide (day ou week)")
+    # Sans borne de fin explicite, la réponse dépend de la date du jour : pas d'ETag
+    if date_to:
+        not_modified = check_not_modified(request, response, db)
+        if not_modified:
+            return not_modified
+
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - (timedelta(weeks=25) if granularity == "week" else timedelta(days=29))
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="La date de début doit précéder la date de fin")
+    step = 7 if granularity == "week" else 1
+    if (date_to - date_from).days // step + 1 > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Intervalle trop long (maximum {MAX_BUCKETS} périodes)")
+
+    series = read_compliance_timeseries(
+        db, granularity, date_from, date_to, categories=[category] if category else None,
+    )
+    global_series = series.pop(GLOBAL_CATEGORY)
     return {
-        "total": total,
-        "compliant": compliant,
-        "partial": partial,
-        "nonCompliant": non_compliant,
-        "notEvaluated": not_evaluated,
-        "complianceScore": compliance_score,
-        "byCategory": by_category
+        "granularity": granularity,
+        "from": date_from,
+        "to": date_to,
+        "global": global_series,
+        "byCategory": series,
     }
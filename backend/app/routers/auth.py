@@ -1,12 +1,15 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-import hashlib
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.auth_cache import bump_principal_revision, principal_cache
+from app.hashing import password_hasher
 from app.models import User
+from app.query_budget import dependency_queries, query_budget
 from app.schemas import UserCreate, UserResponse, Token, LoginRequest, UserUpdate
 
 router = APIRouter()
@@ -17,15 +20,8 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-# Simple password hashing using hashlib (for development - use bcrypt in production)
-def verify_password(plain_password, hashed_password):
-    """Verify a password against its hash"""
-    return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
-
-def get_password_hash(password):
-    """Hash a password"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# EventSource cannot set headers: streams also accept ?access_token=
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -38,7 +34,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_user_by(db: AsyncSession, *criteria) -> Optional[User]:
+    """Load the first user matching the given criteria"""
+    result = await db.execute(select(User).where(*criteria).limit(1))
+    return result.scalar_one_or_none()
+
+async def find_identity_conflict(db: AsyncSession, username: str, email: str, exclude_id: Optional[int] = None) -> Optional[str]:
+    """Which of username and email another user already has ("username", "email" or None), in one query"""
+    criteria = [or_(User.username == username, User.email == email)]
+    if exclude_id is not None:
+        criteria.append(User.id != exclude_id)
+    result = await db.execute(select(User.username).where(*criteria).limit(2))
+    taken = result.scalars().all()
+    if username in taken:
+        return "username"
+    return "email" if taken else None
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     """Get current authenticated user"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,11 +65,28 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = principal_cache.get(username)
     if user is None:
-        raise credentials_exception
+        version, revision = principal_cache.version(username), principal_cache.revision
+        # Metered apart: endpoint budgets do not depend on cache hits
+        with dependency_queries():
+            user = await get_user_by(db, User.username == username)
+        if user is None:
+            raise credentials_exception
+        principal_cache.put(username, user, version, revision)
     return user
 
+async def get_current_stream_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get current user from the Authorization header or the access_token query parameter
+
+    For Server-Sent Events only: the query string may end up in access logs.
+    """
+    return await get_current_user(token or access_token or "", db)
+
 async def get_current_admin(current_user: User = Depends(get_current_user)):
     """Get current admin user"""
     if current_user.role != "admin":
@@ -68,19 +97,18 @@ async def get_current_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+@query_budget(2)
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user (admin only in production)"""
     # Check if user already exists
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if db_user:
+    conflict = await find_identity_conflict(db, user.username, user.email)
+    if conflict == "username":
         raise HTTPException(status_code=400, detail="Username already registered")
-
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    if conflict == "email":
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Hash password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
 
     # Create user
     db_user = User(
@@ -90,20 +118,32 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # id and created_at come back with the INSERT (RETURNING)
+    await db.commit()
     return db_user
 
 @router.post("/login")
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Alternative login endpoint"""
-    user = db.query(User).filter(User.username == login_data.username).first()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    user = await get_user_by(db, User.username == login_data.username)
+    if user:
+        valid, needs_rehash = await password_hasher.verify(login_data.password, user.hashed_password)
+    else:
+        # Same bcrypt cost as a wrong password: response time does not reveal unknown usernames
+        valid, needs_rehash = await password_hasher.verify_unknown_user(login_data.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
 
+    # Transparently upgrade legacy SHA-256 (or weaker bcrypt) hashes
+    if needs_rehash:
+        user.hashed_password = await password_hasher.hash(login_data.password)
+        revision = await bump_principal_revision(db)
+        await db.commit()
+        principal_cache.invalidate(user.username, revision=revision)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -125,48 +165,54 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.get("/users", response_model=list[UserResponse])
-async def get_users(current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def get_users(current_user: User = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     """Get all users (admin only)"""
-    users = db.query(User).all()
-    return users
+    result = await db.execute(select(User))
+    return result.scalars().all()
 
 @router.put("/me", response_model=UserResponse)
+@query_budget(5)
 async def update_user_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user profile"""
-    # Check if username is already taken by another user
-    if user_update.username != current_user.username:
-        existing_user = db.query(User).filter(User.username == user_update.username).first()
-        if existing_user:
+    # current_user may be a cached snapshot: modify the persistent row
+    current_user = await db.get(User, current_user.id)
+    if current_user is None:
+        # Deleted since the token was validated (cached principal)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+
+    # Check if username or email is already taken by another user
+    if (user_update.username, user_update.email) != (current_user.username, current_user.email):
+        conflict = await find_identity_conflict(db, user_update.username, user_update.email, exclude_id=current_user.id)
+        if conflict == "username":
             raise HTTPException(status_code=400, detail="Username already taken")
-
-    # Check if email is already taken by another user
-    if user_update.email != current_user.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
-        if existing_user:
+        if conflict == "email":
             raise HTTPException(status_code=400, detail="Email already taken")
 
     # Update user fields
+    old_username = current_user.username
     current_user.username = user_update.username
     current_user.email = user_update.email
     current_user.role = user_update.role if current_user.role == "admin" else current_user.role  # Only admins can change roles
     
     # Update password if provided
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        current_user.hashed_password = await password_hasher.hash(user_update.password)
 
-    db.commit()
-    db.refresh(current_user)
+    revision = await bump_principal_revision(db)
+    await db.commit()
+    principal_cache.invalidate(old_username, current_user.username, revision=revision)
+    # expire_on_commit is off: the returned fields are still loaded
     return current_user
 
 @router.put("/me/password")
 async def change_password(
     password_data: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change current user password"""
     old_password = password_data.get("current_password")
@@ -175,32 +221,37 @@ async def change_password(
     if not old_password or not new_password:
         raise HTTPException(status_code=400, detail="Old password and new password are required")
 
-    if not verify_password(old_password, current_user.hashed_password):
+    current_user = await db.get(User, current_user.id)
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    valid, _ = await password_hasher.verify(old_password, current_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Old password is incorrect")
 
-    current_user.hashed_password = get_password_hash(new_password)
-    db.commit()
+    current_user.hashed_password = await password_hasher.hash(new_password)
+    revision = await bump_principal_revision(db)
+    await db.commit()
+    principal_cache.invalidate(current_user.username, revision=revision)
 
     return {"message": "Password changed successfully"}
 
 @router.post("/users", response_model=UserResponse)
+@query_budget(3)
 async def create_user(
     user: UserCreate,
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new user (admin only)"""
     # Check if user already exists
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if db_user:
+    conflict = await find_identity_conflict(db, user.username, user.email)
+    if conflict == "username":
         raise HTTPException(status_code=400, detail="Username already registered")
-
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    if conflict == "email":
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Hash password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
 
     # Create user
     db_user = User(
@@ -210,62 +261,74 @@ async def create_user(
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # id and created_at come back with the INSERT (RETURNING)
+    await db.commit()
     return db_user
 
 @router.put("/users/{user_id}", response_model=UserResponse)
+@query_budget(5)
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a user (admin only)"""
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await get_user_by(db, User.id == user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Check if username is already taken by another user
-    if user_update.username != db_user.username:
-        existing_user = db.query(User).filter(User.username == user_update.username).first()
-        if existing_user:
+    # Check if username or email is already taken by another user
+    if (user_update.username, user_update.email) != (db_user.username, db_user.email):
+        conflict = await find_identity_conflict(db, user_update.username, user_update.email, exclude_id=db_user.id)
+        if conflict == "username":
             raise HTTPException(status_code=400, detail="Username already taken")
-
-    # Check if email is already taken by another user
-    if user_update.email != db_user.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
-        if existing_user:
+        if conflict == "email":
             raise HTTPException(status_code=400, detail="Email already taken")
 
     # Update user fields
+    old_username = db_user.username
     db_user.username = user_update.username
     db_user.email = user_update.email
     db_user.role = user_update.role
     
     # Update password if provided
     if user_update.password:
-        db_user.hashed_password = get_password_hash(user_update.password)
+        db_user.hashed_password = await password_hasher.hash(user_update.password)
 
-    db.commit()
-    db.refresh(db_user)
+    revision = await bump_principal_revision(db)
+    await db.commit()
+    principal_cache.invalidate(old_username, db_user.username, revision=revision)
+    # expire_on_commit is off: the returned fields are still loaded
     return db_user
 
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a user (admin only)"""
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
 
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await get_user_by(db, User.id == user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    revision = await bump_principal_revision(db)
+    await db.commit()
+    principal_cache.invalidate(db_user.username, revision=revision)
+
+    return {"message": "User deleted successfully"}
+
+@router.get("/cache/stats")
+async def get_principal_cache_stats(current_user: User = Depends(get_current_admin)):
+    """Hit/miss counters of the authenticated-principal cache (admin only)"""
+    return principal_cache.stats()
 
-    return {"message": "User deleted successfully"}
\ No newline at end of file
+@router.get("/hashing/stats")
+async def get_hashing_stats(current_user: User = Depends(get_current_admin)):
+    """Latency metrics of the password hashing service (admin only)"""
+    return password_hasher.metrics()
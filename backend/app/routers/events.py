@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.events import change_feed
+from app.models import User
+from app.routers.auth import get_current_stream_user
+
+router = APIRouter()
+
+
+@router.get("/events/audit-results")
+def stream_audit_changes(
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_stream_user),
+):
+    """Flux Server-Sent Events des changements de résultats d'audit
+
+    Authentifié par l'en-tête Authorization ou ``?access_token=`` (EventSource
+    ne peut pas envoyer d'en-tête). Chaque événement ``change`` porte la
+    révision et, par contrôle modifié, son nouveau statut (``null`` s'il a
+    été supprimé), ou par risque son nouveau statut (``riskId``). ``resync``
+    indique que des changements ont été regroupés ou manqués : recharger la
+    liste.
+    """
+    if change_feed.full():
+        raise HTTPException(status_code=503, detail="Trop d'abonnés au flux de changements")
+
+    try:
+        last_revision = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_revision = None
+
+    return StreamingResponse(
+        change_feed.stream(last_revision),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx ne doit pas mettre le flux en tampon
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, union_all
+from app.database import ReadSessionLocal
+from app.models import AuditResult, AuditHistory, AuditHistoryArchive, User
+from app.routers.auth import get_current_admin
+from app.routers.audit import AUDIT_RESULT_FIELDS, format_result_row
+
+router = APIRouter()
+
+# Nombre de lignes lues par aller-retour du curseur côté serveur
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Champ exporté -> colonne, communes à la table chaude et à l'archive
+HISTORY_COLUMNS = {
+    "id": "id",
+    "controlId": "control_id",
+    "action": "action",
+    "oldStatus": "old_status",
+    "newStatus": "new_status",
+    "user": "user",
+    "notes": "notes",
+    "timestamp": "timestamp",
+}
+
+
+def iter_rows(stmt):
+    """Parcourt une requête par lots avec yield_per, dans une session dédiée
+
+    La session est ouverte par le générateur lui-même : elle reste valide
+    pendant toute la durée du streaming, après la fin du handler.
+    """
+    with ReadSessionLocal() as db:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+
+
+def encode_value(value):
+    """Convertit une valeur de colonne en valeur sérialisable"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def row_object(row, keys) -> dict:
+    """Objet NDJSON d'une ligne exportée"""
+    return dict(zip(keys, map(encode_value, row)))
+
+
+def audit_result_object(row, keys) -> dict:
+    """Objet NDJSON d'un résultat d'audit : linkedRisks en liste, comme l'API"""
+    return format_result_row(list(map(encode_value, row)), keys)
+
+
+def stream_ndjson(stmt, keys, to_object=row_object):
+    """Génère le flux NDJSON (un objet JSON par ligne), un lot à la fois"""
+    for partition in iter_rows(stmt):
+        yield "".join(
+            json.dumps(to_object(row, keys), ensure_ascii=False) + "\n"
+            for row in partition
+        )
+
+
+def stream_csv(stmt, keys):
+    """Génère le flux CSV (en-tête puis un lot de lignes à la fois)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for partition in iter_rows(stmt):
+        writer.writerows([encode_value(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # En-tête seul si la table est vide
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(columns: dict, stmt, format: str, filename: str, to_object=row_object) -> StreamingResponse:
+    """Construit la réponse en streaming dans le format demandé
+
+    ``to_object`` convertit une ligne en objet NDJSON ; le CSV garde les
+    valeurs de colonne telles quelles.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format non supporté: {format} (ndjson, csv)")
+
+    keys = list(columns)
+    stream = stream_csv(stmt, keys) if format == "csv" else stream_ndjson(stmt, keys, to_object)
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+
+@router.get("/export/audit-results")
+def export_audit_results(format: str = "ndjson", current_user: User = Depends(get_current_admin)):
+    """Exporte tous les résultats d'audit en NDJSON ou CSV (streaming)
+
+    linkedRisks est une liste en NDJSON et "RISK-001,RISK-002" en CSV.
+    """
+    stmt = select(*AUDIT_RESULT_FIELDS.values()).order_by(AuditResult.control_id)
+    return export_response(AUDIT_RESULT_FIELDS, stmt, format, "audit-results", to_object=audit_result_object)
+
+
+def history_tier(table):
+    return select(*[table.c[column].label(column) for column in HISTORY_COLUMNS.values()])
+
+
+@router.get("/export/history")
+def export_history(
+    format: str = "ndjson",
+    include_archived: bool = True,
+    current_user: User = Depends(get_current_admin),
+):
+    """Exporte tout l'historique des modifications en NDJSON ou CSV (streaming)
+
+    Les entrées déplacées dans l'archive par la rétention sont incluses
+    (``include_archived=false`` pour la table chaude seule) ; les
+    identifiants d'origine étant conservés, l'export reste trié par id.
+    """
+    if include_archived:
+        tiers = union_all(
+            history_tier(AuditHistory.__table__), history_tier(AuditHistoryArchive.__table__),
+        ).subquery()
+        stmt = select(*tiers.c).order_by(tiers.c.id)
+    else:
+        stmt = history_tier(AuditHistory.__table__).order_by(AuditHistory.id)
+    return export_response(HISTORY_COLUMNS, stmt, format, "history")
@@ -1,51 +1,225 @@
-from fastapi import APIRouter, Depends
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import String, select, tuple_, type_coerce, union_all
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
-from app.models import AuditHistory, User
+from app.database import get_read_db
+from app.models import AuditHistory, AuditHistoryArchive, User
 from app.schemas import HistoryResponse
 from app.routers.auth import get_current_admin
+from app.revision import check_not_modified
+from app.retention import HISTORY_COLUMNS
+from app.serialization import encoded_list_response, json_row, json_timestamp, wants_msgpack
+from app.query_budget import query_budget
 
 router = APIRouter()
 
+# Valeur brute stockée par SQLite ("YYYY-MM-DD HH:MM:SS[.ffffff]") : les
+# comparaisons se font sur le texte pour rester cohérentes avec l'index,
+# quel que soit le format d'insertion (server_default ou datetime Python).
+HISTORY_TIMESTAMP_TEXT = type_coerce(AuditHistory.timestamp, String)
+TIMESTAMP_TEXT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def encode_history_cursor(timestamp: str, entry_id: int) -> str:
+    """Curseur opaque désignant la position (timestamp, id) d'une entrée"""
+    return base64.urlsafe_b64encode(f"{timestamp}|{entry_id}".encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """Décode un curseur produit par ``encode_history_cursor``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, entry_id = raw.rsplit("|", 1)
+        return timestamp, int(entry_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def parse_history_bound(value: str, end: bool = False) -> str:
+    """Convertit une date ISO en borne textuelle UTC comparable aux timestamps stockés
+
+    Une date seule utilisée comme borne de fin couvre toute la journée.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Date invalide: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.strftime(TIMESTAMP_TEXT_FORMAT)
+
+
+# Champ API -> colonne, dans l'ordre des réponses
+HISTORY_API_FIELDS = {
+    "controlId": "control_id",
+    "action": "action",
+    "oldStatus": "old_status",
+    "newStatus": "new_status",
+    "user": "user",
+    "notes": "notes",
+}
+
+
+def format_history_entry(entry) -> dict:
+    """Convertit une entrée d'historique en dictionnaire API"""
+    return {
+        "controlId": entry.control_id,
+        "action": entry.action,
+        "oldStatus": entry.old_status,
+        "newStatus": entry.new_status,
+        "user": entry.user,
+        "notes": entry.notes,
+        "timestamp": entry.timestamp
+    }
+
+
+def history_tier_query(
+    table,
+    limit: int,
+    cursor: Optional[tuple] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    control_id: Optional[str] = None,
+):
+    """SELECT paginé sur un tier d'historique (table chaude ou archive)"""
+    timestamp_text = type_coerce(table.c.timestamp, String)
+    query = select(
+        *[table.c[name] for name in HISTORY_COLUMNS],
+        timestamp_text.label("timestamp_text"),
+    )
+
+    if control_id:
+        query = query.where(table.c.control_id == control_id)
+    if user:
+        query = query.where(table.c.user == user)
+    if action:
+        query = query.where(table.c.action == action)
+    if date_from:
+        query = query.where(timestamp_text >= parse_history_bound(date_from))
+    if date_to:
+        query = query.where(timestamp_text < parse_history_bound(date_to, end=True))
+    if cursor:
+        query = query.where(tuple_(timestamp_text, table.c.id) < tuple_(*cursor))
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    return query.order_by(timestamp_text.desc(), table.c.id.desc()).limit(limit + 1)
+
+
+def query_history_page(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    as_json: bool = False,
+    **filters,
+) -> tuple:
+    """Page d'historique triée par (timestamp, id) décroissants : (lignes, nextCursor)
+
+    Pagination par clé : chaque page est un parcours d'index borné, quelle
+    que soit sa profondeur. Avec ``include_archived``, chaque tier fournit
+    au plus une page et les deux sont fusionnés. Avec ``as_json``, la
+    première colonne de chaque ligne est son encodage JSON produit par SQLite.
+    """
+    position = decode_history_cursor(cursor) if cursor else None
+    query = history_tier_query(AuditHistory.__table__, limit, position, **filters)
+    if include_archived:
+        tiers = union_all(
+            select(query.subquery()),
+            select(history_tier_query(AuditHistoryArchive.__table__, limit, position, **filters).subquery()),
+        ).subquery()
+        query = select(tiers).order_by(tiers.c.timestamp_text.desc(), tiers.c.id.desc()).limit(limit + 1)
+    if as_json:
+        page = query.subquery()
+        query = select(
+            json_row({
+                **{name: page.c[column] for name, column in HISTORY_API_FIELDS.items()},
+                "timestamp": json_timestamp(page.c.timestamp_text),
+            }),
+            page.c.timestamp_text,
+            page.c.id,
+        ).order_by(page.c.timestamp_text.desc(), page.c.id.desc())
+
+    rows = db.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_history_cursor(rows[-1].timestamp_text, rows[-1].id)
+    return rows, next_cursor
+
+
+def history_page_response(request: Request, response: Response, db: Session, limit: int, cursor: Optional[str], **filters):
+    """Page d'historique encodée en JSON (par SQLite) ou en MessagePack selon Accept"""
+    as_msgpack = wants_msgpack(request)
+    rows, next_cursor = query_history_page(db, limit, cursor=cursor, as_json=not as_msgpack, **filters)
+    if as_msgpack:
+        return encoded_list_response(
+            request, response, "history", items=(format_history_entry(row) for row in rows), nextCursor=next_cursor,
+        )
+    return encoded_list_response(
+        request, response, "history", json_rows=(row[0] for row in rows), nextCursor=next_cursor,
+    )
+
 
 @router.get("/history", response_model=dict)
-def get_history(limit: int = 50, current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
-    """Récupère l'historique des modifications récentes"""
-    history = db.query(AuditHistory).order_by(AuditHistory.timestamp.desc()).limit(limit).all()
-    
-    formatted_history = []
-    for entry in history:
-        formatted_history.append({
-            "controlId": entry.control_id,
-            "action": entry.action,
-            "oldStatus": entry.old_status,
-            "newStatus": entry.new_status,
-            "user": entry.user,
-            "notes": entry.notes,
-            "timestamp": entry.timestamp
-        })
-    
-    return {"history": formatted_history}
+@query_budget(3)
+def get_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    control_id: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_read_db),
+):
+    """Récupère l'historique des modifications (pagination par curseur et filtres)
+
+    ``nextCursor`` est à repasser en ``cursor`` pour obtenir la page suivante.
+    ``include_archived=true`` inclut les entrées déplacées dans l'archive.
+    """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    return history_page_response(
+        request, response, db, limit, cursor, include_archived=include_archived,
+        date_from=date_from, date_to=date_to, user=user, action=action, control_id=control_id,
+    )
 
 
 @router.get("/history/{control_id}", response_model=dict)
-def get_control_history(control_id: str, db: Session = Depends(get_db)):
-    """Récupère l'historique d'un contrôle spécifique"""
-    history = db.query(AuditHistory).filter(
-        AuditHistory.control_id == control_id
-    ).order_by(AuditHistory.timestamp.desc()).all()
-    
-    formatted_history = []
-    for entry in history:
-        formatted_history.append({
-            "controlId": entry.control_id,
-            "action": entry.action,
-            "oldStatus": entry.old_status,
-            "newStatus": entry.new_status,
-            "user": entry.user,
-            "notes": entry.notes,
-            "timestamp": entry.timestamp
-        })
-    
-    return {"history": formatted_history}
+@query_budget(3)
+def get_control_history(
+    control_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    """Récupère l'historique d'un contrôle spécifique (paginé)"""
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    return history_page_response(
+        request, response, db, limit, cursor, include_archived=include_archived,
+        date_from=date_from, date_to=date_to, user=user, action=action, control_id=control_id,
+    )
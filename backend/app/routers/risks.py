@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database import get_db, get_read_db
+from app.models import ADESRisk, RiskExposure, User
+from app.schemas import RiskStatusUpdate
+from app.routers.auth import get_current_admin
+from app.events import change_feed
+from app.revision import bump_revision, check_not_modified
+from app.risk_links import controls_for_risk
+
+router = APIRouter()
+
+RISK_STATUSES = ("open", "in-progress", "mitigated", "accepted", "closed")
+
+
+def format_risk(risk: ADESRisk, exposure: Optional[RiskExposure]) -> dict:
+    """Convertit un risque et son exposition précalculée en dictionnaire API"""
+    return {
+        "riskId": risk.risk_id,
+        "title": risk.title,
+        "description": risk.description,
+        "severity": risk.severity,
+        "status": risk.status,
+        "source": risk.source,
+        "exposure": {
+            "score": exposure.score if exposure else 0.0,
+            "linkedControls": exposure.linked_controls if exposure else 0,
+            "compliant": exposure.compliant if exposure else 0,
+            "partial": exposure.partial if exposure else 0,
+            "nonCompliant": exposure.non_compliant if exposure else 0,
+            "notEvaluated": exposure.not_evaluated if exposure else 0,
+        },
+    }
+
+
+@router.get("/risks", response_model=dict)
+def get_risks(
+    request: Request,
+    response: Response,
+    severity: Optional[str] = None,
+    status: Optional[str] = None,
+    sort: str = "risk_id",
+    db: Session = Depends(get_read_db),
+):
+    """Liste tous les risques ADES avec leur exposition précalculée
+
+    ``sort=exposure`` trie par exposition décroissante (index sur le score).
+    """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    query = db.query(ADESRisk, RiskExposure).outerjoin(RiskExposure, RiskExposure.risk_id == ADESRisk.risk_id)
+    if severity:
+        query = query.filter(ADESRisk.severity == severity.upper())
+    if status:
+        query = query.filter(ADESRisk.status == status)
+    if sort == "exposure":
+        query = query.order_by(RiskExposure.score.desc(), ADESRisk.risk_id)
+    else:
+        query = query.order_by(ADESRisk.risk_id)
+
+    return {"risks": [format_risk(risk, exposure) for risk, exposure in query.all()]}
+
+
+@router.get("/risks/{risk_id}", response_model=dict)
+def get_risk(risk_id: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Récupère un risque, son exposition et ses contrôles liés"""
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    row = db.query(ADESRisk, RiskExposure).outerjoin(
+        RiskExposure, RiskExposure.risk_id == ADESRisk.risk_id
+    ).filter(ADESRisk.risk_id == risk_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Risque non trouvé")
+
+    risk = format_risk(*row)
+    risk["linkedControls"] = controls_for_risk(db, risk_id)
+    return risk
+
+
+@router.get("/risks/{risk_id}/controls", response_model=dict)
+def get_risk_controls(risk_id: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Récupère les contrôles qui atténuent un risque"""
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    return {"riskId": risk_id, "controls": controls_for_risk(db, risk_id)}
+
+
+@router.put("/risks/{risk_id}/status", response_model=dict)
+def update_risk_status(risk_id: str, update: RiskStatusUpdate, current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
+    """Met à jour le statut d'un risque"""
+    if update.status not in RISK_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Statut invalide (valeurs possibles : {', '.join(RISK_STATUSES)})")
+
+    risk = db.query(ADESRisk).filter(ADESRisk.risk_id == risk_id).first()
+    if not risk:
+        raise HTTPException(status_code=404, detail="Risque non trouvé")
+
+    risk.status = update.status
+    revision = bump_revision(db)
+    db.commit()
+    change_feed.publish([{"riskId": risk_id, "action": "risk_status_changed", "status": update.status}], revision)
+
+    return {"riskId": risk_id, "status": risk.status}
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from app.database import get_read_db
+from app.models import User
+from app.revision import check_not_modified
+from app.routers.auth import get_current_admin
+from app.search import build_match_query, interleave_results, search_audit_results, search_history
+
+router = APIRouter()
+
+SEARCH_SOURCES = ("all", "results", "history")
+
+
+@router.get("/search", response_model=dict)
+def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    source: str = "all",
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_read_db),
+):
+    """Recherche plein texte dans les preuves, les notes et l'historique
+
+    Réservée aux administrateurs, comme l'historique qu'elle expose. Les
+    termes sont réduits à leur radical français et recherchés par préfixe,
+    sans tenir compte des accents ; chaque source est triée par pertinence
+    (bm25) et les sources sont alternées, avec un extrait surligné.
+    L'historique archivé par la rétention n'est pas indexé.
+    """
+    if source not in SEARCH_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Source invalide (valeurs possibles : {', '.join(SEARCH_SOURCES)})")
+
+    match = build_match_query(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="Requête de recherche vide")
+
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
+    sources = []
+    if source in ("all", "results"):
+        sources.append(search_audit_results(db, match, limit))
+    if source in ("all", "history"):
+        sources.append(search_history(db, match, limit))
+
+    return {"query": q, "results": interleave_results(*sources)[:limit]}
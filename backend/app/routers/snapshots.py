@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database import get_db, get_read_db
+from app.models import AuditSnapshot, User
+from app.routers.auth import get_current_admin
+from app.routers.history import parse_history_bound
+from app.revision import check_not_modified
+from app.snapshots import diff_states, prune_snapshots, snapshot_bounds, state_as_of, take_snapshot
+from app.config import settings
+
+router = APIRouter()
+
+
+def format_snapshot(snapshot: Optional[AuditSnapshot]) -> Optional[dict]:
+    """Convertit un snapshot en dictionnaire API"""
+    if snapshot is None:
+        return None
+    return {
+        "id": snapshot.id,
+        "takenAt": snapshot.taken_at,
+        "historyId": snapshot.history_id,
+        "revision": snapshot.revision,
+        "rowCount": snapshot.row_count,
+    }
+
+
+def format_state_row(row: dict) -> dict:
+    """Convertit une ligne d'état reconstitué en dictionnaire API"""
+    return {
+        "controlId": row["control_id"],
+        "controlName": row["control_name"],
+        "category": row["category"],
+        "status": row["status"],
+        "evaluationDate": row["evaluation_date"],
+        "evaluatedBy": row["evaluated_by"],
+    }
+
+
+def snapshot_variant(latest_id: Optional[int]) -> str:
+    """Partie de l'ETag propre aux snapshots : en prendre un (ou en purger) change la réponse"""
+    return f"s{latest_id or 0}"
+
+
+def check_snapshot_horizon(bound: str, oldest: Optional[str], value: str):
+    """Refuse une date antérieure au plus ancien snapshot conservé
+
+    Sans snapshot antérieur, la reconstitution rejouerait tout l'historique.
+    """
+    if oldest is not None and bound <= oldest:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date antérieure au plus ancien snapshot conservé ({oldest[:19]}) : {value}",
+        )
+
+
+@router.get("/snapshots", response_model=dict)
+def get_snapshots(current_user: User = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    """Liste les snapshots disponibles (du plus récent au plus ancien)"""
+    snapshots = db.query(AuditSnapshot).order_by(AuditSnapshot.id.desc()).all()
+    return {"snapshots": [format_snapshot(snapshot) for snapshot in snapshots]}
+
+
+@router.post("/snapshots", response_model=dict, status_code=201)
+def create_snapshot(current_user: User = Depends(get_current_admin), db: Session = Depends(get_db)):
+    """Prend immédiatement un snapshot de l'état courant"""
+    snapshot = take_snapshot(db)
+    prune_snapshots(db, settings.snapshot_keep)
+    db.commit()
+    db.refresh(snapshot)
+    return format_snapshot(snapshot)
+
+
+@router.get("/snapshots/state", response_model=dict)
+def get_state_as_of(
+    request: Request,
+    response: Response,
+    as_of: str,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """État des résultats d'audit à une date (snapshot le plus proche + delta d'historique)
+
+    Une date seule (``2024-01-31``) désigne la fin de cette journée. La date
+    doit être postérieure au plus ancien snapshot conservé.
+    """
+    bound = parse_history_bound(as_of, end=True)
+    latest_id, oldest = snapshot_bounds(db)
+    not_modified = check_not_modified(request, response, db, snapshot_variant(latest_id))
+    if not_modified:
+        return not_modified
+    check_snapshot_horizon(bound, oldest, as_of)
+
+    snapshot, state = state_as_of(db, bound)
+    rows = [
+        row for _, row in sorted(state.items())
+        if (not category or row["category"] == category) and (not status or row["status"] == status)
+    ]
+    return {
+        "asOf": as_of,
+        "snapshot": format_snapshot(snapshot),
+        "results": [format_state_row(row) for row in rows],
+    }
+
+
+@router.get("/snapshots/diff", response_model=dict)
+def get_state_diff(
+    request: Request,
+    response: Response,
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    db: Session = Depends(get_read_db),
+):
+    """Changements entre deux dates : contrôles ajoutés, supprimés ou changés de statut"""
+    bounds = parse_history_bound(date_from, end=True), parse_history_bound(date_to, end=True)
+    latest_id, oldest = snapshot_bounds(db)
+    not_modified = check_not_modified(request, response, db, snapshot_variant(latest_id))
+    if not_modified:
+        return not_modified
+    check_snapshot_horizon(bounds[0], oldest, date_from)
+    check_snapshot_horizon(bounds[1], oldest, date_to)
+
+    _, before = state_as_of(db, bounds[0])
+    _, after = state_as_of(db, bounds[1])
+    changes = diff_states(before, after)
+    return {
+        "from": date_from,
+        "to": date_to,
+        "changes": changes,
+        "summary": {
+            "added": sum(1 for change in changes if change["change"] == "added"),
+            "removed": sum(1 for change in changes if change["change"] == "removed"),
+            "statusChanged": sum(1 for change in changes if change["change"] == "status_changed"),
+        },
+    }
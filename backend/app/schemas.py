@@ -68,6 +68,19 @@ class AuditResultResponse(AuditResultBase):
         from_attributes = True
 
 
+class BulkItemResult(BaseModel):
+    controlId: str
+    outcome: str  # created, updated
+    statusChanged: bool
+
+
+class BulkUpsertResponse(BaseModel):
+    revision: int
+    created: int
+    updated: int
+    results: List[BulkItemResult]
+
+
 class HistoryResponse(BaseModel):
     controlId: str
     action: str
@@ -81,6 +94,29 @@ class HistoryResponse(BaseModel):
         from_attributes = True
 
 
+class RiskStatusUpdate(BaseModel):
+    status: str
+
+
+class RiskExposureResponse(BaseModel):
+    score: float
+    linkedControls: int
+    compliant: int
+    partial: int
+    nonCompliant: int
+    notEvaluated: int
+
+
+class RiskResponse(BaseModel):
+    riskId: str
+    title: str
+    description: Optional[str] = None
+    severity: str
+    status: str
+    source: Optional[str] = None
+    exposure: RiskExposureResponse
+
+
 class StatisticsResponse(BaseModel):
     total: int
     compliant: int
@@ -0,0 +1,184 @@
+import html
+import os
+import re
+import threading
+from itertools import chain, zip_longest
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# unicode61 + remove_diacritics : "sécurité" et "securite" sont équivalents ;
+# les index de préfixes accélèrent les recherches tronquées ("authentif*").
+FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+# Index FTS5 à contenu externe : le texte reste dans les tables d'origine,
+# les triggers maintiennent l'index à chaque INSERT/UPDATE/DELETE.
+SEARCH_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS audit_results_fts USING fts5(
+        evidence, notes, content = 'audit_results', content_rowid = 'id', {FTS_OPTIONS})""",
+    """CREATE TRIGGER IF NOT EXISTS audit_results_fts_insert AFTER INSERT ON audit_results BEGIN
+        INSERT INTO audit_results_fts(rowid, evidence, notes) VALUES (new.id, new.evidence, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_results_fts_delete AFTER DELETE ON audit_results BEGIN
+        INSERT INTO audit_results_fts(audit_results_fts, rowid, evidence, notes)
+        VALUES ('delete', old.id, old.evidence, old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_results_fts_update AFTER UPDATE OF evidence, notes ON audit_results BEGIN
+        INSERT INTO audit_results_fts(audit_results_fts, rowid, evidence, notes)
+        VALUES ('delete', old.id, old.evidence, old.notes);
+        INSERT INTO audit_results_fts(rowid, evidence, notes) VALUES (new.id, new.evidence, new.notes);
+    END""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS audit_history_fts USING fts5(
+        notes, content = 'audit_history', content_rowid = 'id', {FTS_OPTIONS})""",
+    """CREATE TRIGGER IF NOT EXISTS audit_history_fts_insert AFTER INSERT ON audit_history BEGIN
+        INSERT INTO audit_history_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_history_fts_delete AFTER DELETE ON audit_history BEGIN
+        INSERT INTO audit_history_fts(audit_history_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS audit_history_fts_update AFTER UPDATE OF notes ON audit_history BEGIN
+        INSERT INTO audit_history_fts(audit_history_fts, rowid, notes) VALUES ('delete', old.id, old.notes);
+        INSERT INTO audit_history_fts(rowid, notes) VALUES (new.id, new.notes);
+    END""",
+]
+
+SEARCH_TABLES = ("audit_results_fts", "audit_history_fts")
+
+# Marqueurs internes de surlignage, remplacés par <mark> après échappement HTML
+_HL_START, _HL_END = "\x02", "\x03"
+SNIPPET_TOKENS = 12
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# En deçà, un radical tronqué ramènerait presque tout l'index
+MIN_STEM_LENGTH = 3
+
+# Les stemmers Snowball gardent un état interne : un par thread
+_stemmers = threading.local()
+# Module snowballstemmer, importé à la première recherche racinisée (False s'il est absent)
+_snowball = None
+
+
+def french_stemmer():
+    """Stemmer Snowball français du thread courant, ou None sans snowballstemmer"""
+    global _snowball
+    if _snowball is None:
+        try:
+            import snowballstemmer
+            _snowball = snowballstemmer
+        except ImportError:  # Recherche sans racinisation : préfixes seuls
+            _snowball = False
+    if not _snowball:
+        return None
+    stemmer = getattr(_stemmers, "french", None)
+    if stemmer is None:
+        stemmer = _stemmers.french = _snowball.stemmer("french")
+    return stemmer
+
+
+def ensure_search_index(conn: Connection):
+    """Crée les index plein texte et leurs triggers, puis les remplit s'ils sont nouveaux"""
+    existing = {
+        name for (name,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('audit_results_fts', 'audit_history_fts')"
+        ))
+    }
+    for statement in SEARCH_SCHEMA:
+        conn.execute(text(statement))
+    for table in SEARCH_TABLES:
+        if table not in existing:
+            conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+
+
+def stem_term(term: str) -> str:
+    """Radical français (Snowball) d'un terme de recherche, utilisable comme préfixe
+
+    FTS5 n'accepte pas de tokenizer écrit en Python : l'index garde les mots
+    entiers et la racinisation se fait à la requête. Le radical est ramené au
+    plus long préfixe commun avec le terme ("différence" → "différen") pour
+    que la recherche par préfixe retrouve toujours le terme saisi.
+    """
+    lowered = term.lower()
+    stemmer = french_stemmer()
+    if stemmer is None:
+        return lowered
+    stem = os.path.commonprefix([lowered, stemmer.stemWord(lowered)])
+    return stem if len(stem) >= MIN_STEM_LENGTH else lowered
+
+
+def build_match_query(query: str) -> str:
+    """Transforme une saisie libre en requête FTS5 sûre (radicaux entre guillemets, préfixes)"""
+    terms = _TERM_RE.findall(query)
+    return " ".join(f'"{stem_term(term)}"*' for term in terms)
+
+
+def interleave_results(*sources: list) -> list:
+    """Alterne les résultats de plusieurs sources, chacune déjà triée par pertinence
+
+    Les scores bm25 dépendent des statistiques de chaque index (nombre de
+    documents, longueur moyenne) : ceux de deux tables FTS ne sont pas
+    comparables, seul le rang dans chaque source l'est.
+    """
+    return [result for result in chain.from_iterable(zip_longest(*sources)) if result is not None]
+
+
+def format_snippet(snippet: str) -> str:
+    """Échappe l'extrait et matérialise le surlignage en <mark>"""
+    if not snippet:
+        return ""
+    return html.escape(snippet).replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+def search_audit_results(db: Session, match: str, limit: int) -> list:
+    """Recherche dans les preuves et notes des résultats d'audit, triée par pertinence (bm25)"""
+    rows = db.execute(text(f"""
+        SELECT a.control_id, a.control_name, a.status, bm25(audit_results_fts) AS rank,
+               snippet(audit_results_fts, -1, :hl_start, :hl_end, '…', {SNIPPET_TOKENS}) AS snippet
+        FROM audit_results_fts
+        JOIN audit_results a ON a.id = audit_results_fts.rowid
+        WHERE audit_results_fts MATCH :match
+        ORDER BY rank
+        LIMIT :limit
+    """), {"match": match, "limit": limit, "hl_start": _HL_START, "hl_end": _HL_END})
+    return [
+        {
+            "source": "audit_result",
+            "controlId": control_id,
+            "controlName": control_name,
+            "status": status,
+            "rank": rank,
+            "snippet": format_snippet(snippet),
+        }
+        for control_id, control_name, status, rank, snippet in rows
+    ]
+
+
+def search_history(db: Session, match: str, limit: int) -> list:
+    """Recherche dans les notes de l'historique, triée par pertinence (bm25)
+
+    Seule la table chaude est indexée : les entrées archivées par la
+    rétention sortent de l'index (consultables via /history?include_archived
+    et /export/history).
+    """
+    rows = db.execute(text(f"""
+        SELECT h.id, h.control_id, h.action, h.user, h.timestamp, bm25(audit_history_fts) AS rank,
+               snippet(audit_history_fts, 0, :hl_start, :hl_end, '…', {SNIPPET_TOKENS}) AS snippet
+        FROM audit_history_fts
+        JOIN audit_history h ON h.id = audit_history_fts.rowid
+        WHERE audit_history_fts MATCH :match
+        ORDER BY rank
+        LIMIT :limit
+    """), {"match": match, "limit": limit, "hl_start": _HL_START, "hl_end": _HL_END})
+    return [
+        {
+            "source": "history",
+            "historyId": history_id,
+            "controlId": control_id,
+            "action": action,
+            "user": user,
+            "timestamp": timestamp,
+            "rank": rank,
+            "snippet": format_snippet(snippet),
+        }
+        for history_id, control_id, action, user, timestamp, rank, snippet in rows
+    ]
@@ -0,0 +1,158 @@
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.metrics import engine_labels, record_statement
+from app.query_budget import observe_statement
+
+try:
+    import msgpack
+except ImportError:  # MessagePack est optionnel : sans lui, seul JSON est servi
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+# En-têtes posés par check_not_modified à reporter sur la réponse encodée
+FORWARDED_HEADERS = ("etag", "cache-control")
+
+
+def media_ranges(accept: str) -> Dict[str, float]:
+    """Plages de l'en-tête Accept et leur qualité (q=1 par défaut, invalide : 0)"""
+    ranges = {}
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges[media_type] = max(quality, ranges.get(media_type, 0.0))
+    return ranges
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Vrai si MessagePack est le type préféré du client (en-tête Accept) et que msgpack est installé
+
+    MessagePack doit être demandé explicitement, avec une qualité non nulle
+    au moins égale à celle de JSON : ``*/*`` ou ``application/*`` ne
+    désignent que JSON, et ``application/msgpack;q=0`` l'exclut.
+    """
+    if msgpack is None:
+        return False
+    ranges = media_ranges(request.headers.get("accept", ""))
+    msgpack_quality = max((ranges.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES), default=0.0)
+    if msgpack_quality <= 0:
+        return False
+    # Qualité de JSON : la plage la plus précise qui le désigne
+    for media_range in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+        if media_range in ranges:
+            return msgpack_quality >= ranges[media_range]
+    return True
+
+
+def fetch_raw(db: Session, query) -> list:
+    """Exécute une requête et retourne les tuples DB-API bruts
+
+    Contourne la construction des objets Row de SQLAlchemy, coûteuse sur de
+    grandes listes : réservé aux colonnes sans conversion de type (texte,
+    entiers). La requête s'exécute dans la transaction de la session.
+    """
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=db.get_bind().dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    connection = db.connection()
+    dbapi_connection = connection.connection.dbapi_connection
+    sql = str(compiled)
+    started = time.perf_counter()
+    rows = dbapi_connection.execute(sql, params).fetchall()
+    # Hors des événements SQLAlchemy : comptabilisée à la main dans les métriques
+    record_statement(engine_labels.get(connection.engine, "unknown"), sql, time.perf_counter() - started)
+    if settings.debug:
+        observe_statement(dbapi_connection, sql, params)
+    return rows
+
+
+def json_row(fields: Dict[str, object]):
+    """Expression SQL json_object(...) : SQLite encode chaque ligne en texte JSON
+
+    Évite de construire un dictionnaire Python par ligne ; les colonnes déjà
+    JSON doivent être enveloppées dans ``func.json``.
+    """
+    arguments = []
+    for name, column in fields.items():
+        arguments.extend((name, column))
+    return func.json_object(*arguments)
+
+
+def json_timestamp(column):
+    """Horodatage stocké par SQLite au format ISO 8601 renvoyé par l'API"""
+    return func.replace(func.replace(column, " ", "T"), ".000000", "")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """Réponse JSON par défaut de l'application, encodée par orjson
+
+    Remplace fastapi.responses.ORJSONResponse, dépréciée par les versions
+    récentes de FastAPI ; les dates sont encodées comme dans le reste de ce
+    module.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encoded_list_response(
+    request: Request,
+    response: Response,
+    key: str,
+    json_rows: Optional[Iterable[str]] = None,
+    items: Optional[Iterable[dict]] = None,
+    **extra,
+) -> Response:
+    """Réponse {key: [...], **extra} encodée sans passer par FastAPI/pydantic
+
+    ``json_rows`` : lignes déjà encodées en JSON par SQLite (réponse JSON) ;
+    ``items`` : dictionnaires API (réponse MessagePack).
+    """
+    if items is not None:
+        content = msgpack.packb({key: list(items), **extra}, default=_default)
+        media_type = MSGPACK_MEDIA_TYPES[0]
+    else:
+        # {"key":[ligne,ligne,...] puis les autres clés encodées par orjson
+        body = ('{"' + key + '":[' + ",".join(json_rows) + "]").encode()
+        tail = orjson.dumps(extra, default=_default)
+        content = body + (b"," + tail[1:] if extra else b"}")
+        media_type = JSON_MEDIA_TYPE
+
+    return forward_headers(response, Response(content=content, media_type=media_type))
+
+
+def encoded_response(response: Response, content) -> Response:
+    """Réponse JSON encodée par orjson, sans validation par response_model"""
+    return forward_headers(response, Response(content=orjson.dumps(content, default=_default), media_type=JSON_MEDIA_TYPE))
+
+
+def forward_headers(response: Response, encoded: Response) -> Response:
+    """Reporte ETag et Cache-Control sur la réponse encodée (Vary: Accept)"""
+    for name in FORWARDED_HEADERS:
+        if name in response.headers:
+            encoded.headers[name] = response.headers[name]
+    encoded.headers["vary"] = "Accept"
+    return encoded
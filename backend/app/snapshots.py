@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from sqlalchemy import String, func, insert, literal, select, type_coerce, union_all
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import AuditHistory, AuditHistoryArchive, AuditResult, AuditSnapshot, AuditSnapshotRow
+from app.revision import current_revision
+
+logger = logging.getLogger(__name__)
+
+# Colonnes copiées dans un snapshot (les preuves et notes ne sont pas historisées)
+SNAPSHOT_COLUMNS = ("control_id", "control_name", "category", "status", "evaluation_date", "evaluated_by")
+# Taille des lots pour les requêtes IN (limite de variables SQLite)
+LOOKUP_CHUNK = 500
+
+
+def last_history_id(db: Session) -> int:
+    """Dernier identifiant d'historique, tous tiers confondus"""
+    hot = select(func.max(AuditHistory.id)).scalar_subquery()
+    archived = select(func.max(AuditHistoryArchive.id)).scalar_subquery()
+    return db.execute(select(func.coalesce(hot, archived, 0))).scalar_one()
+
+
+def take_snapshot(db: Session) -> AuditSnapshot:
+    """Copie l'état courant de audit_results (INSERT ... SELECT) dans la transaction courante"""
+    snapshot = AuditSnapshot(history_id=last_history_id(db), revision=current_revision(db))
+    db.add(snapshot)
+    db.flush()
+
+    source = select(literal(snapshot.id), *[AuditResult.__table__.c[name] for name in SNAPSHOT_COLUMNS])
+    result = db.execute(
+        insert(AuditSnapshotRow.__table__).from_select(["snapshot_id", *SNAPSHOT_COLUMNS], source)
+    )
+    snapshot.row_count = result.rowcount
+    return snapshot
+
+
+def prune_snapshots(db: Session, keep: int) -> int:
+    """Supprime les snapshots au-delà des ``keep`` plus récents"""
+    if keep <= 0:
+        return 0
+    stale = [
+        snapshot_id for (snapshot_id,) in
+        db.query(AuditSnapshot.id).order_by(AuditSnapshot.id.desc()).offset(keep)
+    ]
+    for start in range(0, len(stale), LOOKUP_CHUNK):
+        chunk = stale[start:start + LOOKUP_CHUNK]
+        db.query(AuditSnapshotRow).filter(AuditSnapshotRow.snapshot_id.in_(chunk)).delete(synchronize_session=False)
+        db.query(AuditSnapshot).filter(AuditSnapshot.id.in_(chunk)).delete(synchronize_session=False)
+    return len(stale)
+
+
+def snapshot_bounds(db: Session) -> Tuple[Optional[int], Optional[str]]:
+    """(identifiant du dernier snapshot, date brute du plus ancien conservé), en une requête"""
+    taken_at = type_coerce(AuditSnapshot.taken_at, String)
+    return tuple(db.execute(select(func.max(AuditSnapshot.id), func.min(taken_at))).one())
+
+
+def nearest_snapshot(db: Session, as_of: str) -> Tuple[Optional[AuditSnapshot], Optional[str]]:
+    """Snapshot le plus récent pris avant ``as_of`` (texte UTC), avec sa date brute"""
+    taken_at = type_coerce(AuditSnapshot.taken_at, String)
+    row = db.query(AuditSnapshot, taken_at).filter(taken_at < as_of).order_by(
+        AuditSnapshot.taken_at.desc(), AuditSnapshot.id.desc()
+    ).first()
+    return row if row else (None, None)
+
+
+def history_delta(db: Session, after_id: int, since: Optional[str], as_of: str):
+    """Entrées d'historique postérieures à un snapshot et antérieures à ``as_of``, des deux tiers
+
+    La borne basse sur le timestamp limite le parcours d'index au delta.
+    """
+    branches = []
+    for table in (AuditHistory.__table__, AuditHistoryArchive.__table__):
+        timestamp_text = type_coerce(table.c.timestamp, String)
+        query = select(table.c.id, table.c.control_id, table.c.action, table.c.new_status).where(
+            table.c.id > after_id, timestamp_text < as_of
+        )
+        if since:
+            query = query.where(timestamp_text >= since)
+        branches.append(query)
+    delta = union_all(*branches).subquery()
+    return db.execute(select(delta).order_by(delta.c.id)).all()
+
+
+def state_as_of(db: Session, as_of: str) -> Tuple[Optional[AuditSnapshot], Dict[str, dict]]:
+    """État des résultats d'audit juste avant ``as_of`` : snapshot le plus proche + rejeu du delta
+
+    Seuls l'existence et le statut sont historisés : les autres colonnes d'un
+    contrôle créé après le snapshot sont lues dans son état courant. Sans
+    snapshot antérieur, tout l'historique est rejoué : l'API refuse donc les
+    dates antérieures au plus ancien snapshot conservé (snapshot_bounds).
+    """
+    snapshot, taken_at = nearest_snapshot(db, as_of)
+    state = {}
+    if snapshot:
+        rows = db.query(*[getattr(AuditSnapshotRow, name) for name in SNAPSHOT_COLUMNS]).filter(
+            AuditSnapshotRow.snapshot_id == snapshot.id
+        )
+        state = {row.control_id: dict(row._mapping) for row in rows}
+    delta = history_delta(db, snapshot.history_id if snapshot else 0, taken_at, as_of)
+
+    missing = set()
+    for entry in delta:
+        if entry.action == "deleted":
+            state.pop(entry.control_id, None)
+        elif entry.new_status is not None:
+            row = state.get(entry.control_id)
+            if row is None:
+                row = state[entry.control_id] = {name: None for name in SNAPSHOT_COLUMNS}
+                row["control_id"] = entry.control_id
+                missing.add(entry.control_id)
+            row["status"] = entry.new_status
+
+    missing = [control_id for control_id in missing if control_id in state]
+    for start in range(0, len(missing), LOOKUP_CHUNK):
+        chunk = missing[start:start + LOOKUP_CHUNK]
+        for row in db.query(*[getattr(AuditResult, name) for name in SNAPSHOT_COLUMNS]).filter(
+            AuditResult.control_id.in_(chunk)
+        ):
+            state[row.control_id].update({
+                name: value for name, value in row._mapping.items() if name not in ("control_id", "status")
+            })
+
+    return snapshot, state
+
+
+def diff_states(before: Dict[str, dict], after: Dict[str, dict]) -> list:
+    """Différences entre deux états : contrôles ajoutés, supprimés ou changés de statut"""
+    changes = []
+    for control_id in sorted(before.keys() | after.keys()):
+        old, new = before.get(control_id), after.get(control_id)
+        if old is None:
+            change = "added"
+        elif new is None:
+            change = "removed"
+        elif old["status"] != new["status"]:
+            change = "status_changed"
+        else:
+            continue
+        changes.append({
+            "controlId": control_id,
+            "change": change,
+            "oldStatus": old["status"] if old else None,
+            "newStatus": new["status"] if new else None,
+        })
+    return changes
+
+
+def snapshot_due(db: Session, now: Optional[datetime] = None) -> bool:
+    """Vrai si le dernier snapshot est trop ancien ou trop en retard sur l'historique"""
+    latest = db.query(AuditSnapshot).order_by(AuditSnapshot.id.desc()).first()
+    history_id = last_history_id(db)
+    if latest is None:
+        return history_id > 0 or db.query(AuditResult.id).first() is not None
+    if history_id == latest.history_id:
+        return False
+    if history_id - latest.history_id >= settings.snapshot_max_delta:
+        return True
+    now = now or datetime.now(timezone.utc)
+    taken_at = latest.taken_at.replace(tzinfo=timezone.utc) if latest.taken_at.tzinfo is None else latest.taken_at
+    return now - taken_at >= timedelta(seconds=settings.snapshot_interval_seconds)
+
+
+def run_snapshot_if_due() -> Optional[int]:
+    """Prend un snapshot si nécessaire et retourne son identifiant"""
+    with SessionLocal() as db:
+        if not snapshot_due(db):
+            return None
+        snapshot = take_snapshot(db)
+        prune_snapshots(db, settings.snapshot_keep)
+        db.commit()
+        return snapshot.id
+
+
+async def snapshot_loop():
+    """Tâche de fond : vérifie périodiquement s'il faut prendre un snapshot"""
+    while True:
+        try:
+            snapshot_id = await asyncio.to_thread(run_snapshot_if_due)
+            if snapshot_id:
+                logger.info("Snapshot d'audit %s pris", snapshot_id)
+        except Exception:
+            logger.exception("Échec du snapshot d'audit")
+        await asyncio.sleep(settings.snapshot_check_seconds)
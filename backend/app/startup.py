@@ -0,0 +1,107 @@
+import importlib
+import logging
+import time
+from typing import Dict, Optional, Tuple
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# Paths that need every route registered (OpenAPI schema and docs)
+DOCS_PATHS = ("/openapi.json", "/docs", "/redoc")
+
+
+class StartupTimer:
+    """Cold-start timings of a worker, in milliseconds from ``started``
+
+    ``started`` is taken at the top of main.py, before any other import:
+    interpreter start-up itself is not included.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.import_ms: Optional[float] = None
+        self.ready_ms: Optional[float] = None
+        self.first_request_ms: Optional[float] = None
+
+    def elapsed(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def imported(self):
+        """Module import done: schema checked, app and eager routers built"""
+        self.import_ms = self.elapsed()
+
+    def ready(self):
+        """Lifespan start-up done: the worker accepts requests"""
+        self.ready_ms = self.elapsed()
+        logger.info("Worker prêt : import %.1f ms, prêt en %.1f ms", self.import_ms or 0, self.ready_ms)
+
+    def first_request(self):
+        self.first_request_ms = self.elapsed()
+        logger.info("Première requête servie %.1f ms après le démarrage", self.first_request_ms)
+
+    def report(self) -> dict:
+        return {
+            "importMs": self.import_ms,
+            "readyMs": self.ready_ms,
+            "firstRequestMs": self.first_request_ms,
+        }
+
+
+class LazyRouters:
+    """Routers included on first use instead of at import time
+
+    ``routers`` maps a path prefix (e.g. ``/api/export``) to the module
+    holding the router and its OpenAPI tag. The module is imported and its
+    router included the first time a request path falls under the prefix, so
+    routers the dashboard does not need stay off the cold-start path.
+    """
+
+    def __init__(self, app: FastAPI, routers: Dict[str, Tuple[str, str]], prefix: str = "/api"):
+        self.app = app
+        self.pending = dict(routers)
+        self.prefix = prefix
+
+    def include(self, path_prefix: str):
+        module_name, tag = self.pending.pop(path_prefix)
+        module = importlib.import_module(module_name)
+        self.app.include_router(module.router, prefix=self.prefix, tags=[tag])
+        # The cached schema predates the new routes
+        self.app.openapi_schema = None
+
+    def include_all(self):
+        for path_prefix in list(self.pending):
+            self.include(path_prefix)
+
+    def include_for(self, path: str):
+        """Include the routers a request path needs (all of them for the docs)"""
+        if path in DOCS_PATHS:
+            self.include_all()
+            return
+        for path_prefix in list(self.pending):
+            if path == path_prefix or path.startswith(path_prefix + "/"):
+                self.include(path_prefix)
+
+
+class StartupMiddleware:
+    """ASGI middleware: includes lazy routers on demand and times the first request"""
+
+    def __init__(self, app, timer: StartupTimer, lazy_routers: LazyRouters):
+        self.app = app
+        self.timer = timer
+        self.lazy_routers = lazy_routers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # Runs on the event loop thread: routers are never included twice
+        if self.lazy_routers.pending:
+            self.lazy_routers.include_for(scope["path"])
+        if self.timer.first_request_ms is not None:
+            return await self.app(scope, receive, send)
+
+        async def send_and_time(message):
+            if message["type"] == "http.response.start" and self.timer.first_request_ms is None:
+                self.timer.first_request()
+            await send(message)
+
+        await self.app(scope, receive, send_and_time)
@@ -0,0 +1,205 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+from sqlalchemy import func, literal, select, true, union_all
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.models import AuditResult, CategoryStatistics, ComplianceRollup
+
+# Colonne de compteur pour chaque statut ; tout autre statut compte comme non évalué
+STATUS_COUNTERS = {
+    "compliant": "compliant",
+    "partial": "partial",
+    "non-compliant": "non_compliant",
+}
+COUNTER_COLUMNS = ("total", "compliant", "partial", "non_compliant", "not_evaluated")
+# Granularités des séries temporelles et catégorie portant le total global
+ROLLUP_GRANULARITIES = ("day", "week")
+GLOBAL_CATEGORY = "*"
+
+
+def status_counter(status) -> str:
+    """Retourne la colonne de compteur correspondant à un statut"""
+    return STATUS_COUNTERS.get(status, "not_evaluated")
+
+
+def apply_category_deltas(db: Session, deltas: dict):
+    """Applique des deltas {(catégorie, statut): n} avec un seul upsert executemany"""
+    rows = {}
+    for (category, status), delta in deltas.items():
+        if not delta:
+            continue
+        row = rows.setdefault(category, dict.fromkeys(COUNTER_COLUMNS, 0))
+        row["total"] += delta
+        row[status_counter(status)] += delta
+    if not rows:
+        return
+
+    table = CategoryStatistics.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.category],
+        set_={name: table.c[name] + stmt.excluded[name] for name in COUNTER_COLUMNS},
+    )
+    db.execute(stmt, [{"category": category, **row} for category, row in rows.items()])
+    refresh_compliance_rollups(db, rows)
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """Premier jour de la période contenant ``day`` (lundi pour une semaine)"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def upsert_compliance_rollups(db: Session, rows: list):
+    """Écrit des lignes de rollup (valeurs absolues) avec un seul upsert executemany"""
+    if not rows:
+        return
+    table = ComplianceRollup.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.bucket, table.c.category],
+        set_={name: stmt.excluded[name] for name in COUNTER_COLUMNS},
+    )
+    db.execute(stmt, rows)
+
+
+def refresh_compliance_rollups(db: Session, categories: Optional[Iterable[str]] = None, today: Optional[date] = None):
+    """Recopie les compteurs courants dans les périodes du jour et de la semaine
+
+    Appelée après chaque mise à jour des compteurs : seules les catégories
+    touchées et le total global sont réécrits (O(catégories)), en un seul
+    INSERT ... SELECT depuis category_statistics.
+
+    Limite : la période est celle de l'écriture (``today``, UTC comme
+    l'horodatage de l'historique), pas la date d'évaluation du contrôle. Une
+    évaluation antidatée ne modifie pas les périodes passées ; seul
+    backfill_compliance_rollups, qui rejoue l'historique, les recalcule.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    stats = CategoryStatistics.__table__
+    counters = [stats.c[name] for name in COUNTER_COLUMNS]
+    totals = [func.coalesce(func.sum(stats.c[name]), 0) for name in COUNTER_COLUMNS]
+    branches = []
+    for granularity in ROLLUP_GRANULARITIES:
+        bucket = bucket_start(today, granularity).isoformat()
+        per_category = select(literal(granularity), literal(bucket), stats.c.category, *counters)
+        if categories is not None:
+            per_category = per_category.where(stats.c.category.in_(list(categories)))
+        # WHERE explicite : lève l'ambiguïté de SQLite entre ON CONFLICT et une jointure
+        branches.append(per_category.where(true()))
+        branches.append(select(literal(granularity), literal(bucket), literal(GLOBAL_CATEGORY), *totals).where(true()))
+
+    table = ComplianceRollup.__table__
+    stmt = insert(table).from_select(
+        ["granularity", "bucket", "category", *COUNTER_COLUMNS], union_all(*branches),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.bucket, table.c.category],
+        set_={name: stmt.excluded[name] for name in COUNTER_COLUMNS},
+    )
+    db.execute(stmt)
+
+
+def adjust_category_stats(db: Session, category: str, status: str, delta: int):
+    """Incrémente (ou décrémente) les compteurs d'une catégorie dans la transaction courante"""
+    apply_category_deltas(db, {(category, status): delta})
+
+
+def move_category_stats(db: Session, old_category: str, old_status: str, new_category: str, new_status: str):
+    """Déplace un résultat d'un couple (catégorie, statut) vers un autre"""
+    if old_category == new_category and status_counter(old_status) == status_counter(new_status):
+        return
+    apply_category_deltas(db, {(old_category, old_status): -1, (new_category, new_status): 1})
+
+
+def aggregate_category_stats(db: Session) -> list:
+    """Calcule les compteurs par catégorie avec un GROUP BY (category, status) en SQL"""
+    rows = db.query(
+        AuditResult.category, AuditResult.status, func.count()
+    ).group_by(AuditResult.category, AuditResult.status).all()
+
+    categories = {}
+    for category, status, count in rows:
+        stats = categories.setdefault(category, {"category": category, **dict.fromkeys(COUNTER_COLUMNS, 0)})
+        stats["total"] += count
+        stats[status_counter(status)] += count
+    return list(categories.values())
+
+
+def rebuild_category_stats(db: Session):
+    """Reconstruit entièrement la table de compteurs à partir de audit_results"""
+    db.query(CategoryStatistics).delete()
+    stats = aggregate_category_stats(db)
+    if stats:
+        db.execute(insert(CategoryStatistics.__table__), stats)
+    refresh_compliance_rollups(db)
+
+
+def ensure_category_stats(db: Session):
+    """Initialise les compteurs s'ils sont vides alors que des résultats existent"""
+    if db.query(CategoryStatistics.category).first() is None and \
+            db.query(AuditResult.id).first() is not None:
+        rebuild_category_stats(db)
+        db.commit()
+
+
+def compliance_tenths(compliant: int, partial: int, total: int) -> int:
+    """Score de conformité en dixièmes de point, arrondi au plus proche (milieu vers le haut)
+
+    Arithmétique entière : le même calcul en SQL (app/risk_exposure.py)
+    donne exactement le même résultat, sans écart d'arrondi flottant.
+    """
+    if total <= 0:
+        return 0
+    return ((2 * compliant + partial) * 1000 + total) // (2 * total)
+
+
+def compliance_score(compliant: int, partial: int, total: int) -> float:
+    """Score de conformité : (conformes + partiels/2) / total * 100"""
+    return compliance_tenths(compliant, partial, total) / 10
+
+
+def format_statistics(categories: list) -> dict:
+    """Construit la réponse /api/statistics à partir des compteurs par catégorie"""
+    totals = dict.fromkeys(COUNTER_COLUMNS, 0)
+    by_category = []
+    for stats in sorted(categories, key=lambda c: c["category"]):
+        if stats["total"] <= 0:
+            continue
+        for key in totals:
+            totals[key] += stats[key]
+        by_category.append({
+            "category": stats["category"],
+            "total": stats["total"],
+            "compliant": stats["compliant"],
+            "partial": stats["partial"],
+            "nonCompliant": stats["non_compliant"],
+            "notEvaluated": stats["not_evaluated"],
+            "complianceScore": compliance_score(stats["compliant"], stats["partial"], stats["total"]),
+        })
+
+    return {
+        "total": totals["total"],
+        "compliant": totals["compliant"],
+        "partial": totals["partial"],
+        "nonCompliant": totals["non_compliant"],
+        "notEvaluated": totals["not_evaluated"],
+        "complianceScore": compliance_score(totals["compliant"], totals["partial"], totals["total"]),
+        "byCategory": by_category,
+    }
+
+
+def read_category_stats(db: Session) -> list:
+    """Lit les compteurs matérialisés (O(catégories))"""
+    return [
+        {
+            "category": row.category,
+            "total": row.total,
+            "compliant": row.compliant,
+            "partial": row.partial,
+            "non_compliant": row.non_compliant,
+            "not_evaluated": row.not_evaluated,
+        }
+        for row in db.query(CategoryStatistics).all()
+    ]
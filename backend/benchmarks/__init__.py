@@ -0,0 +1 @@
+# Benchmarks de performance de l'API (exécuter depuis backend/ : python -m benchmarks.<module>)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test de charge de l'authentification : requêtes concurrentes sur
+GET /api/auth/me avec une latence SQL simulée.
+
+Compare l'ancien chemin (handler ``async def`` + Session synchrone, qui
+bloque la boucle d'événements) au chemin AsyncSession (aiosqlite). Avec le
+premier, les requêtes sont sérialisées : le temps total ~ N x latence.
+
+Usage : python -m benchmarks.bench_auth_concurrency [--requests 50] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def run_burst(client, path, headers, count):
+    """Lance ``count`` requêtes simultanées ; retourne (durée totale, latences)"""
+    async def one():
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(count)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(label, total, latencies):
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"  {label:<28} total {total * 1000:8.1f} ms   p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+          f"p95 {p95 * 1000:8.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Requêtes simultanées")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latence ajoutée à chaque requête SQL")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    import httpx
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy import event
+    from app.database import Base, SessionLocal, async_engine, engine
+    from app.auth_cache import principal_cache
+    from app.hashing import hash_password_sync
+    from app.models import User
+    from app.routers import auth
+
+    # Latence simulée (requête lente, disque chargé...) ajoutée par SQLite
+    # lui-même, dans le thread qui exécute la requête
+    def slow_statement(_sql):
+        time.sleep(args.latency_ms / 1000)
+
+    @event.listens_for(engine, "connect")
+    def slow_sync_connection(dbapi_connection, _record):
+        dbapi_connection.set_trace_callback(slow_statement)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def slow_async_connection(dbapi_connection, _record):
+        dbapi_connection.run_async(lambda conn: conn.set_trace_callback(slow_statement))
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add(User(username="bench", email="bench@example.com", hashed_password=hash_password_sync("bench"), role="admin"))
+        db.commit()
+
+    # Mesurer l'accès base de données, pas le cache des utilisateurs authentifiés
+    principal_cache.max_entries = 0
+
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/auth")
+
+    @app.get("/legacy/me")
+    async def legacy_me(token: str = Depends(auth.oauth2_scheme)):
+        """Ancien get_current_user : Session synchrone appelée depuis la boucle
+
+        La session est fermée dans le handler : avec get_db, les connexions
+        restent prises jusqu'à la fin de la réponse et la boucle, bloquée en
+        attente du pool, ne peut plus les libérer (interblocage).
+        """
+        username = auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("sub")
+        with SessionLocal() as db:
+            user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return {"username": user.username}
+
+    token = auth.create_access_token({"sub": "bench"})
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Échauffement (ouverture des connexions du pool)
+        await run_burst(client, "/api/auth/me", headers, 5)
+        await run_burst(client, "/legacy/me", headers, 5)
+
+        print(f"{args.requests} requêtes simultanées, {args.latency_ms:.0f} ms de latence SQL")
+        report("Session sync (bloquant)", *await run_burst(client, "/legacy/me", headers, args.requests))
+        report("AsyncSession (aiosqlite)", *await run_burst(client, "/api/auth/me", headers, args.requests))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/history : pagination par clé (timestamp, id) vs OFFSET,
+à différentes profondeurs.
+
+Usage : python -m benchmarks.bench_history [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGE_SIZE = 50
+
+
+def timed(fn, repeat):
+    """Retourne le meilleur temps (ms) sur ``repeat`` exécutions"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Nombre de lignes d'historique")
+    parser.add_argument("--controls", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from sqlalchemy import insert
+    from app.database import Base, SessionLocal, engine
+    from app.models import AuditHistory
+    from app.routers.history import HISTORY_TIMESTAMP_TEXT, encode_history_cursor, query_history_page
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        for offset in range(0, args.rows, 100_000):
+            db.execute(insert(AuditHistory), [
+                {
+                    "control_id": f"C.{rng.randrange(args.controls):05d}",
+                    "action": rng.choice(("created", "updated", "status_changed")),
+                    "user": rng.choice(("alice", "bob", "carol")),
+                    "timestamp": start + timedelta(seconds=rng.randrange(5 * 365 * 86400)),
+                }
+                for _ in range(offset, min(offset + 100_000, args.rows))
+            ])
+        db.commit()
+
+    def cursor_at(db, depth, control_id=None):
+        """Curseur de la page ``depth`` (calculé une fois, hors mesure)"""
+        query = db.query(HISTORY_TIMESTAMP_TEXT, AuditHistory.id)
+        if control_id:
+            query = query.filter(AuditHistory.control_id == control_id)
+        row = query.order_by(HISTORY_TIMESTAMP_TEXT.desc(), AuditHistory.id.desc()).offset(depth * PAGE_SIZE - 1).first()
+        return encode_history_cursor(*row) if row else None
+
+    def offset_page(db, depth, control_id=None):
+        query = db.query(AuditHistory)
+        if control_id:
+            query = query.filter(AuditHistory.control_id == control_id)
+        return query.order_by(HISTORY_TIMESTAMP_TEXT.desc(), AuditHistory.id.desc()).offset(depth * PAGE_SIZE).limit(PAGE_SIZE).all()
+
+    per_control = args.rows // args.controls // PAGE_SIZE
+    scenarios = [
+        ("global", None, [0, 10, 100, 1000, args.rows // PAGE_SIZE - 1]),
+        ("contrôle", "C.00042", [0, per_control // 4, per_control // 2]),
+    ]
+    with SessionLocal() as db:
+        print(f"{args.rows} entrées, pages de {PAGE_SIZE} (meilleur de {args.repeat})")
+        for label, control_id, depths in scenarios:
+            for depth in depths:
+                cursor = cursor_at(db, depth, control_id) if depth else None
+                keyset = timed(lambda: query_history_page(db, PAGE_SIZE, cursor=cursor, as_json=True, control_id=control_id), args.repeat)
+                offset = timed(lambda: offset_page(db, depth, control_id), args.repeat)
+                print(f"  {label:<9} page {depth:>6}   curseur {keyset:8.2f} ms   OFFSET {offset:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
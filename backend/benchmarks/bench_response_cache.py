@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark du cache de réponses encodées : requête sans cache (requête SQL +
+encodage + compression gzip) vs réponse servie depuis le cache.
+
+Usage : python -m benchmarks.bench_response_cache [--rows 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn, repeat):
+    """Retourne (meilleur temps en ms, taille transférée) sur ``repeat`` exécutions"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from app.database import Base, SessionLocal, engine
+    from app.models import AuditResult
+    from app.response_cache import response_cache
+    from app.routers import audit
+    from app.statistics import rebuild_category_stats
+
+    rng = random.Random(42)
+    statuses = ("compliant", "partial", "non-compliant", "not-evaluated")
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(AuditResult), [
+            {
+                "control_id": f"C.{i:06d}", "control_name": f"Contrôle {i}", "category": f"A.{5 + i % 4}",
+                "status": rng.choice(statuses), "evaluation_date": "2024-01-01", "evaluated_by": "bench",
+                "evidence": "Preuve documentée " * 4, "notes": "Note d'évaluation " * 2,
+            }
+            for i in range(args.rows)
+        ])
+        rebuild_category_stats(db)
+        db.commit()
+
+    app = FastAPI()
+    app.include_router(audit.router, prefix="/api")
+    app.dependency_overrides[audit.get_current_admin] = lambda: None
+
+    def fetch(url, encoding):
+        # Corps transféré tel quel (sans décompression côté client)
+        with client.stream("GET", url, headers={"Accept-Encoding": encoding}) as response:
+            return len(b"".join(response.iter_raw()))
+
+    with TestClient(app) as client:
+        print(f"{args.rows} lignes (meilleur de {args.repeat}, requête complète via ASGI)")
+        for url in ("/api/audit-results", "/api/statistics"):
+            for encoding in ("identity", "gzip"):
+
+                def cold():
+                    response_cache.invalidate()
+                    return fetch(url, encoding)
+
+                miss, size = timed(cold, args.repeat)
+                hit, _ = timed(lambda: fetch(url, encoding), args.repeat)
+                print(f"  {url:<20} {encoding:<9} sans cache {miss:9.1f} ms   cache {hit:7.2f} ms   {size / 1e6:7.2f} Mo")
+        print(f"  {response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/search : index FTS5 vs parcours complet avec LIKE.
+
+Usage : python -m benchmarks.bench_search [--rows 300000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "politique sécurité contrôle accès authentification mot de passe serveur sauvegarde "
+    "chiffrement journalisation incident fournisseur réseau pare-feu inventaire actif "
+    "formation sensibilisation vulnérabilité correctif messagerie document procédure"
+).split()
+NEEDLES = ["MFA", "WordPress", "Dark Web"]
+
+
+def random_text(rng, words=30):
+    """Texte aléatoire, avec un terme recherché dans environ 1 % des lignes"""
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    if rng.random() < 0.01:
+        text += " " + rng.choice(NEEDLES)
+    return text
+
+
+def timed(fn, repeat):
+    """Retourne le meilleur temps (ms) sur ``repeat`` exécutions"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300_000, help="Nombre de lignes d'historique (plus rows/10 résultats)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from sqlalchemy import insert, text
+    from app.database import Base, SessionLocal, engine
+    from app.models import AuditHistory, AuditResult
+    from app.search import build_match_query, ensure_search_index, search_audit_results, search_history
+
+    rng = random.Random(42)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        ensure_search_index(conn)
+    with SessionLocal() as db:
+        db.execute(insert(AuditResult), [
+            {
+                "control_id": f"C.{i:07d}", "control_name": f"Contrôle {i}", "category": "A.5",
+                "status": "partial", "evidence": random_text(rng), "notes": random_text(rng),
+            }
+            for i in range(args.rows // 10)
+        ])
+        db.execute(insert(AuditHistory), [
+            {"control_id": f"C.{i % 1000:07d}", "action": "status_changed", "user": "bench", "notes": random_text(rng)}
+            for i in range(args.rows)
+        ])
+        db.commit()
+
+    with SessionLocal() as db:
+        print(f"{args.rows + args.rows // 10} textes indexés (meilleur de {args.repeat})")
+        for needle in NEEDLES:
+            match = build_match_query(needle)
+            fts = timed(lambda: (search_audit_results(db, match, 20), search_history(db, match, 20)), args.repeat)
+            # Sans index, trier par pertinence impose de lire toutes les lignes
+            like = timed(lambda: (
+                db.execute(text(
+                    "SELECT control_id FROM audit_results WHERE evidence LIKE :p OR notes LIKE :p"
+                ), {"p": f"%{needle}%"}).all(),
+                db.execute(text("SELECT id FROM audit_history WHERE notes LIKE :p"), {"p": f"%{needle}%"}).all(),
+            ), args.repeat)
+            print(f"  {needle!r:<14} FTS5 {fts:9.2f} ms   LIKE {like:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
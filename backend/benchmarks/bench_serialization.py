@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la sérialisation des listes : ancien chemin (dictionnaires +
+response_model=dict) vs encodage JSON par SQLite + orjson, et MessagePack.
+
+Usage : python -m benchmarks.bench_serialization [--rows 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn, repeat):
+    """Retourne (meilleur temps en ms, taille de la réponse) sur ``repeat`` exécutions"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+    from app.database import Base, SessionLocal, engine, get_read_db
+    from app.models import AuditHistory, AuditResult, ControlRiskLink
+    from app.response_cache import response_cache
+    from app.routers import audit, history
+
+    # Mesure de l'encodage lui-même : cache de réponses désactivé
+    response_cache.max_bytes = 0
+
+    rng = random.Random(42)
+    statuses = ("compliant", "partial", "non-compliant", "not-evaluated")
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(AuditResult), [
+            {
+                "control_id": f"C.{i:06d}", "control_name": f"Contrôle {i}", "category": f"A.{5 + i % 4}",
+                "status": rng.choice(statuses), "evaluation_date": "2024-01-01", "evaluated_by": "bench",
+                "evidence": "Preuve documentée " * 4, "notes": "Note d'évaluation " * 2,
+            }
+            for i in range(args.rows)
+        ])
+        db.execute(insert(ControlRiskLink), [
+            {"control_id": f"C.{i:06d}", "risk_id": f"RISK-{i % 50:03d}"} for i in range(0, args.rows, 3)
+        ])
+        db.execute(insert(AuditHistory), [
+            {"control_id": f"C.{i:06d}", "action": "status_changed", "old_status": "partial",
+             "new_status": "compliant", "user": "bench", "notes": "Note d'évaluation"}
+            for i in range(args.rows)
+        ])
+        db.commit()
+
+    app = FastAPI()
+    app.include_router(audit.router, prefix="/api")
+    app.include_router(history.router, prefix="/api")
+
+    @app.get("/legacy/audit-results", response_model=dict)
+    def legacy_audit_results(db: Session = Depends(get_read_db)):
+        """Ancien chemin : un dictionnaire par ligne, validé et encodé par FastAPI"""
+        fields = list(audit.AUDIT_RESULT_FIELDS)
+        rows = db.query(*audit.AUDIT_RESULT_FIELDS.values()).order_by(AuditResult.control_id).all()
+        return {"results": [audit.format_result_row(row, fields) for row in rows], "nextCursor": None}
+
+    @app.get("/legacy/history", response_model=dict)
+    def legacy_history(limit: int, db: Session = Depends(get_read_db)):
+        entries = db.query(AuditHistory).order_by(AuditHistory.timestamp.desc(), AuditHistory.id.desc()).limit(limit).all()
+        return {"history": [history.format_history_entry(entry) for entry in entries], "nextCursor": None}
+
+    app.dependency_overrides[audit.get_current_admin] = lambda: None
+    app.dependency_overrides[history.get_current_admin] = lambda: None
+
+    msgpack = {"Accept": "application/msgpack"}
+    scenarios = [
+        ("audit-results  ancien", "/legacy/audit-results", {}),
+        ("audit-results  JSON", "/api/audit-results", {}),
+        ("audit-results  msgpack", "/api/audit-results", msgpack),
+        # /api/history est plafonné à 1000 lignes par page : comparaison à taille égale
+        ("history 1000   ancien", "/legacy/history?limit=1000", {}),
+        ("history 1000   JSON", "/api/history?limit=1000", {}),
+        ("history 1000   msgpack", "/api/history?limit=1000", msgpack),
+    ]
+    with TestClient(app) as client:
+        print(f"{args.rows} lignes (meilleur de {args.repeat}, requête complète via ASGI)")
+        for label, url, headers in scenarios:
+            elapsed, size = timed(lambda: client.get(url, headers=headers).content, args.repeat)
+            print(f"  {label:<24} {elapsed:9.1f} ms  {size / 1e6:7.2f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark des requêtes ``as_of`` : snapshot le plus proche + delta vs rejeu
+complet de l'historique, selon la longueur de l'historique.
+
+Usage : python -m benchmarks.bench_snapshots [--controls 1000] [--changes 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ("compliant", "partial", "non-compliant", "not-evaluated")
+
+
+def timed(fn, repeat):
+    """Retourne le meilleur temps (ms) sur ``repeat`` exécutions"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controls", type=int, default=1000)
+    parser.add_argument("--changes", type=int, default=200_000, help="Changements de statut par palier")
+    parser.add_argument("--steps", type=int, default=4, help="Nombre de paliers (l'historique grandit à chaque palier)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from sqlalchemy import insert, text
+    from app.database import Base, SessionLocal, engine
+    from app.models import AuditHistory, AuditResult
+    from app.snapshots import state_as_of, take_snapshot
+
+    rng = random.Random(42)
+    Base.metadata.create_all(bind=engine)
+    clock = datetime(2020, 1, 1)
+    status = {f"C.{i:05d}": "not-evaluated" for i in range(args.controls)}
+    with SessionLocal() as db:
+        db.execute(insert(AuditResult), [
+            {"control_id": cid, "control_name": cid, "category": "A.5", "status": value}
+            for cid, value in status.items()
+        ])
+        db.commit()
+
+    print(f"{args.controls} contrôles, +{args.changes} changements par palier (meilleur de {args.repeat})")
+    with SessionLocal() as db:
+        for step in range(1, args.steps + 1):
+            rows = []
+            for _ in range(args.changes):
+                cid = rng.choice(list(status))
+                new = rng.choice(STATUSES)
+                clock += timedelta(seconds=10)
+                rows.append({"control_id": cid, "action": "status_changed", "old_status": status[cid],
+                             "new_status": new, "user": "bench", "timestamp": clock})
+                status[cid] = new
+            db.execute(insert(AuditHistory), rows)
+            db.commit()
+            # Snapshot pris à mi-palier : la requête rejoue au plus un demi-palier
+            snapshot = take_snapshot(db)
+            db.commit()
+            middle = (clock - timedelta(seconds=5 * args.changes)).strftime("%Y-%m-%d %H:%M:%S")
+            db.execute(text("UPDATE audit_snapshots SET taken_at = :t, history_id = "
+                            "(SELECT max(id) FROM audit_history WHERE timestamp < :t) WHERE id = :id"),
+                       {"t": middle, "id": snapshot.id})
+            db.commit()
+
+            as_of = clock.strftime("%Y-%m-%d %H:%M:%S")
+            with_snapshot = timed(lambda: state_as_of(db, as_of), args.repeat)
+            db.execute(text("UPDATE audit_snapshots SET taken_at = '9999-12-31'"))
+            full = timed(lambda: state_as_of(db, as_of), args.repeat)
+            db.rollback()
+            print(f"  historique {step * args.changes:>8}   snapshot + delta {with_snapshot:8.2f} ms   rejeu complet {full:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
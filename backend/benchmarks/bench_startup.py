@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark du démarrage à froid d'un worker : chaque mesure lance un nouvel
+interpréteur qui importe main (vérification du schéma, routers chargés à
+l'import) puis sert sa première requête.
+
+Usage : python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans chaque interpréteur mesuré
+WORKER = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+client.get("/api/health")
+first_request = time.perf_counter()
+main.lazy_routers.include_all()
+print(json.dumps({
+    "import": (imported - started) * 1000,
+    "first_request": (first_request - started) * 1000,
+    "lazy_routers": (time.perf_counter() - first_request) * 1000,
+}))
+"""
+
+
+def run_worker(env) -> dict:
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"}
+    # Premier démarrage : création du schéma (non compté)
+    first = run_worker(env)
+    runs = [run_worker(env) for _ in range(args.runs)]
+
+    print(f"Démarrage à froid (médiane de {args.runs} processus, base déjà migrée)")
+    print(f"  création du schéma (1er démarrage)   {first['import']:8.1f} ms d'import")
+    for key, label in (
+        ("import", "import de main"),
+        ("first_request", "jusqu'à la 1re réponse"),
+        ("lazy_routers", "routers différés (coût évité)"),
+        ("process", "processus complet"),
+    ):
+        print(f"  {label:<36} {statistics.median(run[key] for run in runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/statistics : agrégation Python historique vs GROUP BY SQL
+vs compteurs matérialisés par catégorie.
+
+Usage : python -m benchmarks.bench_statistics [--rows 100000] [--categories 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ["compliant", "partial", "non-compliant", "not-evaluated"]
+
+
+def legacy_statistics(db):
+    """Ancienne implémentation : tout charger puis agréger en Python"""
+    from app.models import AuditResult
+
+    results = db.query(AuditResult).all()
+    categories = {}
+    for result in results:
+        cat = categories.setdefault(result.category, {"total": 0, "compliant": 0, "partial": 0, "nonCompliant": 0, "notEvaluated": 0})
+        cat["total"] += 1
+        if result.status == "compliant":
+            cat["compliant"] += 1
+        elif result.status == "partial":
+            cat["partial"] += 1
+        elif result.status == "non-compliant":
+            cat["nonCompliant"] += 1
+        else:
+            cat["notEvaluated"] += 1
+    return {
+        "total": len(results),
+        "compliant": len([r for r in results if r.status == "compliant"]),
+        "partial": len([r for r in results if r.status == "partial"]),
+        "nonCompliant": len([r for r in results if r.status == "non-compliant"]),
+        "notEvaluated": len([r for r in results if r.status == "not-evaluated" or not r.status]),
+        "byCategory": categories,
+    }
+
+
+def timed(fn, repeat):
+    """Retourne le meilleur temps (ms) sur ``repeat`` exécutions"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from sqlalchemy import insert
+    from app.database import Base, SessionLocal, engine
+    from app.models import AuditResult
+    from app.statistics import (
+        aggregate_category_stats, format_statistics, read_category_stats, rebuild_category_stats,
+    )
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(insert(AuditResult), [
+            {
+                "control_id": f"C.{i:07d}",
+                "control_name": f"Contrôle {i}",
+                "category": f"A.{5 + i % args.categories}",
+                "status": STATUSES[i % len(STATUSES)],
+                "evidence": "x" * 200,
+                "notes": "y" * 200,
+            }
+            for i in range(args.rows)
+        ])
+        rebuild_category_stats(db)
+        db.commit()
+
+    with SessionLocal() as db:
+        print(f"{args.rows} lignes, {args.categories} catégories (meilleur de {args.repeat})")
+        print(f"  {'python (historique)':<24}{timed(lambda: legacy_statistics(db), args.repeat):10.2f} ms")
+        db.expunge_all()
+        print(f"  {'GROUP BY SQL':<24}{timed(lambda: format_statistics(aggregate_category_stats(db)), args.repeat):10.2f} ms")
+        print(f"  {'compteurs matérialisés':<24}{timed(lambda: format_statistics(read_category_stats(db)), args.repeat):10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
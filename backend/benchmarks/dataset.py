@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Générateur de jeu de données synthétique pour les benchmarks : remplit
+users, audit_results et audit_history par insertions en masse.
+
+Usage : python -m benchmarks.dataset --db /tmp/bench.db [--scale 1m]
+        python -m benchmarks.dataset --db /tmp/bench.db --results 5000 --history 250000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Échelles prédéfinies : (résultats d'audit, entrées d'historique, utilisateurs)
+SCALES = {
+    "1k": (500, 1_000, 10),
+    "100k": (5_000, 100_000, 50),
+    "1m": (10_000, 1_000_000, 100),
+    "10m": (20_000, 10_000_000, 200),
+}
+STATUSES = ("compliant", "partial", "non-compliant", "not-evaluated")
+CATEGORIES = ("A.5", "A.6", "A.7", "A.8")
+HISTORY_ACTIONS = ("status_changed", "status_changed", "status_changed", "updated", "created")
+# Mot de passe commun à tous les utilisateurs générés ; bench-admin est administrateur
+BENCH_PASSWORD = "bench-password"
+BENCH_ADMIN = "bench-admin"
+WORDS = (
+    "politique", "sécurité", "accès", "journalisation", "sauvegarde", "chiffrement", "fournisseur",
+    "incident", "revue", "authentification", "réseau", "formation", "inventaire", "vulnérabilité",
+)
+
+
+def control_id(index: int) -> str:
+    return f"C.{index:06d}"
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def user_rows(count: int, hashed_password: str):
+    for i in range(count):
+        username = BENCH_ADMIN if i == 0 else f"bench-user-{i:05d}"
+        yield (username, f"{username}@bench.local", hashed_password, "admin" if i == 0 else "user", 1)
+
+
+def result_rows(rng: random.Random, count: int):
+    for i in range(count):
+        yield (
+            control_id(i), f"Contrôle {i}", CATEGORIES[i % len(CATEGORIES)], rng.choice(STATUSES),
+            "2024-01-01", f"bench-user-{rng.randrange(1, 50):05d}",
+            random_text(rng, 12), random_text(rng, 6), 0,
+        )
+
+
+def history_rows(rng: random.Random, count: int, results: int, users: int, days: int):
+    """Entrées réparties uniformément sur ``days`` jours jusqu'à maintenant, par ordre chronologique
+
+    Les valeurs sont tirées dans des listes précalculées : la génération ne
+    doit pas dominer le temps d'insertion à 10M de lignes.
+    """
+    control_ids = [control_id(i) for i in range(results)]
+    usernames = [f"bench-user-{i:05d}" for i in range(1, max(users, 2))]
+    transitions = [(old, new) for old in STATUSES for new in STATUSES if old != new]
+    notes = [random_text(rng, 5) for _ in range(256)] + [None] * 600
+    start = datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    day_prefixes = [(start + timedelta(days=day)).strftime("%Y-%m-%d ") for day in range(days + 1)]
+    step = days * 86400 / max(count, 1)
+    for i in range(count):
+        day, second = divmod(int(i * step), 86400)
+        hours, second = divmod(second, 3600)
+        minutes, second = divmod(second, 60)
+        old_status, new_status = rng.choice(transitions)
+        yield (
+            rng.choice(control_ids), rng.choice(HISTORY_ACTIONS), old_status, new_status,
+            rng.choice(usernames), rng.choice(notes),
+            f"{day_prefixes[day]}{hours:02d}:{minutes:02d}:{second:02d}",
+        )
+
+
+def insert_batches(conn, table: str, columns: tuple, rows, batch_size: int) -> int:
+    """executemany par lots : une transaction par lot, sans construire de dictionnaires"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.exec_driver_sql(sql, batch)
+            conn.commit()
+            inserted += len(batch)
+            batch = []
+    if batch:
+        conn.exec_driver_sql(sql, batch)
+        conn.commit()
+        inserted += len(batch)
+    return inserted
+
+
+def generate(results: int, history: int, users: int, days: int = 365, batch_size: int = 50_000, seed: int = 42) -> dict:
+    """Crée le schéma puis remplit la base désignée par DATABASE_URL
+
+    DATABASE_URL doit être défini avant l'appel (les modules de l'application
+    lisent la configuration à l'import). Retourne les volumes et durées.
+    """
+    from app.database import SessionLocal, engine
+    from app.hashing import hash_password_sync
+    from app.migrations import ensure_schema
+    from app.revision import bump_revision
+    from app.search import ensure_search_index
+    from app.statistics import rebuild_category_stats
+
+    rng = random.Random(seed)
+    ensure_schema(engine)
+    started = time.perf_counter()
+    # Un seul hachage bcrypt : tous les comptes partagent le mot de passe
+    hashed_password = hash_password_sync(BENCH_PASSWORD)
+    with engine.connect() as conn:
+        insert_batches(conn, "users", ("username", "email", "hashed_password", "role", "is_active"),
+                       user_rows(users, hashed_password), batch_size)
+        insert_batches(conn, "audit_results", (
+            "control_id", "control_name", "category", "status", "evaluation_date", "evaluated_by",
+            "evidence", "notes", "change_seq",
+        ), result_rows(rng, results), batch_size)
+        # Index plein texte reconstruit en une passe plutôt que ligne à ligne par le trigger
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS audit_history_fts_insert")
+        insert_batches(conn, "audit_history", (
+            "control_id", "action", "old_status", "new_status", "user", "notes", "timestamp",
+        ), history_rows(rng, history, results, users, days), batch_size)
+        conn.exec_driver_sql("INSERT INTO audit_history_fts(audit_history_fts) VALUES ('rebuild')")
+        ensure_search_index(conn)
+        conn.commit()
+
+    with SessionLocal() as db:
+        rebuild_category_stats(db)
+        bump_revision(db)
+        db.commit()
+
+    return {
+        "users": users,
+        "results": results,
+        "history": history,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def parse_scale(args) -> tuple:
+    results, history, users = SCALES[args.scale]
+    return (
+        args.results if args.results is not None else results,
+        args.history if args.history is not None else history,
+        args.users if args.users is not None else users,
+    )
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--scale", choices=SCALES, default="100k", help="Volumes prédéfinis (entrées d'historique)")
+    parser.add_argument("--results", type=int, help="Nombre de résultats d'audit (remplace --scale)")
+    parser.add_argument("--history", type=int, help="Nombre d'entrées d'historique (remplace --scale)")
+    parser.add_argument("--users", type=int, help="Nombre d'utilisateurs (remplace --scale)")
+    parser.add_argument("--days", type=int, default=365, help="Période couverte par l'historique (jours)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Fichier SQLite à créer (ne doit pas exister)")
+    add_scale_arguments(parser)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} existe déjà")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    results, history, users = parse_scale(args)
+    report = generate(results, history, users, days=args.days, batch_size=args.batch_size, seed=args.seed)
+    rate = (report["results"] + report["history"]) / max(report["seconds"], 1e-9)
+    print(f"✓ {report['users']} utilisateurs, {report['results']} résultats, {report['history']} entrées "
+          f"d'historique en {report['seconds']:.1f}s ({rate:,.0f} lignes/s)")
+
+
+if __name__ == "__main__":
+    main()
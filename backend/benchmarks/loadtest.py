@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test de charge in-process : les scénarios interrogent l'application FastAPI
+via un transport ASGI (sans réseau) avec N clients concurrents, puis
+rapportent latences p50/p95/p99 et requêtes/s. Le rapport JSON (--output)
+se compare à celui d'une autre version (--compare) pour détecter les
+régressions.
+
+Usage : python -m benchmarks.loadtest [--scale 100k | --db bench.db] [--scenarios list,history]
+        python -m benchmarks.loadtest --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import (
+    BENCH_ADMIN, BENCH_PASSWORD, CATEGORIES, STATUSES, add_scale_arguments, control_id, generate, parse_scale,
+)
+
+# Mesures comparées par --compare : (clé, sens de l'amélioration)
+COMPARED_METRICS = (("p50_ms", -1), ("p95_ms", -1), ("p99_ms", -1), ("rps", 1))
+
+
+class Scenario:
+    """Suite de requêtes identiques (au paramètre près) jouée par les clients concurrents"""
+
+    def __init__(self, name: str, description: str, requests: int, build):
+        self.name = name
+        self.description = description
+        self.requests = requests
+        self.build = build  # (context, index) -> (méthode, url, options httpx)
+
+
+def build_scenarios(dataset: dict, scale: float) -> dict:
+    """Scénarios disponibles ; ``scale`` multiplie le nombre de requêtes de chacun"""
+    results = dataset["results"]
+
+    def count(base):
+        return max(1, int(base * scale))
+
+    def write(context, i):
+        rng = context["rng"]
+        index = rng.randrange(results)
+        return "PUT", f"/api/audit-results/{control_id(index)}", {"json": {
+            "controlId": control_id(index), "controlName": f"Contrôle {index}",
+            "category": CATEGORIES[index % len(CATEGORIES)], "status": rng.choice(STATUSES),
+            "evaluationDate": "2024-01-01", "evaluatedBy": BENCH_ADMIN, "notes": f"charge {i}",
+        }}
+
+    scenarios = [
+        Scenario("list", "GET /api/audit-results (liste complète)", count(20),
+                 lambda context, i: ("GET", "/api/audit-results", {})),
+        Scenario("list-page", "GET /api/audit-results?limit=100 (page au hasard)", count(500),
+                 lambda context, i: ("GET", "/api/audit-results", {"params": {
+                     "limit": 100, "cursor": control_id(context["rng"].randrange(results))}})),
+        Scenario("statistics", "GET /api/statistics", count(1000),
+                 lambda context, i: ("GET", "/api/statistics", {})),
+        Scenario("history", "GET /api/history?limit=50 (première page)", count(500),
+                 lambda context, i: ("GET", "/api/history", {"params": {"limit": 50}})),
+        Scenario("history-control", "GET /api/history/{control_id}", count(500),
+                 lambda context, i: ("GET", f"/api/history/{control_id(context['rng'].randrange(results))}", {})),
+        Scenario("login", "POST /api/auth/login (bcrypt)", count(20),
+                 lambda context, i: ("POST", "/api/auth/login", {"json": {
+                     "username": BENCH_ADMIN, "password": BENCH_PASSWORD}})),
+        Scenario("writes", "PUT /api/audit-results/{control_id} concurrents", count(200), write),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Percentile au rang le plus proche sur une liste triée"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+async def run_scenario(client, scenario: Scenario, concurrency: int, headers: dict, seed: int) -> dict:
+    """Joue ``scenario.requests`` requêtes avec ``concurrency`` clients et mesure chacune"""
+    latencies = []
+    errors = 0
+    next_index = 0
+    context = {"rng": random.Random(seed)}
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < scenario.requests:
+            index = next_index
+            next_index += 1
+            method, url, options = scenario.build(context, index)
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers, **options)
+            await response.aread()
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, scenario.requests))))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_load_test(names: list, concurrency: int, scale: float, dataset: dict, seed: int) -> dict:
+    import httpx
+    import main
+
+    app = main.app
+    scenarios = build_scenarios(dataset, scale)
+    report = {}
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport ne joue pas le lifespan : démarrage explicite de l'application
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            login = await client.post("/api/auth/login", json={"username": BENCH_ADMIN, "password": BENCH_PASSWORD})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}", "Accept-Encoding": "identity"}
+            for name in names:
+                scenario = scenarios[name]
+                # Requête de chauffe : routers différés, caches et pools
+                method, url, options = scenario.build({"rng": random.Random(seed)}, 0)
+                await client.request(method, url, headers=headers, **options)
+                report[name] = await run_scenario(client, scenario, concurrency, headers, seed)
+                result = report[name]
+                print(f"  {name:<16} {result['requests']:6d} req  {result['rps']:9.1f} req/s  "
+                      f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms"
+                      f"{'  ' + str(result['errors']) + ' erreurs' if result['errors'] else ''}")
+    return report
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_reports(current: dict, baseline: dict, tolerance: float) -> list:
+    """Affiche l'écart de chaque mesure et retourne les régressions au-delà de ``tolerance``"""
+    regressions = []
+    print(f"\nComparaison avec {baseline['meta'].get('revision', '?')} (tolérance {tolerance:.0%})")
+    for key in ("dataset", "concurrency", "requests_scale", "response_cache"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(f"  ⚠️  {key} différent : {baseline['meta'].get(key)} -> {current['meta'].get(key)}")
+    for name, result in current["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        deltas = []
+        for metric, direction in COMPARED_METRICS:
+            before, after = previous.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            deltas.append(f"{metric} {change:+.1%}")
+            if change * direction < -tolerance:
+                regressions.append(f"{name}.{metric}: {before} -> {after}")
+        print(f"  {name:<16} " + "  ".join(deltas))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="Base générée par benchmarks.dataset (sinon : base temporaire générée selon --scale)")
+    add_scale_arguments(parser)
+    parser.add_argument("--scenarios", default="list,list-page,statistics,history,history-control,login,writes",
+                        help="Scénarios à jouer, séparés par des virgules")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients concurrents")
+    parser.add_argument("--requests-scale", type=float, default=1.0, help="Multiplie le nombre de requêtes par scénario")
+    parser.add_argument("--no-response-cache", action="store_true", help="Désactive le cache de réponses encodées")
+    parser.add_argument("--output", help="Fichier JSON du rapport")
+    parser.add_argument("--compare", help="Rapport JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Écart toléré avant de signaler une régression")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Les tâches de fond fausseraient les mesures ; la configuration est lue à l'import
+    os.environ["HISTORY_RETENTION_DAYS"] = "0"
+    os.environ["SNAPSHOT_INTERVAL_SECONDS"] = "0"
+    if args.no_response_cache:
+        os.environ["RESPONSE_CACHE_MAX_BYTES"] = "0"
+
+    if args.db:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+        import sqlite3
+        with sqlite3.connect(args.db) as conn:
+            dataset = {
+                table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                for table in ("users", "audit_results", "audit_history")
+            }
+        dataset = {"users": dataset["users"], "results": dataset["audit_results"], "history": dataset["audit_history"]}
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        results, history, users = parse_scale(args)
+        print(f"Génération du jeu de données ({results} résultats, {history} entrées d'historique)...")
+        dataset = generate(results, history, users, days=args.days, seed=args.seed)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(build_scenarios(dataset, 1.0))
+    if unknown:
+        parser.error(f"Scénarios inconnus : {', '.join(sorted(unknown))}")
+
+    print(f"{args.concurrency} clients concurrents, transport ASGI in-process")
+    scenarios = asyncio.run(run_load_test(names, args.concurrency, args.requests_scale, dataset, args.seed))
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": {key: dataset[key] for key in ("users", "results", "history")},
+            "concurrency": args.concurrency,
+            "requests_scale": args.requests_scale,
+            "response_cache": not args.no_response_cache,
+        },
+        "scenarios": scenarios,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✓ Rapport écrit dans {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print("✗ Régressions :\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("✓ Aucune régression")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,74 @@
-from fastapi import FastAPI
+import time
+
+# Cold-start timing starts here, before any other import (see app/startup.py)
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import audit, history, auth
+from app.database import engine, SessionLocal
+from app.routers import audit, auth
+from app.config import settings
+from app.auth_cache import principal_cache, read_principal_revision
+from app.hashing import password_hasher
+from app.migrations import ensure_schema
+from app.revision import current_revision, process_revision
+from app.startup import LazyRouters, StartupMiddleware, StartupTimer
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from app.query_budget import QueryBudgetMiddleware
+from app.serialization import ORJSONResponse
+
+startup_timer = StartupTimer(IMPORT_STARTED)
+
+# Versioned schema migrations: a single PRAGMA read when the database is up
+# to date (see app/migrations.py)
+schema_version = ensure_schema(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background archiving of old history entries (see app/retention.py)
+    # and periodic audit snapshots (see app/snapshots.py). Imported here:
+    # only the jobs that are enabled are loaded, off the import path.
+    tasks = []
+    if settings.history_retention_days > 0 or settings.tombstone_retention_days > 0:
+        from app.retention import history_retention_loop
+        tasks.append(asyncio.create_task(history_retention_loop()))
+    if settings.snapshot_interval_seconds > 0:
+        from app.snapshots import snapshot_loop
+        tasks.append(asyncio.create_task(snapshot_loop()))
+
+    # Change feed: sync handlers publish from worker threads into this loop
+    from app.events import change_feed
+    change_feed.attach(asyncio.get_running_loop())
+    with SessionLocal() as db:
+        change_feed.revision = current_revision(db)
+    # Reads serve ETags and cached responses from the in-process revision,
+    # re-read periodically for writes made by other workers (see app/revision.py)
+    if settings.revision_poll_interval_ms > 0:
+        process_revision.start(change_feed.revision)
+        tasks.append(asyncio.create_task(change_feed.watch_revision(settings.revision_poll_interval_ms / 1000)))
+        # Same interval for user writes made by other workers (see app/auth_cache.py)
+        principal_cache.advance(read_principal_revision())
+        tasks.append(asyncio.create_task(principal_cache.watch(settings.revision_poll_interval_ms / 1000)))
+    startup_timer.ready()
+    yield
+    process_revision.stop()
+    change_feed.detach()
+    for task in tasks:
+        task.cancel()
+    # bcrypt worker processes (see app/hashing.py)
+    password_hasher.shutdown()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="SMSI - Audit ADES API",
     version="3.0.0",
     description="API REST pour l'application d'audit SMSI - ADES",
+    lifespan=lifespan,
+    # orjson for every JSON response (see app/serialization.py)
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -31,12 +90,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# Include routers
+# Include routers: authentication and the dashboard endpoints are built at
+# import time, the others on their first request
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(audit.router, prefix="/api", tags=["audit"])
-app.include_router(history.router, prefix="/api", tags=["history"])
+lazy_routers = LazyRouters(app, {
+    "/api/history": ("app.routers.history", "history"),
+    "/api/risks": ("app.routers.risks", "risks"),
+    "/api/search": ("app.routers.search", "search"),
+    "/api/export": ("app.routers.export", "export"),
+    "/api/snapshots": ("app.routers.snapshots", "snapshots"),
+    "/api/events": ("app.routers.events", "events"),
+})
+# Metrics run inside StartupMiddleware so lazily included routes are resolved
+app.add_middleware(MetricsMiddleware)
+if settings.debug:
+    app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(StartupMiddleware, timer=startup_timer, lazy_routers=lazy_routers)
 
 
 @app.get("/")
@@ -52,20 +125,47 @@ def root():
             "GET /api/audit-results/{control_id}": "Obtenir un résultat spécifique",
             "PUT /api/audit-results/{control_id}": "Mettre à jour un résultat",
             "DELETE /api/audit-results/{control_id}": "Supprimer un résultat",
+            "POST /api/audit-results/bulk": "Créer ou mettre à jour plusieurs résultats",
+            "GET /api/audit-results/{control_id}/risks": "Risques liés à un contrôle",
             "GET /api/statistics": "Statistiques globales",
+            "GET /api/statistics/timeseries": "Évolution du score de conformité (jour/semaine)",
             "GET /api/risks": "Liste tous les risques ADES",
             "GET /api/risks/{risk_id}": "Obtenir un risque spécifique",
             "PUT /api/risks/{risk_id}/status": "Mettre à jour le statut d'un risque",
+            "GET /api/risks/{risk_id}/controls": "Contrôles liés à un risque",
             "GET /api/history": "Historique des modifications",
             "GET /api/history/{control_id}": "Historique d'un contrôle",
+            "GET /api/search?q=...": "Recherche plein texte (preuves, notes, historique)",
+            "GET /api/export/audit-results": "Export des résultats (NDJSON/CSV, streaming)",
+            "GET /api/export/history": "Export de l'historique (NDJSON/CSV, streaming)",
+            "GET /api/events/audit-results": "Flux SSE des changements de résultats",
+            "GET /api/snapshots": "Liste des snapshots de l'état d'audit",
+            "POST /api/snapshots": "Prendre un snapshot de l'état courant",
+            "GET /api/snapshots/state?as_of=...": "État des résultats à une date",
+            "GET /api/snapshots/diff?from=...&to=...": "Changements entre deux dates",
             "GET /api/health": "État de santé de l'API",
+            "GET /metrics": "Métriques Prometheus",
         },
     }
 
 
 @app.get("/api/health")
 def health_check():
-    return {"status": "healthy", "database": "connected"}
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "schemaVersion": schema_version,
+        "startup": startup_timer.report(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text format (latency per route, SQL per request, pool waits)"""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+startup_timer.imported()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Applique la politique de rétention de l'historique : les entrées plus
+anciennes que --days jours sont déplacées dans audit_history_archive.
+
+Usage : python scripts/archive_history.py [--days 365] [--batch-size 5000]
+"""
+import argparse
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import engine
+from app.migrations import ensure_schema
+from app.retention import run_history_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=settings.history_retention_days, help="Âge minimal des entrées archivées (jours)")
+    parser.add_argument("--batch-size", type=int, default=settings.history_retention_batch_size)
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    report = run_history_retention(days=args.days, batch_size=args.batch_size)
+    print(f"✓ {report['archived']} entrées archivées, {report['collapsed']} changements sans effet fusionnés "
+          f"({report['batches']} lots, avant {report['cutoff']})")
+
+
+if __name__ == "__main__":
+    main()
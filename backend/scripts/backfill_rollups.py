@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Reconstruit les rollups de conformité (jour/semaine) en rejouant tout
+l'historique. À lancer une fois après la mise à jour, ou pour réparer.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, engine
+from app.migrations import ensure_schema
+from app.rollups import backfill_compliance_rollups
+from app.revision import bump_revision
+
+
+def backfill_rollups():
+    """Réécrit la table compliance_rollups à partir de l'historique"""
+    ensure_schema(engine)
+    db = SessionLocal()
+
+    try:
+        written = backfill_compliance_rollups(db)
+        bump_revision(db)
+        db.commit()
+        print(f"✓ {written} lignes de rollup écrites")
+
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Erreur: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_rollups()
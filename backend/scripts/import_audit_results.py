@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Import en streaming de résultats d'audit (tableau JSON ou NDJSON).
+
+Le fichier est lu de manière incrémentale, les control_id existants sont
+chargés en une seule requête et les lignes sont insérées par lots. Après
+chaque lot validé, un checkpoint (position dans le fichier) est écrit : un
+import interrompu reprend là où il s'était arrêté.
+
+Usage : python scripts/import_audit_results.py data/audit-results.json [--batch-size 5000]
+"""
+import argparse
+import codecs
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app.database import SessionLocal, engine
+from app.models import AuditResult
+from app.statistics import apply_category_deltas
+from app.revision import bump_revision
+from app.risk_links import linked_risk_ids, normalize_risk_ids, set_control_risks_bulk
+from app.risk_exposure import refresh_risk_exposure
+from app.migrations import ensure_schema
+
+DEFAULT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 1 << 20
+
+
+def iter_ndjson(f, offset):
+    """Itère sur un fichier NDJSON : (objet, position en octets après la ligne)"""
+    f.seek(offset)
+    for line in iter(f.readline, b""):
+        if line.strip():
+            yield json.loads(line), f.tell()
+
+
+def iter_json_array(f, offset):
+    """Itère sur les éléments d'un tableau JSON sans charger tout le fichier
+
+    ``offset`` est soit le début du fichier, soit une position retournée
+    précédemment (juste après un élément).
+    """
+    decoder = json.JSONDecoder()
+    incremental = codecs.getincrementaldecoder("utf-8")()
+    # Reprise après un élément : le "[" d'ouverture est déjà passé
+    started = offset > 0
+    if offset == 0 and f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+        offset = len(codecs.BOM_UTF8)
+    f.seek(offset)
+    buffer = ""
+    index = 0  # prochain caractère à analyser dans buffer
+    position = offset  # position en octets de buffer[index]
+    eof = False
+
+    while True:
+        # Ignorer les séparateurs entre éléments
+        skip = index
+        while skip < len(buffer) and (buffer[skip] in " \t\r\n," or (buffer[skip] == "[" and not started)):
+            started = started or buffer[skip] == "["
+            skip += 1
+        position += skip - index  # séparateurs ASCII : un octet par caractère
+        index = skip
+
+        if index < len(buffer):
+            if buffer[index] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                position += len(buffer[index:end].encode("utf-8"))
+                index = end
+                yield item, position
+                continue
+        if eof:
+            return
+
+        chunk = f.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[index:] + incremental.decode(chunk, final=eof)
+        index = 0
+
+
+def detect_format(path):
+    """Retourne 'json' si le fichier commence par un tableau, sinon 'ndjson'"""
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip(codecs.BOM_UTF8).lstrip()
+    return "json" if head.startswith(b"[") else "ndjson"
+
+
+def to_row(item):
+    """Convertit un élément importé (format historique ou format API) en ligne audit_results"""
+    control_id = item.get("control") or item.get("controlId")
+    if not control_id:
+        return None
+    category = item.get("category") or ('.'.join(control_id.split('.')[:2]) if '.' in control_id else control_id)
+    return {
+        "control_id": control_id,
+        "control_name": (item.get("controlName") or item.get("description") or "")[:255],
+        "category": category,
+        "status": item.get("status") or "not-evaluated",
+        "evaluation_date": item.get("evaluationDate") or item.get("date"),
+        "evaluated_by": item.get("evaluatedBy") or item.get("auditor") or "Unknown",
+        "evidence": item.get("evidence") or "",
+        "notes": item.get("notes") or "",
+    }
+
+
+def to_risk_ids(item):
+    """Risques liés d'un élément importé (liste ou chaîne séparée par des virgules)
+
+    Retourne None si l'élément ne déclare pas de liens : les liens existants
+    sont alors conservés.
+    """
+    if "linkedRisks" not in item:
+        return None
+    linked_risks = item["linkedRisks"] or []
+    if isinstance(linked_risks, str):
+        linked_risks = linked_risks.split(",")
+    return linked_risks
+
+
+def read_checkpoint(checkpoint_path, path):
+    """Lit le checkpoint s'il correspond au fichier importé"""
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    stat = os.stat(path)
+    if checkpoint.get("size") != stat.st_size or checkpoint.get("mtime") != stat.st_mtime:
+        print("⚠️  Checkpoint ignoré : le fichier a changé depuis l'import précédent")
+        return None
+    return checkpoint
+
+
+def write_checkpoint(checkpoint_path, path, offset, imported, skipped):
+    """Écrit le checkpoint de manière atomique"""
+    stat = os.stat(path)
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "path": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "offset": offset,
+            "imported": imported,
+            "skipped": skipped,
+        }, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def import_file(path, batch_size=DEFAULT_BATCH_SIZE, checkpoint_path=None, resume=True, verbose=True):
+    """Importe un fichier JSON/NDJSON par lots ; retourne (ajoutés, ignorés)"""
+    checkpoint_path = checkpoint_path or path + ".checkpoint"
+    checkpoint = read_checkpoint(checkpoint_path, path) if resume else None
+    offset = checkpoint["offset"] if checkpoint else 0
+    imported = checkpoint["imported"] if checkpoint else 0
+    skipped = checkpoint["skipped"] if checkpoint else 0
+    if checkpoint and verbose:
+        print(f"↻ Reprise à l'octet {offset} ({imported} ajoutés, {skipped} ignorés)")
+
+    iterate = iter_json_array if detect_format(path) == "json" else iter_ndjson
+    db = SessionLocal()
+    start = time.perf_counter()
+    session_rows = 0
+
+    def flush(batch, links, position):
+        nonlocal imported, session_rows
+        if batch:
+            revision = bump_revision(db)
+            for row in batch:
+                row["change_seq"] = revision
+            # Les tombstones des contrôles recréés sont effacés par trigger
+            db.execute(insert(AuditResult), batch)
+            affected_risks = linked_risk_ids(db, [row["control_id"] for row in batch])
+            set_control_risks_bulk(db, links)
+            for risk_ids in links.values():
+                affected_risks.update(normalize_risk_ids(risk_ids))
+            refresh_risk_exposure(db, affected_risks)
+            deltas = {}
+            for row in batch:
+                key = (row["category"], row["status"])
+                deltas[key] = deltas.get(key, 0) + 1
+            apply_category_deltas(db, deltas)
+        db.commit()
+        imported += len(batch)
+        session_rows += len(batch)
+        write_checkpoint(checkpoint_path, path, position, imported, skipped)
+        if verbose and batch:
+            elapsed = time.perf_counter() - start
+            print(f"  … {imported} ajoutés, {skipped} ignorés ({session_rows / elapsed:,.0f} lignes/s)")
+
+    try:
+        # Une seule requête pour connaître les contrôles déjà présents
+        existing = {control_id for (control_id,) in db.query(AuditResult.control_id)}
+
+        batch = []
+        links = {}
+        position = offset
+        with open(path, "rb") as f:
+            for item, position in iterate(f, offset):
+                row = to_row(item)
+                if row is None or row["control_id"] in existing:
+                    skipped += 1
+                    continue
+                existing.add(row["control_id"])
+                batch.append(row)
+                risk_ids = to_risk_ids(item)
+                if risk_ids is not None:
+                    links[row["control_id"]] = risk_ids
+                if len(batch) >= batch_size:
+                    flush(batch, links, position)
+                    batch = []
+                    links = {}
+        flush(batch, links, position)
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start
+    if verbose:
+        rate = session_rows / elapsed if elapsed > 0 else 0
+        print(f"✓ Résultats d'audit: {imported} ajoutés, {skipped} ignorés en {elapsed:.2f}s ({rate:,.0f} lignes/s)")
+    return imported, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Fichier JSON (tableau) ou NDJSON à importer")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Lignes insérées par transaction")
+    parser.add_argument("--checkpoint", help="Fichier de checkpoint (défaut : <path>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignorer le checkpoint et repartir du début")
+    args = parser.parse_args()
+
+    ensure_schema(engine)
+    try:
+        import_file(args.path, args.batch_size, args.checkpoint, resume=not args.restart)
+    except Exception as e:
+        print(f"✗ Erreur: {e} (relancer la commande pour reprendre au dernier checkpoint)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
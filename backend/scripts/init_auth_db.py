@@ -8,20 +8,21 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import engine, Base
+from app.database import engine
+from app.migrations import ensure_schema
 from app.models import User
 from sqlalchemy import text
 
 def create_user_table():
     """Create the user table if it doesn't exist"""
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print("✅ User table created successfully")
+        # Create or migrate the schema
+        version = ensure_schema(engine)
+        print(f"✅ Database schema up to date (version {version})")
 
         # Create default admin user
         from sqlalchemy.orm import sessionmaker
-        import hashlib
+        from app.hashing import hash_password_sync
 
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         db = SessionLocal()
@@ -30,14 +31,14 @@ def create_user_table():
         existing_admin = db.query(User).filter(User.username == "admin").first()
         if existing_admin:
             print("ℹ️  Admin user already exists - updating password hash")
-            # Update password hash to use new method
-            hashed_password = hashlib.sha256("admin123".encode()).hexdigest()
+            # Update password hash to use new method (bcrypt)
+            hashed_password = hash_password_sync("admin123")
             existing_admin.hashed_password = hashed_password
             db.commit()
             print("✅ Admin user password updated")
         else:
             # Create default admin user
-            hashed_password = hashlib.sha256("admin123".encode()).hexdigest()
+            hashed_password = hash_password_sync("admin123")
 
             admin_user = User(
                 username="admin",
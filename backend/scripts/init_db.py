@@ -9,8 +9,14 @@ import json
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from app.database import SessionLocal, engine, Base
-from app.models import User, AuditResult, AuditHistory
+from app.database import SessionLocal, engine
+from app.models import User, AuditResult, AuditHistory, ADESRisk, ControlRiskLink
+from sqlalchemy.dialects.sqlite import insert
+from app.statistics import rebuild_category_stats
+from app.risk_exposure import rebuild_risk_exposure
+from app.migrations import ensure_schema
+from app.revision import bump_revision
+from import_audit_results import import_file
 
 def init_db():
     """Créer toutes les tables de la base de données"""
@@ -18,66 +24,41 @@ def init_db():
     print("-" * 50)
     
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✓ Tables créées avec succès:")
+        version = ensure_schema(engine)
+        print(f"✓ Schéma à jour (version {version}) :")
         print("  - users")
         print("  - audit_results")
         print("  - audit_history")
+        print("  - category_statistics")
+        print("  - ades_risks")
+        print("  - control_risk_links")
+        print("  - risk_exposure")
+        print("  - audit_results_fts, audit_history_fts (recherche)")
     except Exception as e:
         print(f"✗ Erreur lors de l'initialisation: {e}")
         sys.exit(1)
 
 def load_audit_results():
-    """Charger les résultats d'audit depuis JSON"""
+    """Charger les résultats d'audit depuis JSON (import en streaming par lots)"""
     json_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'audit-results.json')
     
     if not os.path.exists(json_path):
         print(f"⚠️  Fichier non trouvé: {json_path}")
         return
     
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    db = SessionLocal()
-    
     try:
-        migrated = 0
-        skipped = 0
-        
-        for item in data:
-            control_id = item.get('control')
-            
-            existing = db.query(AuditResult).filter(
-                AuditResult.control_id == control_id
-            ).first()
-            
-            if existing:
-                skipped += 1
-                continue
-            
-            category = '.'.join(control_id.split('.')[:2]) if '.' in control_id else control_id
-            
-            audit_result = AuditResult(
-                control_id=control_id,
-                control_name=item.get('description', '')[:255],
-                category=category,
-                status=item.get('status', 'not-evaluated'),
-                evaluation_date=item.get('date'),
-                evaluated_by=item.get('auditor', 'Unknown'),
-                evidence=item.get('evidence', ''),
-                notes=item.get('notes', ''),
-                linked_risks=None
-            )
-            
-            db.add(audit_result)
-            migrated += 1
-        
-        db.commit()
+        migrated, skipped = import_file(json_path, verbose=False)
         print(f"✓ Résultats d'audit: {migrated} ajoutés, {skipped} ignorés")
-        
     except Exception as e:
-        db.rollback()
         print(f"✗ Erreur: {e}")
+        return
+    
+    db = SessionLocal()
+    try:
+        # Les compteurs sont reconstruits au cas où des lignes auraient été
+        # ajoutées hors de l'API (anciennes bases)
+        rebuild_category_stats(db)
+        db.commit()
     finally:
         db.close()
 
@@ -155,10 +136,20 @@ def load_risks():
                 skipped += 1
                 continue
             
+            # Les contrôles liés sont stockés dans la table d'association
+            linked_controls = risk_data.pop("linked_controls").split(",")
+            db.execute(insert(ControlRiskLink).on_conflict_do_nothing(), [
+                {"control_id": control_id, "risk_id": risk_data["risk_id"]}
+                for control_id in linked_controls
+            ])
+            
             risk = ADESRisk(**risk_data)
             db.add(risk)
             added += 1
         
+        db.flush()
+        rebuild_risk_exposure(db)
+        bump_revision(db)
         db.commit()
         print(f"✓ Risques: {added} ajoutés, {skipped} ignorés")
         
@@ -232,5 +223,6 @@ def load_scan_history():
 if __name__ == "__main__":
     init_db()
     load_audit_results()
+    load_risks()
     print("-" * 50)
     print("✓ Base de données initialisée avec succès\n")
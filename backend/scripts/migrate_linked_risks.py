@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migre l'ancienne colonne audit_results.linked_risks (liste séparée par des
+virgules) vers la table d'association control_risk_links.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import SessionLocal, engine
+from app.migrations import ensure_schema
+from app.risk_links import set_control_risks_bulk
+from app.revision import bump_revision
+
+
+def migrate_linked_risks():
+    """Copie les liens de la colonne historique vers control_risk_links"""
+    ensure_schema(engine)
+    db = SessionLocal()
+
+    try:
+        columns = [row[1] for row in db.execute(text("PRAGMA table_info(audit_results)"))]
+        if "linked_risks" not in columns:
+            print("ℹ️  Colonne linked_risks absente : rien à migrer")
+            return
+
+        rows = db.execute(text(
+            "SELECT control_id, linked_risks FROM audit_results "
+            "WHERE linked_risks IS NOT NULL AND linked_risks != ''"
+        )).all()
+        set_control_risks_bulk(db, {control_id: linked.split(",") for control_id, linked in rows})
+        if rows:
+            bump_revision(db)
+        db.commit()
+        print(f"✓ Liens contrôle/risque migrés pour {len(rows)} contrôles")
+
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Erreur: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_linked_risks()
@@ -0,0 +1,126 @@
+"""
+Fixtures communes : base SQLite temporaire, application avec son lifespan
+et jeton administrateur.
+
+La suite tourne en mode debug avec QUERY_BUDGET_ACTION=raise : toute
+requête HTTP qui dépasse le budget SQL de son endpoint échoue.
+
+Usage : cd backend && python -m pytest -q
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Les réglages sont lus à l'import de app.config : l'environnement de test
+# doit être en place avant d'importer l'application.
+TEST_DIR = tempfile.mkdtemp(prefix="audit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'audit.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ.setdefault("DEBUG", "true")
+os.environ.setdefault("QUERY_BUDGET_ACTION", "raise")
+os.environ.setdefault("HISTORY_RETENTION_DAYS", "0")
+os.environ.setdefault("TOMBSTONE_RETENTION_DAYS", "0")
+os.environ.setdefault("SNAPSHOT_INTERVAL_SECONDS", "0")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+ADMIN_USERNAME = "test-admin"
+ADMIN_PASSWORD = "test-password"
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    from app.database import SessionLocal
+    from app.hashing import hash_password_sync
+    from app.models import User
+
+    with SessionLocal() as db:
+        db.add(User(
+            username=ADMIN_USERNAME, email="admin@test.local",
+            hashed_password=hash_password_sync(ADMIN_PASSWORD), role="admin",
+        ))
+        db.commit()
+    response = client.post("/api/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def db(client):
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+def audit_payload(control_id: str, category: str = "A.5", status: str = "compliant", **fields) -> dict:
+    """Corps d'un POST /api/audit-results"""
+    payload = {
+        "controlId": control_id,
+        "controlName": f"Contrôle {control_id}",
+        "category": category,
+        "status": status,
+        "evaluatedBy": "auditeur",
+        "evaluationDate": "2024-01-15",
+        "evidence": "Procédure documentée",
+        "notes": "",
+        "linkedRisks": [],
+    }
+    payload.update(fields)
+    return payload
+
+
+def walk_pages(client, path: str, key: str, headers=None, **params) -> list:
+    """Parcourt toutes les pages en suivant nextCursor"""
+    items, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, cursor=cursor) if cursor else params
+        response = client.get(path, params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body[key]) <= params["limit"]
+        items.extend(body[key])
+        pages += 1
+        cursor = body["nextCursor"]
+        if cursor is None:
+            return items
+        assert pages < 100, "nextCursor ne progresse pas"
+
+
+@pytest.fixture
+def payload():
+    """Fabrique de corps de résultat d'audit (voir audit_payload)"""
+    return audit_payload
+
+
+@pytest.fixture
+def create_audit(client, admin_headers):
+    """Crée un résultat d'audit par l'API et retourne sa représentation"""
+    def create(control_id: str, category: str = "A.5", status: str = "compliant", **fields) -> dict:
+        response = client.post("/api/audit-results", json=audit_payload(control_id, category, status, **fields), headers=admin_headers)
+        assert response.status_code == 201, response.text
+        return response.json()
+    return create
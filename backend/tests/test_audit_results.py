@@ -0,0 +1,30 @@
+"""Listing des résultats d'audit : pagination par clé (controlId), filtres et projection"""
+from conftest import walk_pages
+
+
+def test_audit_results_cursor_walks_every_row_once(client, create_audit):
+    control_ids = [f"PG.{index:02d}" for index in range(7)]
+    for control_id in reversed(control_ids):
+        create_audit(control_id, category="PG")
+
+    results = walk_pages(client, "/api/audit-results", "results", category="PG", limit=3)
+    assert [r["controlId"] for r in results] == control_ids
+    # Une page pleine qui se termine exactement au dernier résultat n'annonce pas de suite
+    last = client.get("/api/audit-results", params={"category": "PG", "limit": 7}).json()
+    assert last["nextCursor"] is None
+    # Projection : seuls les champs demandés (et la clé de pagination) sont retournés
+    projected = client.get("/api/audit-results", params={"category": "PG", "limit": 2, "fields": "status"}).json()
+    assert projected["nextCursor"] == "PG.01"
+    assert set(projected["results"][0]) == {"controlId", "status"}
+
+
+def test_audit_results_cursor_skips_deleted_position(client, admin_headers, create_audit):
+    for index in range(4):
+        create_audit(f"PD.{index}", category="PD")
+    first = client.get("/api/audit-results", params={"category": "PD", "limit": 2}).json()
+    assert first["nextCursor"] == "PD.1"
+    # Le curseur est une valeur, pas une position : supprimer la ligne qu'il désigne ne décale rien
+    client.delete("/api/audit-results/PD.1", headers=admin_headers)
+    second = client.get("/api/audit-results", params={"category": "PD", "limit": 2, "cursor": first["nextCursor"]}).json()
+    assert [r["controlId"] for r in second["results"]] == ["PD.2", "PD.3"]
+
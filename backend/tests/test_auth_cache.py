@@ -0,0 +1,68 @@
+"""Cache des utilisateurs authentifiés : invalidation locale et entre workers"""
+import pytest
+from sqlalchemy import text
+
+from app.auth_cache import principal_cache, read_principal_revision
+
+
+@pytest.fixture
+def user_session(client, admin_headers):
+    """Crée un utilisateur et retourne (id, en-têtes de son jeton)"""
+    def create(username: str) -> tuple:
+        response = client.post("/api/auth/users", json={
+            "username": username, "email": f"{username}@test.local", "password": "secret", "role": "user",
+        }, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        token = client.post("/api/auth/login", json={"username": username, "password": "secret"}).json()["access_token"]
+        return response.json()["id"], {"Authorization": f"Bearer {token}"}
+    return create
+
+
+def me(client, headers):
+    return client.get("/api/auth/me", headers=headers)
+
+
+def test_role_change_and_deletion_invalidate_cache(client, admin_headers, user_session):
+    user_id, headers = user_session("pc-role")
+    assert me(client, headers).json()["role"] == "user"
+    hits = principal_cache.hits
+    assert me(client, headers).json()["role"] == "user"
+    assert principal_cache.hits == hits + 1
+
+    response = client.put(f"/api/auth/users/{user_id}", json={
+        "username": "pc-role", "email": "pc-role@test.local", "role": "admin",
+    }, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert me(client, headers).json()["role"] == "admin"
+
+    assert client.delete(f"/api/auth/users/{user_id}", headers=admin_headers).status_code == 200
+    assert me(client, headers).status_code == 401
+
+
+def test_write_from_another_worker_invalidates_cache(client, user_session, db):
+    _, headers = user_session("pc-worker")
+    assert me(client, headers).json()["role"] == "user"
+
+    # Écriture d'un autre worker : la ligne et la révision partagée changent,
+    # pas les versions locales de ce processus
+    db.execute(text("UPDATE users SET role = 'admin' WHERE username = 'pc-worker'"))
+    db.execute(text(
+        "INSERT INTO sync_state (id, tombstone_horizon, principal_revision) VALUES (1, 0, 1) "
+        "ON CONFLICT (id) DO UPDATE SET principal_revision = principal_revision + 1"
+    ))
+    db.commit()
+    # Relecture périodique (principal_cache.watch) : l'entrée en cache est périmée
+    principal_cache.advance(read_principal_revision())
+    assert me(client, headers).json()["role"] == "admin"
+
+
+def test_deleted_cached_user_gets_401(client, user_session, db):
+    _, headers = user_session("pc-deleted")
+    assert me(client, headers).status_code == 200
+    # Supprimé hors de l'API, encore en cache : les écritures sur son profil sont refusées
+    db.execute(text("DELETE FROM users WHERE username = 'pc-deleted'"))
+    db.commit()
+    response = client.put("/api/auth/me/password", json={"current_password": "secret", "new_password": "other"}, headers=headers)
+    assert response.status_code == 401
+    response = client.put("/api/auth/me", json={"username": "pc-deleted", "email": "pc-deleted@test.local"}, headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,82 @@
+"""Upsert en masse des résultats d'audit : une transaction, historique et liens compris"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models import ADESRisk
+from app.routers.audit import BULK_LOOKUP_CHUNK
+
+
+@pytest.fixture
+def bulk_risks(db):
+    risk_ids = ["RISK-BK-1", "RISK-BK-2"]
+    db.execute(
+        insert(ADESRisk.__table__).on_conflict_do_nothing(),
+        [{"risk_id": risk_id, "title": risk_id, "severity": "HIGH", "status": "open"} for risk_id in risk_ids],
+    )
+    db.commit()
+    return risk_ids
+
+
+def test_bulk_creates_and_updates_in_one_revision(client, admin_headers, db, create_audit, payload, bulk_risks):
+    create_audit("BK.1", category="BK", status="partial", linkedRisks=[bulk_risks[0]])
+    before = client.get("/api/audit-results/changes", params={"since": 0}).json()["revision"]
+
+    response = client.post("/api/audit-results/bulk", json=[
+        payload("BK.1", "BK", "compliant", linkedRisks=[bulk_risks[1]]),
+        payload("BK.2", "BK", "non-compliant", linkedRisks=bulk_risks),
+        payload("BK.3", "BK", "not-evaluated"),
+    ], headers=admin_headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    # Une seule révision pour tout le lot
+    assert body["revision"] == before + 1
+    assert (body["created"], body["updated"]) == (2, 1)
+    assert body["results"] == [
+        {"controlId": "BK.1", "outcome": "updated", "statusChanged": True},
+        {"controlId": "BK.2", "outcome": "created", "statusChanged": True},
+        {"controlId": "BK.3", "outcome": "created", "statusChanged": True},
+    ]
+
+    assert client.get("/api/audit-results/BK.1").json()["linkedRisks"] == [bulk_risks[1]]
+    assert client.get("/api/audit-results/BK.2").json()["linkedRisks"] == bulk_risks
+    actions = db.execute(text(
+        "SELECT control_id, action, old_status, new_status FROM audit_history WHERE control_id LIKE 'BK.%' ORDER BY id"
+    )).all()
+    assert [tuple(row) for row in actions] == [
+        ("BK.1", "created", None, "partial"),
+        ("BK.1", "status_changed", "partial", "compliant"),
+        ("BK.2", "created", None, "non-compliant"),
+        ("BK.3", "created", None, "not-evaluated"),
+    ]
+    # Exposition recalculée pour les risques détachés comme pour les nouveaux
+    exposure = dict(db.execute(text(
+        "SELECT risk_id, linked_controls FROM risk_exposure WHERE risk_id LIKE 'RISK-BK-%'"
+    )).all())
+    assert exposure == {"RISK-BK-1": 1, "RISK-BK-2": 2}
+
+
+def test_bulk_unchanged_status_writes_no_history(client, admin_headers, db, create_audit, payload):
+    create_audit("BU.1", category="BU", status="partial")
+    response = client.post("/api/audit-results/bulk", json=[payload("BU.1", "BU", "partial", notes="relu")], headers=admin_headers)
+    assert response.json()["results"] == [{"controlId": "BU.1", "outcome": "updated", "statusChanged": False}]
+    assert client.get("/api/audit-results/BU.1").json()["notes"] == "relu"
+    assert db.execute(text("SELECT count(*) FROM audit_history WHERE control_id = 'BU.1'")).scalar() == 1
+
+
+def test_bulk_rejects_invalid_batch_without_writing(client, admin_headers, payload):
+    assert client.post("/api/audit-results/bulk", json=[], headers=admin_headers).status_code == 400
+    invalid = payload("BI.2", "BI")
+    del invalid["controlName"]
+    response = client.post("/api/audit-results/bulk", json=[payload("BI.1", "BI"), invalid], headers=admin_headers)
+    assert response.status_code == 422
+    assert client.get("/api/audit-results/BI.1").status_code == 404
+    assert client.post("/api/audit-results/bulk", json=[payload("BI.1", "BI")]).status_code == 401
+
+
+def test_bulk_stays_within_budget_across_chunks(client, admin_headers, payload, bulk_risks):
+    # Deux tranches de recherche : dans le budget, sans être pris pour un N+1
+    body = [payload(f"BC.{index:04d}", "BC", linkedRisks=bulk_risks) for index in range(BULK_LOOKUP_CHUNK + 1)]
+    response = client.post("/api/audit-results/bulk", json=body, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == BULK_LOOKUP_CHUNK + 1
@@ -0,0 +1,75 @@
+"""Synchronisation différentielle : tombstones et horizon de resynchronisation"""
+from sqlalchemy import text
+
+from app.changes import compact_tombstones, tombstone_horizon
+
+
+def changes_since(client, since: int) -> dict:
+    response = client.get("/api/audit-results/changes", params={"since": since})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_changes_report_upserts_and_deletions(client, admin_headers, create_audit, payload):
+    create_audit("CH.1", category="CH")
+    create_audit("CH.2", category="CH")
+    since = changes_since(client, 0)["revision"]
+    assert changes_since(client, since) == {"upserts": [], "revision": since, "resync": False, "deleted": []}
+
+    client.put("/api/audit-results/CH.1", json=payload("CH.1", "CH", "partial"), headers=admin_headers)
+    client.delete("/api/audit-results/CH.2", headers=admin_headers)
+    changes = changes_since(client, since)
+    assert changes["revision"] == since + 2
+    assert [(r["controlId"], r["status"]) for r in changes["upserts"]] == [("CH.1", "partial")]
+    assert changes["deleted"] == ["CH.2"]
+    assert changes["resync"] is False
+
+    # Recréé, le contrôle n'est plus supprimé : le trigger retire son tombstone
+    create_audit("CH.2", category="CH", status="non-compliant")
+    changes = changes_since(client, since)
+    assert changes["deleted"] == []
+    assert {r["controlId"] for r in changes["upserts"]} == {"CH.1", "CH.2"}
+    # Une synchronisation complète ne liste pas les suppressions
+    full = changes_since(client, 0)
+    assert full["deleted"] == [] and {"CH.1", "CH.2"} <= {r["controlId"] for r in full["upserts"]}
+
+
+def test_bulk_recreation_clears_tombstone(client, admin_headers, create_audit, payload):
+    create_audit("CB.1", category="CB")
+    client.delete("/api/audit-results/CB.1", headers=admin_headers)
+    since = changes_since(client, 0)["revision"] - 1
+    assert changes_since(client, since)["deleted"] == ["CB.1"]
+
+    response = client.post("/api/audit-results/bulk", json=[payload("CB.1", "CB")], headers=admin_headers)
+    assert response.status_code == 200, response.text
+    changes = changes_since(client, since)
+    assert changes["deleted"] == []
+    assert [r["controlId"] for r in changes["upserts"]] == ["CB.1"]
+
+
+def test_compaction_moves_resync_horizon(client, admin_headers, db, create_audit):
+    create_audit("CT.1", category="CT")
+    create_audit("CT.2", category="CT")
+    before_deletes = changes_since(client, 0)["revision"]
+    client.delete("/api/audit-results/CT.1", headers=admin_headers)
+    deleted_at = changes_since(client, 0)["revision"]
+    client.delete("/api/audit-results/CT.2", headers=admin_headers)
+
+    # Seul le premier tombstone est assez ancien pour être compacté
+    db.execute(text("UPDATE audit_tombstones SET deleted_at = '2000-01-01 00:00:00' WHERE control_id = 'CT.1'"))
+    db.commit()
+    assert compact_tombstones(db, older_than_days=30) == 1
+    db.commit()
+    assert tombstone_horizon(db) == deleted_at
+    assert compact_tombstones(db, older_than_days=30) == 0
+
+    # Avant l'horizon, la suppression de CT.1 n'est plus connue : resynchronisation complète
+    stale = changes_since(client, before_deletes)
+    assert stale["resync"] is True
+    assert stale["upserts"] == [] and stale["deleted"] == []
+    # À partir de l'horizon, le delta reste exact
+    recent = changes_since(client, deleted_at)
+    assert recent["resync"] is False
+    assert recent["deleted"] == ["CT.2"]
+    # since=0 est toujours une synchronisation complète, jamais une resynchronisation
+    assert changes_since(client, 0)["resync"] is False
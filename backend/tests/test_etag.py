@@ -0,0 +1,51 @@
+"""ETag dérivé de la révision des données et réponses 304"""
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/audit-results", "/api/statistics", "/api/audit-results/ET.1"])
+def test_not_modified_until_next_write(client, admin_headers, create_audit, payload, path):
+    create_audit("ET.1", category="ET")
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"r')
+    assert first.headers["cache-control"] == "no-cache"
+
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+    # Comparaison faible : le préfixe W/ est ignoré, plusieurs ETags sont acceptés
+    assert client.get(path, headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": f'W/"r0", {etag}'}).status_code == 304
+
+    response = client.put("/api/audit-results/ET.1", json=payload("ET.1", "ET", "partial"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    fresh = client.get(path, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert client.get(path, headers={"If-None-Match": fresh.headers["etag"]}).status_code == 304
+
+    client.delete("/api/audit-results/ET.1", headers=admin_headers)
+
+
+def test_revalidated_body_reflects_write(client, admin_headers, create_audit, payload):
+    create_audit("ET.2", category="ET", status="compliant")
+    first = client.get("/api/audit-results/ET.2")
+    response = client.put("/api/audit-results/ET.2", json=payload("ET.2", "ET", "non-compliant"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    # Ni 304 ni réponse en cache périmée après l'écriture
+    fresh = client.get("/api/audit-results/ET.2", headers={"If-None-Match": first.headers["etag"]})
+    assert fresh.status_code == 200
+    assert fresh.json()["status"] == "non-compliant"
+    listing = client.get("/api/audit-results", params={"category": "ET"}).json()["results"]
+    assert {r["controlId"]: r["status"] for r in listing}["ET.2"] == "non-compliant"
+
+
+def test_write_failure_keeps_etag(client, admin_headers, create_audit, payload):
+    create_audit("ET.3", category="ET")
+    etag = client.get("/api/statistics").headers["etag"]
+    # Création d'un contrôle existant : rejetée, la révision n'avance pas
+    response = client.post("/api/audit-results", json=payload("ET.3", "ET"), headers=admin_headers)
+    assert response.status_code == 400
+    assert client.get("/api/statistics", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,78 @@
+"""Flux de changements (SSE) : regroupement des rafales et débordement en resync"""
+import asyncio
+import json
+
+from app.config import settings
+from app.events import ChangeFeed, Subscriber
+
+
+def change(control_id: str, status: str) -> dict:
+    return {"controlId": control_id, "action": "updated", "status": status}
+
+
+def parse_sse(chunk: str) -> tuple:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+
+def test_burst_keeps_last_state_per_control():
+    subscriber = Subscriber(max_pending=10)
+    subscriber.push([change("C1", "partial")], 5)
+    subscriber.push([change("C2", "compliant"), {"riskId": "RISK-1", "status": "closed"}], 6)
+    subscriber.push([change("C1", "non-compliant")], 7)
+    assert subscriber.wakeup.is_set()
+
+    assert subscriber.drain() == ("change", {"revision": 7, "changes": [
+        change("C2", "compliant"), {"riskId": "RISK-1", "status": "closed"}, change("C1", "non-compliant"),
+    ]})
+    assert not subscriber.wakeup.is_set()
+
+
+def test_overflow_becomes_single_resync():
+    subscriber = Subscriber(max_pending=2)
+    subscriber.push([change("C1", "partial"), change("C2", "partial")], 3)
+    subscriber.push([change("C3", "partial")], 4)
+    # Le détail est abandonné, même pour les changements suivants jusqu'à l'envoi
+    subscriber.push([change("C4", "partial")], 5)
+    assert subscriber.pending == {}
+    assert subscriber.drain() == ("resync", {"revision": 5})
+    # Après l'envoi du resync, l'abonné repart d'une file vide
+    subscriber.push([change("C5", "compliant")], 6)
+    assert subscriber.drain() == ("change", {"revision": 6, "changes": [change("C5", "compliant")]})
+
+
+def test_stream_sends_burst_as_one_event(monkeypatch):
+    monkeypatch.setattr(settings, "events_coalesce_ms", 50)
+    monkeypatch.setattr(settings, "events_heartbeat_seconds", 5.0)
+
+    async def scenario():
+        feed = ChangeFeed()
+        feed.attach(asyncio.get_running_loop())
+        stream = feed.stream()
+        assert await anext(stream) == "retry: 3000\n\n"
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        # Rafale publiée depuis le thread d'un handler synchrone
+        def burst():
+            for revision, status in enumerate(("partial", "compliant", "non-compliant"), start=10):
+                feed.publish([change("C1", status)], revision)
+        await asyncio.to_thread(burst)
+        event = parse_sse(await asyncio.wait_for(pending, 2))
+        assert feed.stats() == {"subscribers": 1, "revision": 12}
+        await stream.aclose()
+        assert feed.stats()["subscribers"] == 0
+
+        # Reconnexion avec un Last-Event-ID en retard : resync immédiat
+        late = feed.stream(last_event_id=11)
+        await anext(late)
+        resync = parse_sse(await anext(late))
+        await late.aclose()
+        return event, resync
+
+    event, resync = asyncio.run(scenario())
+    assert event == ("change", 12, {"revision": 12, "changes": [change("C1", "non-compliant")]})
+    assert resync == ("resync", 12, {"revision": 12})
+
+
+def test_stream_requires_authentication(client):
+    assert client.get("/api/events/audit-results").status_code == 401
@@ -0,0 +1,85 @@
+"""Export en streaming (NDJSON et CSV) des résultats d'audit et de l'historique"""
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models import ADESRisk
+from app.routers import export
+
+
+@pytest.fixture
+def exported_controls(create_audit, db, monkeypatch):
+    risks = ["RISK-XP-1", "RISK-XP-2"]
+    db.execute(
+        insert(ADESRisk.__table__).on_conflict_do_nothing(),
+        [{"risk_id": risk_id, "title": risk_id, "severity": "LOW", "status": "open"} for risk_id in risks],
+    )
+    db.commit()
+    create_audit("XP.1", category="XP", status="partial", linkedRisks=risks, notes="Clé « sécurisée », deuxième ligne")
+    create_audit("XP.2", category="XP", status="compliant")
+    create_audit("XP.3", category="XP", status="non-compliant", linkedRisks=risks[:1])
+    # Lots de deux lignes : l'export enchaîne plusieurs allers-retours du curseur
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    return risks
+
+
+def test_audit_results_export(client, admin_headers, exported_controls):
+    response = client.get("/api/export/audit-results", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="audit-results.ndjson"'
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    control_ids = [row["controlId"] for row in rows]
+    assert control_ids == sorted(control_ids)
+    exported = {row["controlId"]: row for row in rows if row["category"] == "XP"}
+    api = {row["controlId"]: row for row in client.get("/api/audit-results", params={"category": "XP"}).json()["results"]}
+    assert exported == api
+    assert exported["XP.1"]["linkedRisks"] == exported_controls
+
+    # Même export en CSV : linkedRisks en "RISK-001,RISK-002"
+    response = client.get("/api/export/audit-results", params={"format": "csv"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+
+    reader = csv.reader(io.StringIO(response.text))
+    header = next(reader)
+    rows = [dict(zip(header, row)) for row in reader]
+    # En-tête une seule fois malgré les lots
+    assert "controlId" not in [row["controlId"] for row in rows]
+    xp = {row["controlId"]: row for row in rows if row["category"] == "XP"}
+    assert set(xp) == {"XP.1", "XP.2", "XP.3"}
+    assert xp["XP.1"]["linkedRisks"] == "RISK-XP-1,RISK-XP-2"
+    assert xp["XP.1"]["notes"] == "Clé « sécurisée », deuxième ligne"
+    assert xp["XP.2"]["status"] == "compliant"
+
+
+def test_history_export_includes_archive(client, admin_headers, db):
+    db.execute(text(
+        "INSERT INTO audit_history_archive (id, control_id, action, new_status, user, notes, timestamp) "
+        "VALUES (-1, 'XA.1', 'created', 'partial', 'auditeur', 'archivée', '2015-03-01 09:00:00')"
+    ))
+    db.commit()
+    try:
+        full = client.get("/api/export/history", headers=admin_headers).text.splitlines()
+        archived = [json.loads(line) for line in full if '"XA.1"' in line]
+        assert archived == [{
+            "id": -1, "controlId": "XA.1", "action": "created", "oldStatus": None, "newStatus": "partial",
+            "user": "auditeur", "notes": "archivée", "timestamp": "2015-03-01T09:00:00",
+        }]
+        # Trié par id : l'entrée archivée (id d'origine conservé) vient en tête
+        assert json.loads(full[0])["id"] == -1
+        hot = client.get("/api/export/history", params={"include_archived": "false", "format": "csv"}, headers=admin_headers)
+        assert "XA.1" not in hot.text
+    finally:
+        db.execute(text("DELETE FROM audit_history_archive WHERE id = -1"))
+        db.commit()
+
+
+def test_export_rejects_unknown_format_and_anonymous(client, admin_headers):
+    assert client.get("/api/export/audit-results", params={"format": "xml"}, headers=admin_headers).status_code == 400
+    assert client.get("/api/export/history").status_code == 401
@@ -0,0 +1,51 @@
+"""Hachage des mots de passe : migration des anciens hashes SHA-256 et utilisateurs inconnus"""
+import hashlib
+
+from sqlalchemy import text
+
+from app.hashing import BCRYPT_ROUNDS, is_legacy_hash, password_hasher, verify_password_sync
+from app.models import User
+
+
+def login(client, username: str, password: str):
+    return client.post("/api/auth/login", json={"username": username, "password": password})
+
+
+def stored_hash(db, username: str) -> str:
+    db.expire_all()
+    return db.execute(text("SELECT hashed_password FROM users WHERE username = :u"), {"u": username}).scalar()
+
+
+def test_legacy_hash_is_upgraded_on_login(client, db):
+    legacy = hashlib.sha256(b"ancien-secret").hexdigest()
+    db.add(User(username="legacy-user", email="legacy@test.local", hashed_password=legacy, role="user"))
+    db.commit()
+
+    # Mauvais mot de passe : refusé, hash inchangé
+    assert login(client, "legacy-user", "autre").status_code == 401
+    assert stored_hash(db, "legacy-user") == legacy
+
+    response = login(client, "legacy-user", "ancien-secret")
+    assert response.status_code == 200, response.text
+    upgraded = stored_hash(db, "legacy-user")
+    assert not is_legacy_hash(upgraded)
+    assert upgraded.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert verify_password_sync("ancien-secret", upgraded)
+    # Le nouveau hash sert aux connexions suivantes, sans nouvelle migration
+    assert login(client, "legacy-user", "ancien-secret").status_code == 200
+    assert stored_hash(db, "legacy-user") == upgraded
+
+
+def verify_count() -> int:
+    return password_hasher.metrics()["operations"].get("verify", {}).get("count", 0)
+
+
+def test_unknown_user_costs_a_bcrypt_check(client, admin_headers):
+    before = verify_count()
+    unknown = login(client, "nobody-here", "secret")
+    assert verify_count() == before + 1
+    wrong = login(client, "test-admin", "not-the-password")
+    assert verify_count() == before + 2
+    # Même réponse qu'un mauvais mot de passe : rien ne distingue un utilisateur inconnu
+    assert unknown.status_code == wrong.status_code == 401
+    assert unknown.json() == wrong.json()
@@ -0,0 +1,55 @@
+"""Historique paginé par clé (timestamp, id) et filtré par période"""
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import AuditHistory
+from conftest import walk_pages
+
+history_controls = itertools.count(1)
+
+
+@pytest.fixture
+def history_entries(db):
+    """Historique d'un nouveau contrôle, timestamps égaux deux à deux (départage par id)
+
+    Retourne le contrôle et les notes de ses entrées dans l'ordre attendu.
+    """
+    control_id = f"HP.{next(history_controls)}"
+    start = datetime(2024, 3, 1, 8, 0, 0)
+    entries = [
+        AuditHistory(
+            control_id=control_id, action="status_changed", old_status="partial", new_status="compliant",
+            user="auditeur" if index % 2 else "relecteur", notes=f"entrée {index}",
+            timestamp=start + timedelta(hours=index // 2),
+        )
+        for index in range(9)
+    ]
+    db.add_all(entries)
+    db.commit()
+    ordered = sorted(entries, key=lambda entry: (entry.timestamp, entry.id), reverse=True)
+    return control_id, [entry.notes for entry in ordered]
+
+
+def test_history_cursor_follows_timestamp_then_id(client, admin_headers, history_entries):
+    control_id, expected = history_entries
+    for path, headers in (("/api/history", admin_headers), (f"/api/history/{control_id}", None)):
+        entries = walk_pages(client, path, "history", headers=headers, control_id=control_id, limit=2)
+        assert [e["notes"] for e in entries] == expected
+
+
+def test_history_filters_and_invalid_cursor(client, admin_headers, history_entries):
+    control_id, _ = history_entries
+    path = f"/api/history/{control_id}"
+    page = client.get(path, params={"limit": 50, "user": "auditeur"}).json()
+    assert len(page["history"]) == 4
+    assert {e["user"] for e in page["history"]} == {"auditeur"}
+    # Intervalle [from, to[ ; une date seule en borne de fin couvre toute la journée
+    page = client.get(path, params={"limit": 50, "from": "2024-03-01T09:00:00", "to": "2024-03-01T11:00:00"}).json()
+    assert len(page["history"]) == 4
+    assert client.get(path, params={"limit": 50, "to": "2024-03-01"}).json()["nextCursor"] is None
+    assert len(client.get(path, params={"limit": 50, "to": "2024-03-01"}).json()["history"]) == 9
+
+    assert client.get(path, params={"cursor": "pas-un-curseur"}).status_code == 400
+    assert client.get("/api/history", params={"limit": 2}).status_code == 401
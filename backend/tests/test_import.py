@@ -0,0 +1,73 @@
+"""Import en streaming : lecture incrémentale et reprise au checkpoint"""
+import json
+
+import pytest
+from sqlalchemy import text
+
+from scripts import import_audit_results as importer
+
+
+def items(prefix: str, count: int) -> list:
+    return [
+        {"controlId": f"{prefix}.{index}", "controlName": f"Contrôle « {index} »", "category": prefix,
+         "status": "compliant", "evidence": "é" * index}
+        for index in range(1, count + 1)
+    ]
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson"])
+def test_reader_resumes_from_returned_position(tmp_path, format):
+    expected = items("RD", 5)
+    path = tmp_path / f"results.{format}"
+    if format == "json":
+        path.write_text("﻿[\n" + ",\n".join(json.dumps(item, ensure_ascii=False) for item in expected) + "\n]\n", encoding="utf-8")
+    else:
+        path.write_text("".join(json.dumps(item, ensure_ascii=False) + "\n\n" for item in expected), encoding="utf-8")
+    assert importer.detect_format(str(path)) == format
+    iterate = importer.iter_json_array if format == "json" else importer.iter_ndjson
+
+    with open(path, "rb") as f:
+        read = list(iterate(f, 0))
+    assert [item for item, _ in read] == expected
+    # Depuis la position retournée après chaque élément : exactement la suite
+    for index, (_, position) in enumerate(read):
+        with open(path, "rb") as f:
+            assert [item for item, _ in iterate(f, position)] == expected[index + 1:]
+
+
+def test_interrupted_import_resumes_from_checkpoint(tmp_path, client, db, monkeypatch):
+    path = tmp_path / "import.json"
+    path.write_text(json.dumps(items("IM", 5), ensure_ascii=False), encoding="utf-8")
+    checkpoint = str(path) + ".checkpoint"
+
+    to_row = importer.to_row
+
+    def failing_to_row(item):
+        if item["controlId"] == "IM.4":
+            raise RuntimeError("interruption")
+        return to_row(item)
+
+    monkeypatch.setattr(importer, "to_row", failing_to_row)
+    with pytest.raises(RuntimeError):
+        importer.import_file(str(path), batch_size=2, verbose=False)
+    # Le premier lot est validé et le checkpoint pointe juste après lui ; IM.3 (lot en cours) est annulé
+    imported = db.execute(text("SELECT control_id FROM audit_results WHERE category = 'IM' ORDER BY 1")).scalars().all()
+    assert imported == ["IM.1", "IM.2"]
+    with open(checkpoint, encoding="utf-8") as f:
+        assert json.load(f)["imported"] == 2
+
+    monkeypatch.setattr(importer, "to_row", to_row)
+    # Reprise : rien n'est relu avant le checkpoint (aucun contrôle ignoré comme doublon)
+    assert importer.import_file(str(path), batch_size=2, verbose=False) == (5, 0)
+    db.expire_all()
+    imported = db.execute(text("SELECT control_id FROM audit_results WHERE category = 'IM' ORDER BY 1")).scalars().all()
+    assert imported == ["IM.1", "IM.2", "IM.3", "IM.4", "IM.5"]
+    assert not (tmp_path / "import.json.checkpoint").exists()
+    stats = {c["category"]: c for c in client.get("/api/statistics").json()["byCategory"]}
+    assert (stats["IM"]["total"], stats["IM"]["compliant"]) == (5, 5)
+
+    # Le fichier change : un ancien checkpoint est ignoré et les contrôles existants sont sautés
+    path.write_text(json.dumps(items("IM", 6), ensure_ascii=False), encoding="utf-8")
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        json.dump({"size": 1, "mtime": 0, "offset": 999, "imported": 0, "skipped": 0}, f)
+    assert importer.import_file(str(path), batch_size=2, verbose=False) == (1, 5)
@@ -0,0 +1,157 @@
+"""Migrations versionnées : base antérieure aux migrations, base neuve, base trop récente"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.migrations import SCHEMA_VERSION, SchemaVersionError, ensure_schema
+from app.models import Base
+
+# Schéma de la première version de l'application (PRAGMA user_version = 0) :
+# liens vers les risques dans une colonne texte, ni compteurs ni index plein texte
+BASELINE_SCHEMA = (
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, email VARCHAR NOT NULL UNIQUE,
+        hashed_password VARCHAR NOT NULL, role VARCHAR NOT NULL, is_active INTEGER,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME
+    )""",
+    """CREATE TABLE audit_results (
+        id INTEGER PRIMARY KEY, control_id VARCHAR NOT NULL, control_name VARCHAR NOT NULL,
+        category VARCHAR NOT NULL, status VARCHAR NOT NULL, evaluation_date VARCHAR, evaluated_by VARCHAR,
+        evidence TEXT, notes TEXT, linked_risks VARCHAR,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME
+    )""",
+    "CREATE UNIQUE INDEX ix_audit_results_control_id ON audit_results (control_id)",
+    """CREATE TABLE audit_history (
+        id INTEGER PRIMARY KEY, control_id VARCHAR NOT NULL, action VARCHAR NOT NULL,
+        old_status VARCHAR, new_status VARCHAR, user VARCHAR NOT NULL, notes TEXT,
+        timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP)
+    )""",
+    "CREATE INDEX ix_audit_history_control_id ON audit_history (control_id)",
+)
+BASELINE_RESULTS = (
+    ("A.5.1", "Politiques de sécurité", "A.5", "compliant", "RISK-001,RISK-002", "Politique validée par la direction"),
+    ("A.5.2", "Rôles et responsabilités", "A.5", "partial", "RISK-002", "Matrice RACI incomplète"),
+    ("A.8.1", "Terminaux utilisateurs", "A.8", "non-compliant", "", "Chiffrement des disques absent"),
+    ("A.8.2", "Droits d'accès privilégiés", "A.8", "not-evaluated", None, None),
+)
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+        for control_id, name, category, status, linked_risks, evidence in BASELINE_RESULTS:
+            conn.execute(text(
+                "INSERT INTO audit_results (control_id, control_name, category, status, linked_risks, evidence) "
+                "VALUES (:control_id, :name, :category, :status, :linked_risks, :evidence)"
+            ), {"control_id": control_id, "name": name, "category": category, "status": status,
+                "linked_risks": linked_risks, "evidence": evidence})
+            conn.execute(text(
+                "INSERT INTO audit_history (control_id, action, new_status, user, notes, timestamp) "
+                "VALUES (:control_id, 'created', :status, 'auditeur', 'Évaluation initiale', '2024-01-15 10:00:00')"
+            ), {"control_id": control_id, "status": status})
+    yield engine
+    engine.dispose()
+
+
+def scalar(engine, sql: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(sql).scalar()
+
+
+def test_baseline_database_is_migrated(baseline_engine):
+    assert ensure_schema(baseline_engine) == SCHEMA_VERSION
+    assert scalar(baseline_engine, "PRAGMA user_version") == SCHEMA_VERSION
+
+    with baseline_engine.connect() as conn:
+        columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(audit_results)")}
+        assert "change_seq" in columns
+        # Migration 2 : liens contrôle/risque copiés depuis l'ancienne colonne
+        links = conn.exec_driver_sql("SELECT control_id, risk_id FROM control_risk_links ORDER BY 1, 2").all()
+        assert links == [("A.5.1", "RISK-001"), ("A.5.1", "RISK-002"), ("A.5.2", "RISK-002")]
+        # Migration 4 : compteurs par catégorie et rollups initialisés depuis les données
+        stats = dict(conn.exec_driver_sql("SELECT category, total FROM category_statistics").all())
+        assert stats == {"A.5": 2, "A.8": 2}
+        counters = conn.exec_driver_sql(
+            "SELECT compliant, partial, non_compliant, not_evaluated FROM category_statistics WHERE category = 'A.8'"
+        ).one()
+        assert tuple(counters) == (0, 0, 1, 1)
+        assert conn.exec_driver_sql("SELECT count(*) FROM compliance_rollups").scalar() > 0
+        # Index composites de l'historique : l'ancien index mono-colonne est retiré
+        indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(audit_history)")}
+        assert "ix_audit_history_control_id" not in indexes
+        # Migrations 3 et 5 : index plein texte rempli, trigger des tombstones
+        matches = conn.exec_driver_sql("SELECT count(*) FROM audit_results_fts WHERE audit_results_fts MATCH 'chiffrement'").scalar()
+        assert matches == 1
+        trigger = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'audit_results_clear_tombstone'"
+        ).scalar()
+        assert trigger == 1
+
+
+def test_up_to_date_database_is_left_alone(baseline_engine):
+    ensure_schema(baseline_engine)
+    links = scalar(baseline_engine, "SELECT count(*) FROM control_risk_links")
+    with baseline_engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM control_risk_links WHERE control_id = 'A.5.2'")
+    # Une base à jour n'est pas re-migrée : les liens supprimés ne reviennent pas
+    assert ensure_schema(baseline_engine) == SCHEMA_VERSION
+    assert scalar(baseline_engine, "SELECT count(*) FROM control_risk_links") == links - 1
+
+
+def test_tombstone_horizon_leaves_data_revision(baseline_engine):
+    # Base en version 5 : l'horizon est la ligne id = 2 de data_revision
+    ensure_schema(baseline_engine)
+    with baseline_engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE sync_state")
+        conn.exec_driver_sql("INSERT INTO data_revision (id, revision) VALUES (2, 42)")
+        conn.exec_driver_sql("PRAGMA user_version = 5")
+    assert ensure_schema(baseline_engine) == SCHEMA_VERSION
+    assert scalar(baseline_engine, "SELECT tombstone_horizon FROM sync_state WHERE id = 1") == 42
+    assert scalar(baseline_engine, "SELECT count(*) FROM data_revision WHERE id = 2") == 0
+
+
+def schema_shape(engine) -> dict:
+    """Colonnes et index de chaque table (hors index plein texte)"""
+    shape = {}
+    with engine.connect() as conn:
+        tables = conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '%_fts%'"
+        ).scalars().all()
+        for table in tables:
+            columns = [tuple(row[1:6]) for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
+            indexes = {
+                row[1]: (row[2], tuple(column[2] for column in conn.exec_driver_sql(f"PRAGMA index_info({row[1]})")))
+                for row in conn.exec_driver_sql(f"PRAGMA index_list({table})")
+                if not row[1].startswith("sqlite_autoindex")
+            }
+            shape[table] = (columns, indexes)
+    return shape
+
+
+def test_fresh_database_gets_current_schema(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    models = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    try:
+        assert ensure_schema(migrated) == SCHEMA_VERSION
+        assert scalar(migrated, "PRAGMA user_version") == SCHEMA_VERSION
+        assert scalar(migrated, "SELECT count(*) FROM sqlite_master WHERE name = 'audit_results_fts'") == 1
+        # Le DDL figé des migrations aboutit exactement au schéma des modèles
+        Base.metadata.create_all(models)
+        assert schema_shape(migrated) == schema_shape(models)
+    finally:
+        migrated.dispose()
+        models.dispose()
+
+
+def test_newer_database_is_refused(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'newer.db'}")
+    try:
+        ensure_schema(engine)
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+        with pytest.raises(SchemaVersionError):
+            ensure_schema(engine)
+    finally:
+        engine.dispose()
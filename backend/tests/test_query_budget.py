@@ -0,0 +1,69 @@
+"""Budgets de requêtes SQL (mode debug, QUERY_BUDGET_ACTION=raise) et détection des N+1"""
+import pytest
+
+from app.auth_cache import principal_cache
+from app.config import settings
+from app.query_budget import QueryBudget, QueryBudgetExceeded, RequestQueries, budget_violations, statement_shape
+from app.routers import audit
+
+
+@pytest.fixture
+def shrunk_budget(monkeypatch):
+    """Réduit le budget déclaré d'un endpoint le temps d'un test"""
+    def shrink(endpoint, statements=None, repeats=None):
+        monkeypatch.setattr(endpoint, "query_budget", QueryBudget(statements, repeats))
+    return shrink
+
+
+def test_suite_runs_in_raise_mode():
+    assert settings.debug and settings.query_budget_action == "raise"
+
+
+def test_exceeded_budget_fails_before_commit(client, admin_headers, payload, shrunk_budget):
+    etag = client.get("/api/statistics").headers["etag"]
+    shrunk_budget(audit.create_audit_result, statements=2)
+    with pytest.raises(QueryBudgetExceeded, match="budget de 2"):
+        client.post("/api/audit-results", json=payload("QB.1", "QB"), headers=admin_headers)
+
+    # Rien n'a été écrit : ni résultat, ni nouvelle révision
+    assert client.get("/api/audit-results/QB.1").status_code == 404
+    assert client.get("/api/statistics", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_repeated_statement_is_reported(client, create_audit, shrunk_budget):
+    create_audit("QR.1", category="QR")
+    # Seuil de répétition à 1 : la première requête SQL du handler est déjà un N+1
+    shrunk_budget(audit.get_audit_result, repeats=1)
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        client.get("/api/audit-results/QR.1")
+
+
+def test_principal_lookup_is_not_charged_to_the_endpoint(client, admin_headers, payload, shrunk_budget):
+    # Budget ajusté aux 7 requêtes du handler pour un changement de statut ;
+    # cache des utilisateurs vide : la recherche de l'administrateur
+    # s'exécute, comptée à part
+    shrunk_budget(audit.update_audit_result, statements=7)
+    client.post("/api/audit-results", json=payload("QD.1", "QD"), headers=admin_headers)
+    principal_cache.clear()
+    response = client.put("/api/audit-results/QD.1", json=payload("QD.1", "QD", "partial"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT a\n  FROM t WHERE id IN (?, ?,?)") == "SELECT a FROM t WHERE id IN (?)"
+    assert statement_shape("SELECT a FROM t WHERE id IN (?)") == "SELECT a FROM t WHERE id IN (?)"
+
+
+def test_budget_violations():
+    queries = RequestQueries()
+    for _ in range(3):
+        queries.record("SELECT * FROM audit_results WHERE control_id = ?")
+    queries.record("SELECT * FROM control_risk_links WHERE control_id IN (?, ?)")
+    assert queries.statements == 4
+    assert budget_violations(queries, QueryBudget(4, None)) == []
+
+    violations = budget_violations(queries, QueryBudget(3, 3))
+    assert violations[0] == "4 requêtes SQL pour un budget de 3"
+    assert len(violations) == 2 and "répétée 3 fois" in violations[1]
+    # Sans budget déclaré, seul le seuil global de répétition s'applique
+    assert budget_violations(queries, None) == []
@@ -0,0 +1,54 @@
+"""Cache des réponses encodées : invalidation aux écritures et lecture de ses propres écritures"""
+from sqlalchemy import text
+
+from app.response_cache import response_cache
+
+
+def listing(client, **headers):
+    return client.get("/api/audit-results", params={"category": "RC"}, headers=headers)
+
+
+def statuses(response) -> dict:
+    return {r["controlId"]: r["status"] for r in response.json()["results"]}
+
+
+def test_write_invalidates_cached_responses(client, admin_headers, create_audit, payload):
+    for index in range(20):
+        create_audit(f"RC.{index:02d}", category="RC", evidence="preuve " * 20)
+    first = listing(client)
+    hits = response_cache.hits
+    second = listing(client)
+    assert response_cache.hits == hits + 1
+    assert second.content == first.content
+    # Variante compressée servie depuis la même entrée
+    compressed = listing(client, **{"Accept-Encoding": "gzip"})
+    assert response_cache.hits == hits + 2
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == first.json()
+
+    invalidations = response_cache.invalidations
+    response = client.put("/api/audit-results/RC.00", json=payload("RC.00", "RC", "partial"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response_cache.invalidations == invalidations + 1
+    assert response_cache.stats()["entries"] == 0
+    fresh = listing(client)
+    assert fresh.headers["etag"] != first.headers["etag"]
+    assert statuses(fresh)["RC.00"] == "partial"
+
+
+def test_conditional_request_sees_write_from_another_worker(client, create_audit, db):
+    create_audit("RW.1", category="RC-W", notes="avant")
+    params = {"category": "RC-W"}
+    first = client.get("/api/audit-results", params=params)
+    etag = first.headers["etag"]
+
+    # Écriture d'un autre worker : ni after_commit ni invalidation du cache dans ce processus
+    db.execute(text("UPDATE audit_results SET notes = 'après' WHERE control_id = 'RW.1'"))
+    db.execute(text("UPDATE data_revision SET revision = revision + 1 WHERE id = 1"))
+    db.commit()
+
+    # If-None-Match relit la révision : pas de 304 ni de corps en cache périmé
+    fresh = client.get("/api/audit-results", params=params, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert [r["notes"] for r in fresh.json()["results"]] == ["après"]
@@ -0,0 +1,66 @@
+"""Rétention de l'historique : archivage par lots et suppression des changements sans effet"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.models import AuditHistory
+from app.retention import collapse_noop_status_changes, run_history_retention
+
+
+def status_change(control_id: str, old: str, new: str) -> dict:
+    return {"control_id": control_id, "action": "status_changed", "old_status": old, "new_status": new}
+
+
+def test_collapse_keeps_last_status_across_batches():
+    last_status = {}
+    first = [
+        {"control_id": "C1", "action": "created", "old_status": None, "new_status": "partial"},
+        status_change("C1", "partial", "partial"),
+    ]
+    assert collapse_noop_status_changes(first, last_status) == first[:1]
+    # Lot suivant : l'ancien statut enregistré est faux, le dernier statut connu fait foi
+    second = [status_change("C1", "compliant", "partial"), status_change("C1", "partial", "compliant")]
+    assert collapse_noop_status_changes(second, last_status) == second[1:]
+    # Après une suppression, le dernier statut connu est oublié : l'ancien statut de l'entrée fait foi
+    third = [
+        {"control_id": "C1", "action": "deleted", "old_status": "compliant", "new_status": None},
+        status_change("C1", "partial", "compliant"),
+    ]
+    assert collapse_noop_status_changes(third, last_status) == third
+
+
+def test_retention_archives_old_entries_and_drops_noops(client, admin_headers, db):
+    old = datetime.utcnow() - timedelta(days=3000)
+    entries = [
+        ("created", None, "partial"),
+        ("status_changed", "partial", "partial"),
+        ("status_changed", "partial", "compliant"),
+        ("status_changed", "compliant", "compliant"),
+        ("status_changed", "compliant", "non-compliant"),
+    ]
+    db.add_all([
+        AuditHistory(control_id="RT.1", action=action, old_status=old_status, new_status=new_status,
+                     user="auditeur", notes=f"entrée {index}", timestamp=old + timedelta(minutes=index))
+        for index, (action, old_status, new_status) in enumerate(entries)
+    ])
+    db.add(AuditHistory(control_id="RT.1", action="status_changed", old_status="non-compliant",
+                        new_status="non-compliant", user="auditeur", notes="récente"))
+    db.commit()
+    revision = client.get("/api/audit-results/changes", params={"since": 0}).json()["revision"]
+
+    # Lots de deux entrées : les changements sans effet sont repérés d'un lot à l'autre
+    report = run_history_retention(days=2500, batch_size=2, pause=0)
+    assert (report["archived"], report["collapsed"], report["batches"]) == (3, 2, 3)
+
+    hot = db.execute(text("SELECT notes FROM audit_history WHERE control_id = 'RT.1'")).scalars().all()
+    assert hot == ["récente"]
+    archived = db.execute(text("SELECT notes FROM audit_history_archive WHERE control_id = 'RT.1' ORDER BY id")).scalars().all()
+    assert archived == ["entrée 0", "entrée 2", "entrée 4"]
+    # Chaque lot est une écriture : les ETags et caches sont invalidés
+    assert client.get("/api/audit-results/changes", params={"since": 0}).json()["revision"] == revision + 3
+
+    page = client.get("/api/history/RT.1", params={"include_archived": "true"}).json()["history"]
+    assert [entry["notes"] for entry in page] == ["récente", "entrée 4", "entrée 2", "entrée 0"]
+    assert [entry["notes"] for entry in client.get("/api/history/RT.1").json()["history"]] == ["récente"]
+    # Nouvelle passe : rien à archiver
+    assert run_history_retention(days=2500, batch_size=2, pause=0)["batches"] == 0
@@ -0,0 +1,77 @@
+"""Exposition des risques : score, calcul SQL et mise à jour aux écritures"""
+import pytest
+from sqlalchemy import literal, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models import ADESRisk
+from app.risk_exposure import exposure_score, exposure_score_column
+
+
+@pytest.mark.parametrize("severity, linked, compliant, partial, expected", [
+    ("HIGH", 0, 0, 0, 75.0),  # sans contrôle lié : entièrement exposé
+    ("CRITICAL", 3, 1, 1, 50.0),
+    ("LOW", 3, 1, 0, 16.7),
+    ("critical", 2, 2, 0, 0.0),
+    ("INCONNUE", 4, 0, 1, 43.8),  # gravité inconnue : poids MEDIUM
+])
+def test_exposure_score(severity, linked, compliant, partial, expected):
+    assert exposure_score(severity, linked, compliant, partial) == expected
+
+
+def test_sql_score_matches_python(db):
+    cases = [
+        (severity, linked, compliant, partial)
+        for severity in ("LOW", "MEDIUM", "HIGH", "CRITICAL", "autre")
+        for linked in range(0, 7)
+        for compliant in range(0, linked + 1)
+        for partial in range(0, linked - compliant + 1)
+    ]
+    for severity, linked, compliant, partial in cases:
+        column = exposure_score_column(literal(severity), literal(linked), literal(compliant), literal(partial))
+        assert db.execute(select(column)).scalar() == exposure_score(severity, linked, compliant, partial)
+
+
+@pytest.fixture
+def exposure_risks(db):
+    risks = {"RISK-EX-1": "CRITICAL", "RISK-EX-2": "LOW"}
+    db.execute(
+        insert(ADESRisk.__table__).on_conflict_do_nothing(),
+        [{"risk_id": risk_id, "title": risk_id, "severity": severity, "status": "open"} for risk_id, severity in risks.items()],
+    )
+    db.commit()
+    return list(risks)
+
+
+def exposure(client, risk_id: str) -> dict:
+    response = client.get(f"/api/risks/{risk_id}")
+    assert response.status_code == 200, response.text
+    return response.json()["exposure"]
+
+
+def test_exposure_follows_control_writes(client, admin_headers, create_audit, payload, exposure_risks):
+    critical, low = exposure_risks
+    create_audit("EX.1", category="EX", status="compliant", linkedRisks=[critical, low])
+    create_audit("EX.2", category="EX", status="partial", linkedRisks=[critical])
+    create_audit("EX.3", category="EX", status="not-evaluated", linkedRisks=[critical])
+    assert exposure(client, critical) == {
+        "score": 50.0, "linkedControls": 3, "compliant": 1, "partial": 1, "nonCompliant": 0, "notEvaluated": 1,
+    }
+    assert exposure(client, low)["score"] == 0.0
+
+    client.put("/api/audit-results/EX.1", json=payload("EX.1", "EX", "non-compliant", linkedRisks=[critical, low]),
+               headers=admin_headers)
+    assert exposure(client, critical)["score"] == exposure_score("CRITICAL", 3, 0, 1)
+    assert exposure(client, low)["score"] == 25.0
+
+    # Lien retiré : l'exposition du risque détaché est recalculée
+    client.put("/api/audit-results/EX.1", json=payload("EX.1", "EX", "non-compliant", linkedRisks=[critical]),
+               headers=admin_headers)
+    assert exposure(client, low)["linkedControls"] == 0
+    # Contrôle supprimé : ses liens restent, il redevient non évalué
+    client.delete("/api/audit-results/EX.2", headers=admin_headers)
+    assert exposure(client, critical) == {
+        "score": 100.0, "linkedControls": 3, "compliant": 0, "partial": 0, "nonCompliant": 1, "notEvaluated": 2,
+    }
+
+    ranked = [risk["riskId"] for risk in client.get("/api/risks", params={"sort": "exposure"}).json()["risks"]]
+    assert ranked.index(critical) < ranked.index(low)
@@ -0,0 +1,55 @@
+"""Recherche plein texte : index FTS5 synchronisé par triggers, radicaux et accents"""
+from sqlalchemy import text
+
+from app.search import build_match_query
+
+
+def search(client, headers, q: str, source: str = "all") -> list:
+    response = client.get("/api/search", params={"q": q, "source": source}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [(r["source"], r["controlId"]) for r in response.json()["results"]]
+
+
+def integrity_check(db):
+    # Lève une erreur si un index à contenu externe diverge de sa table
+    for table in ("audit_results_fts", "audit_history_fts"):
+        db.execute(text(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)"))
+    db.rollback()
+
+
+def test_match_query_is_stemmed_and_quoted():
+    assert build_match_query('sauvegardes "chiffrées" OR') == '"sauvegard"* "chiffr"* "or"*'
+
+
+def test_index_follows_update_and_delete(client, admin_headers, create_audit, payload, db):
+    create_audit("FT.1", category="FT", evidence="Kaléidoscope des sauvegardes chiffrées")
+    # Sans accent, pluriel ou autre forme du mot : même radical
+    assert ("audit_result", "FT.1") in search(client, admin_headers, "kaleidoscopes", "results")
+    assert search(client, admin_headers, "chiffrement kaléidoscope", "results") == [("audit_result", "FT.1")]
+
+    response = client.put("/api/audit-results/FT.1", json=payload("FT.1", "FT", evidence="Stroboscope de journalisation",
+                                                                   notes="kaléidoscope retiré"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    integrity_check(db)
+    # L'ancienne preuve n'est plus indexée, la nouvelle et les notes le sont
+    assert search(client, admin_headers, "sauvegardes", "results") == []
+    assert search(client, admin_headers, "stroboscope", "results") == [("audit_result", "FT.1")]
+    assert search(client, admin_headers, "kaléidoscope", "results") == [("audit_result", "FT.1")]
+
+    client.delete("/api/audit-results/FT.1", headers=admin_headers)
+    integrity_check(db)
+    assert search(client, admin_headers, "stroboscope", "results") == []
+
+
+def test_history_index_follows_deletes(client, admin_headers, create_audit, db):
+    create_audit("FH.1", category="FH")
+    db.execute(text("UPDATE audit_history SET notes = 'Revue du périscope' WHERE control_id = 'FH.1'"))
+    db.commit()
+    assert search(client, admin_headers, "periscope", "history") == [("history", "FH.1")]
+
+    # Entrée sortie de la table chaude (comme par la rétention) : sortie de l'index
+    db.execute(text("DELETE FROM audit_history WHERE control_id = 'FH.1'"))
+    db.commit()
+    integrity_check(db)
+    assert search(client, admin_headers, "periscope", "history") == []
+    assert client.get("/api/search", params={"q": "periscope"}).status_code == 401
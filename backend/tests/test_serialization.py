@@ -0,0 +1,43 @@
+"""Négociation MessagePack / JSON (en-tête Accept)"""
+import msgpack
+import pytest
+from starlette.requests import Request
+
+from app.serialization import wants_msgpack
+
+
+def request_accepting(accept: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"accept", accept.encode())]})
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/x-msgpack", True),
+    ("application/msgpack, application/json", True),
+    ("application/json;q=0.9, application/msgpack", True),
+    ("application/msgpack, */*", True),
+    ("application/msgpack;q=0, application/json", False),
+    ("application/msgpack;q=0", False),
+    ("application/json, application/msgpack;q=0.5", False),
+    ("application/msgpack;q=0.5, application/*", False),
+    ("application/msgpack;q=abc", False),
+    ("application/json", False),
+    ("*/*", False),
+    ("", False),
+])
+def test_wants_msgpack_honours_quality(accept, expected):
+    assert wants_msgpack(request_accepting(accept)) is expected
+
+
+def test_listing_negotiates_representation(client, create_audit):
+    create_audit("MP.1", category="MP")
+    params = {"category": "MP"}
+    as_json = client.get("/api/audit-results", params=params)
+    packed = client.get("/api/audit-results", params=params, headers={"Accept": "application/msgpack"})
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(packed.content) == as_json.json()
+
+    # q=0 exclut MessagePack : JSON, y compris depuis le cache des réponses
+    refused = client.get("/api/audit-results", params=params, headers={"Accept": "application/msgpack;q=0, application/json"})
+    assert refused.headers["content-type"].startswith("application/json")
+    assert refused.json() == as_json.json()
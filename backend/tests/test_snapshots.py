@@ -0,0 +1,93 @@
+"""Reconstitution de l'état à une date : snapshot le plus proche et rejeu de l'historique"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models import AuditHistory, AuditHistoryArchive, AuditResult, AuditSnapshot, AuditSnapshotRow, Base
+from app.snapshots import diff_states, state_as_of
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2030, 1, 1, hour, minute)
+
+
+@pytest.fixture
+def timeline(tmp_path):
+    """Base isolée : snapshot à 12 h, puis changements de statut, suppression et création
+
+    10:00 C1 créé (compliant), 10:01 C2 créé (partial), 12:00 snapshot,
+    13:00 C1 -> non-compliant, 14:00 C2 supprimé, 15:00 C3 créé (partial),
+    16:00 C3 -> compliant (entrée déjà archivée par la rétention).
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'timeline.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        def entry(entry_id, control_id, action, old, new, timestamp, table=AuditHistory):
+            return table(id=entry_id, control_id=control_id, action=action, old_status=old, new_status=new,
+                         user="auditeur", timestamp=timestamp)
+
+        db.add_all([
+            entry(1, "C1", "created", None, "compliant", at(10)),
+            entry(2, "C2", "created", None, "partial", at(10, 1)),
+            AuditSnapshot(id=1, taken_at=at(12), history_id=2, revision=2, row_count=2),
+            AuditSnapshotRow(snapshot_id=1, control_id="C1", control_name="Un", category="A", status="compliant"),
+            AuditSnapshotRow(snapshot_id=1, control_id="C2", control_name="Deux", category="A", status="partial"),
+            entry(3, "C1", "status_changed", "compliant", "non-compliant", at(13)),
+            entry(4, "C2", "deleted", "partial", None, at(14)),
+            entry(5, "C3", "created", None, "partial", at(15)),
+            entry(6, "C3", "status_changed", "partial", "compliant", at(16), AuditHistoryArchive),
+            AuditResult(control_id="C1", control_name="Un", category="A", status="non-compliant"),
+            AuditResult(control_id="C3", control_name="Trois", category="B", status="compliant", evaluated_by="auditeur"),
+        ])
+        db.commit()
+        yield db
+    engine.dispose()
+
+
+def statuses(state: dict) -> dict:
+    return {control_id: row["status"] for control_id, row in state.items()}
+
+
+@pytest.mark.parametrize("as_of, expected", [
+    ("2030-01-01 11:00:00", {"C1": "compliant", "C2": "partial"}),  # avant le snapshot : rejeu complet
+    ("2030-01-01 12:30:00", {"C1": "compliant", "C2": "partial"}),
+    ("2030-01-01 13:00:00", {"C1": "compliant", "C2": "partial"}),  # borne exclue
+    ("2030-01-01 14:30:00", {"C1": "non-compliant"}),
+    ("2030-01-01 15:30:00", {"C1": "non-compliant", "C3": "partial"}),
+    ("2030-01-01 17:00:00", {"C1": "non-compliant", "C3": "compliant"}),  # delta lu aussi dans l'archive
+])
+def test_state_as_of_replays_history(timeline, as_of, expected):
+    snapshot, state = state_as_of(timeline, as_of)
+    assert statuses(state) == expected
+    assert (snapshot.id if snapshot else None) == (None if as_of < "2030-01-01 12:00:00" else 1)
+
+
+def test_created_control_is_completed_from_current_row(timeline):
+    _, state = state_as_of(timeline, "2030-01-01 15:30:00")
+    assert state["C3"] == {
+        "control_id": "C3", "control_name": "Trois", "category": "B", "status": "partial",
+        "evaluation_date": None, "evaluated_by": "auditeur",
+    }
+    _, before = state_as_of(timeline, "2030-01-01 12:30:00")
+    assert diff_states(before, state) == [
+        {"controlId": "C1", "change": "status_changed", "oldStatus": "compliant", "newStatus": "non-compliant"},
+        {"controlId": "C2", "change": "removed", "oldStatus": "partial", "newStatus": None},
+        {"controlId": "C3", "change": "added", "oldStatus": None, "newStatus": "partial"},
+    ]
+
+
+def test_dates_before_oldest_snapshot_are_refused(client, admin_headers, create_audit):
+    create_audit("SN.1", category="SN", status="partial")
+    response = client.post("/api/snapshots", headers=admin_headers)
+    assert response.status_code == 201, response.text
+
+    refused = client.get("/api/snapshots/state", params={"as_of": "2000-01-01"})
+    assert refused.status_code == 400
+    assert "plus ancien snapshot" in refused.json()["detail"]
+    assert client.get("/api/snapshots/diff", params={"from": "2000-01-01", "to": "2999-01-01"}).status_code == 400
+    assert client.get("/api/snapshots/state", params={"as_of": "pas une date"}).status_code == 400
+
+    state = client.get("/api/snapshots/state", params={"as_of": "2999-01-01", "category": "SN"}).json()
+    assert [(row["controlId"], row["status"]) for row in state["results"]] == [("SN.1", "partial")]
@@ -0,0 +1,87 @@
+"""Compteurs matérialisés par catégorie comparés à un GROUP BY sur audit_results"""
+from sqlalchemy import text
+
+from app.statistics import compliance_score, status_counter
+
+
+def grouped_statistics(db) -> dict:
+    """Statistiques par catégorie recalculées directement sur audit_results"""
+    categories = {}
+    rows = db.execute(text("SELECT category, status, count(*) FROM audit_results GROUP BY category, status"))
+    for category, status, count in rows:
+        stats = categories.setdefault(category, {"total": 0, "compliant": 0, "partial": 0, "non_compliant": 0, "not_evaluated": 0})
+        stats["total"] += count
+        stats[status_counter(status)] += count
+    return {
+        category: {
+            "category": category,
+            "total": stats["total"],
+            "compliant": stats["compliant"],
+            "partial": stats["partial"],
+            "nonCompliant": stats["non_compliant"],
+            "notEvaluated": stats["not_evaluated"],
+            "complianceScore": compliance_score(stats["compliant"], stats["partial"], stats["total"]),
+        }
+        for category, stats in categories.items()
+    }
+
+
+def assert_statistics_match(client, db):
+    statistics = client.get("/api/statistics").json()
+    expected = grouped_statistics(db)
+    assert {c["category"]: c for c in statistics["byCategory"]} == expected
+    assert statistics["total"] == sum(c["total"] for c in expected.values())
+    assert statistics["compliant"] == sum(c["compliant"] for c in expected.values())
+    assert statistics["nonCompliant"] == sum(c["nonCompliant"] for c in expected.values())
+    # Le recalcul à la demande donne exactement la même réponse
+    assert client.get("/api/statistics", params={"live": "true"}).json() == statistics
+
+
+def test_statistics_follow_create_update_delete(client, admin_headers, db, create_audit, payload):
+    create_audit("ST.1", category="ST.A", status="compliant")
+    create_audit("ST.2", category="ST.A", status="partial")
+    create_audit("ST.3", category="ST.B", status="non-compliant")
+    assert_statistics_match(client, db)
+
+    # Changement de statut puis de catégorie
+    response = client.put("/api/audit-results/ST.2", json=payload("ST.2", "ST.A", "compliant"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert_statistics_match(client, db)
+    response = client.put("/api/audit-results/ST.3", json=payload("ST.3", "ST.A", "non-compliant"), headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert_statistics_match(client, db)
+    # ST.B n'a plus de contrôle : la catégorie disparaît de la réponse
+    assert "ST.B" not in {c["category"] for c in client.get("/api/statistics").json()["byCategory"]}
+
+    response = client.delete("/api/audit-results/ST.1", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert_statistics_match(client, db)
+
+
+def test_statistics_follow_bulk_upsert(client, admin_headers, db, create_audit, payload):
+    create_audit("SB.1", category="SB.A", status="compliant")
+    create_audit("SB.2", category="SB.A", status="not-evaluated")
+
+    response = client.post("/api/audit-results/bulk", json=[
+        payload("SB.1", "SB.B", "partial"),          # changement de catégorie et de statut
+        payload("SB.2", "SB.A", "not-evaluated"),    # inchangé
+        payload("SB.3", "SB.B", "compliant"),        # création
+        payload("SB.4", "SB.A", "non-compliant"),
+        payload("SB.4", "SB.A", "compliant"),        # la dernière occurrence l'emporte
+    ], headers=admin_headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["updated"]) == (2, 2)
+    assert_statistics_match(client, db)
+    by_category = {c["category"]: c for c in client.get("/api/statistics").json()["byCategory"]}
+    assert by_category["SB.A"]["compliant"] == 1
+    assert by_category["SB.B"]["total"] == 2
+
+
+def test_compliance_score_rounding():
+    # Arrondi au dixième, la moitié vers le haut, sans erreur de flottant
+    assert compliance_score(0, 0, 0) == 0
+    assert compliance_score(1, 1, 3) == 50.0
+    assert compliance_score(1, 0, 3) == 33.3
+    assert compliance_score(2, 0, 3) == 66.7
+    assert compliance_score(1, 0, 8) == 12.5
@@ -1,7 +1,7 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Search, Edit2, Trash2, Save, X, Plus, Download, Upload, FileUp, Filter, Grid3x3, List, CheckCircle, AlertCircle, XCircle, FileText, TrendingUp, Copy, Eye, CheckCircle2 } from 'lucide-react'
 import { toast } from 'sonner'
-import { getAuditResults, deleteAuditResult, createAuditResult, updateAuditResult, getStatistics } from '../services/api'
+import { getAuditResults, deleteAuditResult, createAuditResult, updateAuditResult, getStatistics, subscribeAuditChanges } from '../services/api'
 import { ISO27001_CONTROLS, getStatusColor, getStatusLabel } from '../data/controls'
 import { Card, CardContent, CardHeader, CardTitle, CardDescription, CardFooter } from '../components/ui/card'
 import { Badge } from '../components/ui/badge'
@@ -34,10 +34,35 @@ function Controls() {
   const [showFilters, setShowFilters] = useState(false)
   const [evidenceFile, setEvidenceFile] = useState(null)
 
+  const resultsRef = useRef(results)
+  resultsRef.current = results
+
   useEffect(() => {
     loadData()
   }, [])
 
+  // Live updates from other auditors: patch the list in place instead of
+  // refetching it; unknown controls or a resync fall back to a reload
+  useEffect(() => {
+    return subscribeAuditChanges({
+      onChange: ({ changes }) => {
+        const known = new Set(resultsRef.current.map((result) => result.controlId))
+        if (changes.some((change) => change.status !== null && !known.has(change.controlId))) {
+          loadResults()
+          return
+        }
+        const updates = new Map(changes.map((change) => [change.controlId, change.status]))
+        setResults((current) => current
+          .filter((result) => updates.get(result.controlId) !== null)
+          .map((result) => updates.has(result.controlId)
+            ? { ...result, status: updates.get(result.controlId) }
+            : result))
+        getStatistics().then(setStats).catch(console.error)
+      },
+      onResync: () => loadResults(),
+    })
+  }, [])
+
   const loadData = async () => {
     try {
       setLoading(true)
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Clock } from 'lucide-react'
-import { getHistory } from '../services/api'
+import { getHistory, subscribeAuditChanges } from '../services/api'
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card'
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '../components/ui/table'
 import { Badge } from '../components/ui/badge'
@@ -14,9 +14,17 @@ function History() {
     loadHistory()
   }, [])
 
-  const loadHistory = async () => {
+  // Reload (conditional GET) only when another auditor commits a change
+  useEffect(() => {
+    return subscribeAuditChanges({
+      onChange: () => loadHistory({ silent: true }),
+      onResync: () => loadHistory({ silent: true }),
+    })
+  }, [])
+
+  const loadHistory = async ({ silent = false } = {}) => {
     try {
-      setLoading(true)
+      if (!silent) setLoading(true)
       const data = await getHistory()
       setHistory(data.history || [])
       setError(null)
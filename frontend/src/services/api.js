@@ -42,15 +42,47 @@ api.interceptors.response.use(
   }
 )
 
-// Audit Results
-export const getAuditResults = async () => {
-  const response = await api.get('/api/audit-results')
+// Conditional GET cache: the API returns an ETag derived from the data
+// revision and answers 304 Not Modified when nothing changed since then.
+const etagCache = new Map()
+
+const conditionalGet = async (url, config = {}) => {
+  const key = api.getUri({ url, params: config.params })
+  const cached = etagCache.get(key)
+  const response = await api.get(url, {
+    ...config,
+    headers: {
+      ...config.headers,
+      ...(cached ? { 'If-None-Match': cached.etag } : {}),
+    },
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  })
+
+  if (response.status === 304 && cached) {
+    return cached.data
+  }
+
+  const etag = response.headers.etag
+  if (etag) {
+    etagCache.set(key, { etag, data: response.data })
+  }
   return response.data
 }
 
+// Audit Results
+// params: { cursor, limit, category, status, evaluated_by, date_from, date_to, fields }
+export const getAuditResults = async (params = {}) => {
+  return conditionalGet('/api/audit-results', { params })
+}
+
+// Delta sync: rows upserted and control ids deleted since a revision.
+// Returns { revision, resync, upserts, deleted }; resync means reload with since=0.
+export const getAuditResultChanges = async (since, params = {}) => {
+  return conditionalGet('/api/audit-results/changes', { params: { ...params, since } })
+}
+
 export const getAuditResult = async (controlId) => {
-  const response = await api.get(`/api/audit-results/${controlId}`)
-  return response.data
+  return conditionalGet(`/api/audit-results/${controlId}`)
 }
 
 export const createAuditResult = async (data) => {
@@ -58,6 +90,11 @@ export const createAuditResult = async (data) => {
   return response.data
 }
 
+export const bulkUpsertAuditResults = async (results) => {
+  const response = await api.post('/api/audit-results/bulk', results)
+  return response.data
+}
+
 export const updateAuditResult = async (controlId, data) => {
   const response = await api.put(`/api/audit-results/${controlId}`, data)
   return response.data
@@ -70,8 +107,12 @@ export const deleteAuditResult = async (controlId) => {
 
 // Statistics
 export const getStatistics = async () => {
-  const response = await api.get('/api/statistics')
-  return response.data
+  return conditionalGet('/api/statistics')
+}
+
+// params: { granularity: 'day' | 'week', from, to, category }
+export const getStatisticsTimeseries = async (params = {}) => {
+  return conditionalGet('/api/statistics/timeseries', { params })
 }
 
 // Risks
@@ -91,10 +132,28 @@ export const updateRiskStatus = async (riskId, status) => {
 }
 
 // History
-export const getHistory = async (controlId = null) => {
+// params: { cursor, limit, from, to, user, action, control_id }
+export const getHistory = async (controlId = null, params = {}) => {
   const url = controlId ? `/api/history/${controlId}` : '/api/history'
-  const response = await api.get(url)
-  return response.data
+  return conditionalGet(url, { params })
+}
+
+// Change feed (Server-Sent Events). handlers: { onChange(data), onResync(data) }
+// Returns a function closing the connection; EventSource reconnects by itself
+// and sends Last-Event-ID, so missed changes surface as a resync.
+// EventSource cannot send the Authorization header: the token goes in the URL.
+export const subscribeAuditChanges = ({ onChange, onResync } = {}) => {
+  const token = localStorage.getItem('token')
+  const query = token ? `?access_token=${encodeURIComponent(token)}` : ''
+  const source = new EventSource(`${API_BASE_URL}/api/events/audit-results${query}`)
+  source.addEventListener('change', (event) => onChange?.(JSON.parse(event.data)))
+  source.addEventListener('resync', (event) => onResync?.(JSON.parse(event.data)))
+  return () => source.close()
+}
+
+// Full-text search (source: 'all' | 'results' | 'history')
+export const search = async (q, { source = 'all', limit = 20 } = {}) => {
+  return conditionalGet('/api/search', { params: { q, source, limit } })
 }
 
 // Health check